@@ -1,9 +1,6 @@
 # authapi/views.py
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
-from django.conf import settings
-
-from threading import Thread
 
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
@@ -14,7 +11,8 @@ from .models import EmailVerificationCode
 from core.models import UserProfile
 
 from django.utils.crypto import get_random_string
-from django.core.mail import send_mail
+
+from common.mailer import MailQueueFull, send_mail_async
 
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_GET
@@ -87,20 +85,6 @@ def logout_view(request):
     return Response({"ok": True})
 
 
-def _send_email_async(subject, message, recipient):
-    try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[recipient],
-            fail_silently=False,
-        )
-    except Exception as e:
-        # 生产环境不要 print，可以换成 logging
-        print("[EMAIL ERROR]", e)
-        
-        
 @api_view(["POST"])
 def send_verification_code(request):
     email = request.data.get("email")
@@ -110,23 +94,27 @@ def send_verification_code(request):
 
     code = get_random_string(length=6, allowed_chars="0123456789")
 
-    EmailVerificationCode.objects.create(
+    record = EmailVerificationCode.objects.create(
         email=email,
         code=code,
     )
 
-    # ✅ 异步发邮件（关键）
-    Thread(
-        target=_send_email_async,
-        args=(
+    # ✅ 交给共享的发送池（有界队列），立刻返回，不阻塞 worker
+    try:
+        send_mail_async(
             "Your AlgorithmTrading verification code",
             f"Your verification code is: {code}",
             email,
-        ),
-        daemon=True,
-    ).start()
+        )
+    except MailQueueFull:
+        # 发送队列已满：验证码没发出去，作废这条记录，让客户端稍后重试
+        record.delete()
+        return Response(
+            {"error": "Too many requests, please try again shortly"},
+            status=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={"Retry-After": "5"},
+        )
 
-    # ✅ 立刻返回，不阻塞 worker
     return Response({"ok": True})
 
 
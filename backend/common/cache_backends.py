@@ -0,0 +1,283 @@
+# common/cache_backends.py
+# ------------------------------------------------------------
+# 基于 SQLite 文件的 Django cache backend（多进程共享，无需外部服务）
+#
+# gunicorn 的多个 worker、refresh_market_data 等进程打开同一个文件，
+# 报价 / K 线 / 情绪指标的缓存只需要有一个进程去上游取。
+#
+# - key：Django 的 KEY_PREFIX + VERSION（make_key），改 VERSION 即整体失效
+# - TTL：每行保存过期时间（time.time()），读到过期行视为 miss
+# - 容量：超过 MAX_ENTRIES 时先删过期行，仍然超出则按 CULL_FREQUENCY
+#   淘汰最早过期的一批
+# - get_or_set()：miss 时用锁行（add 成功者）保证同一个 key 只有一个
+#   进程 / 线程调用 loader，其它调用方等待结果（防止缓存击穿）
+#
+# 使用独立的数据库文件 + WAL，不和业务库抢锁。
+# ------------------------------------------------------------
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# 等锁时轮询间隔（秒）
+LOCK_POLL_INTERVAL = 0.05
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entry (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+);
+CREATE INDEX IF NOT EXISTS cache_entry_expires ON cache_entry (expires);
+"""
+
+
+class SQLiteCache(BaseCache):
+    """
+    settings.CACHES 示例：
+
+        "default": {
+            "BACKEND": "common.cache_backends.SQLiteCache",
+            "LOCATION": BASE_DIR / "cache.sqlite3",
+            "VERSION": 1,
+            "OPTIONS": {
+                "MAX_ENTRIES": 10000,
+                "CULL_FREQUENCY": 3,
+                "LOCK_TIMEOUT": 30,   # loader 最长执行时间，超时后锁自动失效
+                "LOCK_WAIT": 10,      # 等待别人加载的最长时间，超时后自己加载
+            },
+        }
+    """
+
+    def __init__(self, location: Any, params: Dict[str, Any]) -> None:
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+
+        self.path = str(location)
+        self.lock_timeout = float(options.get("LOCK_TIMEOUT", 30))
+        self.lock_wait = float(options.get("LOCK_WAIT", 10))
+
+        self._local = threading.local()
+
+    # ---------- 连接（每个线程一条；fork 后重新打开） ----------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _expiry(self, timeout: Any) -> Optional[float]:
+        """过期时刻（time.time()）；None 表示永不过期，timeout=0 时为过去的时刻"""
+        return self.get_backend_timeout(timeout)
+
+    @staticmethod
+    def _dumps(value: Any) -> bytes:
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _cull(self, conn: sqlite3.Connection, now: float) -> None:
+        count = conn.execute("SELECT COUNT(*) FROM cache_entry").fetchone()[0]
+        if count <= self._max_entries:
+            return
+
+        conn.execute("DELETE FROM cache_entry WHERE expires <= ?", (now,))
+        count = conn.execute("SELECT COUNT(*) FROM cache_entry").fetchone()[0]
+        if count <= self._max_entries:
+            return
+
+        if self._cull_frequency == 0:
+            conn.execute("DELETE FROM cache_entry")
+            return
+
+        # 永不过期（expires IS NULL）的行最后淘汰
+        conn.execute(
+            "DELETE FROM cache_entry WHERE key IN ("
+            " SELECT key FROM cache_entry ORDER BY expires IS NULL, expires LIMIT ?"
+            ")",
+            (count // self._cull_frequency,),
+        )
+
+    def _write(self, key: str, value: Any, timeout: Any, only_if_missing: bool) -> bool:
+        expires = self._expiry(timeout)
+        now = time.time()
+        blob = self._dumps(value)
+        conn = self._conn()
+
+        with conn:
+            if expires is not None and expires <= now:
+                # timeout <= 0：与其它 backend 一样表示删除
+                conn.execute("DELETE FROM cache_entry WHERE key = ?", (key,))
+                return False
+
+            if only_if_missing:
+                # 已有但过期的行可以被覆盖
+                cur = conn.execute(
+                    "INSERT INTO cache_entry (key, value, expires) VALUES (?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires "
+                    "WHERE cache_entry.expires <= ?",
+                    (key, blob, expires, now),
+                )
+            else:
+                cur = conn.execute(
+                    "INSERT OR REPLACE INTO cache_entry (key, value, expires) VALUES (?, ?, ?)",
+                    (key, blob, expires),
+                )
+            written = cur.rowcount > 0
+            if written:
+                self._cull(conn, now)
+        return written
+
+    # ---------- Django cache API ----------
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None) -> bool:
+        key = self.make_and_validate_key(key, version=version)
+        return self._write(key, value, timeout, only_if_missing=True)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None) -> None:
+        key = self.make_and_validate_key(key, version=version)
+        self._write(key, value, timeout, only_if_missing=False)
+
+    def get(self, key, default=None, version=None) -> Any:
+        key = self.make_and_validate_key(key, version=version)
+        row = self._conn().execute(
+            "SELECT value FROM cache_entry WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def get_many(self, keys: Iterable[Any], version=None) -> Dict[Any, Any]:
+        mapping = {self.make_and_validate_key(k, version=version): k for k in keys}
+        if not mapping:
+            return {}
+
+        found: Dict[Any, Any] = {}
+        names = list(mapping)
+        now = time.time()
+        conn = self._conn()
+        # SQLite 默认最多 999 个参数
+        for i in range(0, len(names), 900):
+            chunk = names[i:i + 900]
+            rows = conn.execute(
+                f"SELECT key, value FROM cache_entry WHERE key IN ({','.join('?' * len(chunk))}) "
+                "AND (expires IS NULL OR expires > ?)",
+                (*chunk, now),
+            )
+            for key, blob in rows:
+                found[mapping[key]] = pickle.loads(blob)
+        return found
+
+    def set_many(self, data: Dict[Any, Any], timeout=DEFAULT_TIMEOUT, version=None) -> List[Any]:
+        for key, value in data.items():
+            self.set(key, value, timeout, version=version)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None) -> bool:
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                "UPDATE cache_entry SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                (self._expiry(timeout), key, time.time()),
+            )
+        return cur.rowcount > 0
+
+    def delete(self, key, version=None) -> bool:
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._conn()
+        with conn:
+            cur = conn.execute("DELETE FROM cache_entry WHERE key = ?", (key,))
+        return cur.rowcount > 0
+
+    def delete_many(self, keys: Iterable[Any], version=None) -> None:
+        for key in keys:
+            self.delete(key, version=version)
+
+    def has_key(self, key, version=None) -> bool:
+        return self.get(key, self._missing_key, version=version) is not self._missing_key
+
+    def clear(self) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM cache_entry")
+
+    def close(self, **kwargs: Any) -> None:
+        # 每个请求结束时 Django 会调用 close()；连接是线程级复用的，不在这里关闭
+        pass
+
+    # ---------- 防击穿 ----------
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None) -> Any:
+        """
+        与 BaseCache.get_or_set 相同（None 视为 miss），但 default 是函数时：
+        同一个 key 同时 miss 的多个进程 / 线程里只有拿到锁行的那个调用 default()，
+        其它调用方轮询等待结果；等待超过 LOCK_WAIT 秒则自己调用。
+        default() 抛出的异常不会缓存，等待者随后会有一个重新拿到锁。
+        """
+        value = self.get(key, version=version)
+        if value is not None:
+            return value
+        if not callable(default):
+            return super().get_or_set(key, default, timeout, version=version)
+
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_wait
+
+        while not self.add(lock_key, token, self.lock_timeout, version=version):
+            time.sleep(LOCK_POLL_INTERVAL)
+            value = self.get(key, version=version)
+            if value is not None:
+                return value
+            if time.monotonic() >= deadline:
+                value = default()
+                if value is not None:
+                    self.set(key, value, timeout, version=version)
+                return value
+
+        try:
+            # 拿到锁之前可能已经有人写入
+            value = self.get(key, version=version)
+            if value is None:
+                value = default()
+                if value is not None:
+                    self.set(key, value, timeout, version=version)
+            return value
+        finally:
+            self._release(lock_key, token, version)
+
+    def _release(self, lock_key: str, token: str, version: Optional[int]) -> None:
+        """只删除自己的锁（锁过期后可能已被别人拿走）"""
+        key = self.make_and_validate_key(lock_key, version=version)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "DELETE FROM cache_entry WHERE key = ? AND value = ?",
+                (key, self._dumps(token)),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        size, expired = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(expires <= ?), 0) FROM cache_entry", (now,)
+        ).fetchone()
+        return {
+            "path": self.path,
+            "size": size,
+            "expired": expired,
+            "max_entries": self._max_entries,
+        }
@@ -0,0 +1,96 @@
+# common/downsample.py
+# ------------------------------------------------------------
+# 时间序列降采样（LTTB：Largest-Triangle-Three-Buckets）
+#
+# 把 n 个点压到 N 个点，同时保留曲线形状（峰谷、拐点）：
+#   - 首尾两点固定保留
+#   - 中间分成 N-2 个桶，每个桶选出与“上一个选中点”和
+#     “下一个桶的均值点”构成三角形面积最大的那个点
+# 返回的是下标数组，调用方用它去取所有列（时间、OHLC、rating ...）
+# ------------------------------------------------------------
+
+from typing import Mapping, Optional, Tuple
+
+import numpy as np
+
+# 命名的分辨率档位 -> 目标点数（档位固定，结果可以缓存）
+RESOLUTIONS = {
+    "sparkline": 60,
+    "thumbnail": 150,
+    "chart": 500,
+}
+
+MIN_POINTS = 3
+MAX_POINTS = 5000
+
+
+def parse_target(params: Mapping[str, str]) -> Tuple[Optional[int], Optional[str]]:
+    """
+    解析查询参数 points=N / resolution=<name>（points 优先）
+
+    :return: (目标点数, 档位名)；都没给时为 (None, None)
+    :raises ValueError: 参数非法
+    """
+    raw_points = params.get("points")
+    if raw_points:
+        try:
+            n = int(raw_points)
+        except ValueError:
+            raise ValueError("points must be an integer")
+        if not MIN_POINTS <= n <= MAX_POINTS:
+            raise ValueError(f"points must be between {MIN_POINTS} and {MAX_POINTS}")
+        return n, None
+
+    level = params.get("resolution")
+    if level:
+        if level not in RESOLUTIONS:
+            raise ValueError(
+                f"Unknown resolution '{level}', expected one of: {', '.join(RESOLUTIONS)}"
+            )
+        return RESOLUTIONS[level], level
+
+    return None, None
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """
+    LTTB 降采样
+
+    :param x: 横坐标（单调递增，例如时间戳 / 日期序号）
+    :param y: 纵坐标；NaN 的点不参与选择
+    :param n: 目标点数（>= 3）
+    :return: 选中点的下标（升序，int64）
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    valid = np.nonzero(~np.isnan(y))[0]
+    length = len(valid)
+    if length <= n:
+        return valid
+
+    xs, ys = x[valid], y[valid]
+    every = (length - 2) / (n - 2)
+
+    picked = np.empty(n, dtype=np.int64)
+    picked[0] = 0
+    a = 0
+
+    for i in range(n - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        nxt_end = min(int((i + 2) * every) + 1, length)
+
+        # 下一个桶的均值点（最后一个桶时就是终点）
+        avg_x = xs[end:nxt_end].mean()
+        avg_y = ys[end:nxt_end].mean()
+
+        area = np.abs(
+            (xs[a] - avg_x) * (ys[start:end] - ys[a])
+            - (xs[a] - xs[start:end]) * (avg_y - ys[a])
+        )
+        a = start + int(np.argmax(area))
+        picked[i + 1] = a
+
+    picked[-1] = length - 1
+    return valid[picked]
@@ -0,0 +1,47 @@
+# common/http.py
+# ------------------------------------------------------------
+# 条件请求（ETag / Last-Modified）工具
+#
+# 视图先算出当前内容的 etag / last_modified：
+#   - not_modified() 命中 If-None-Match / If-Modified-Since 时返回 304
+#   - set_validators() 给正常响应加上 ETag / Last-Modified 头
+# ------------------------------------------------------------
+
+from datetime import datetime
+from typing import Optional
+
+from django.http import HttpRequest, HttpResponseBase
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+
+def _timestamp(last_modified: Optional[datetime]) -> Optional[int]:
+    return int(last_modified.timestamp()) if last_modified else None
+
+
+def not_modified(
+    request: HttpRequest,
+    etag: Optional[str] = None,
+    last_modified: Optional[datetime] = None,
+) -> Optional[HttpResponseBase]:
+    """客户端缓存仍然有效时返回 304 响应（已带好 ETag / Last-Modified），否则返回 None"""
+    response = get_conditional_response(
+        request,
+        etag=quote_etag(etag) if etag else None,
+        last_modified=_timestamp(last_modified),
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(
+    response: HttpResponseBase,
+    etag: Optional[str] = None,
+    last_modified: Optional[datetime] = None,
+) -> HttpResponseBase:
+    if etag:
+        response.headers["ETag"] = quote_etag(etag)
+    if last_modified:
+        response.headers["Last-Modified"] = http_date(_timestamp(last_modified))
+    return response
@@ -0,0 +1,231 @@
+# common/mailer.py
+# ------------------------------------------------------------
+# 请求内的即时邮件（验证码、订阅确认）用的有界发送池
+#
+# - 固定 MAIL_WORKERS 个线程 + 长度为 MAIL_QUEUE_SIZE 的队列；
+#   队列满时 submit() 直接抛 MailQueueFull，由视图返回 429，
+#   不会因为一波注册把线程 / SMTP 连接数打爆
+# - 每个 worker 持有一个 SMTP 连接，连续的邮件复用同一个会话，
+#   空闲 IDLE_TIMEOUT 秒后关闭
+# - 记录排队延迟（入队 -> 开始发送）等指标，stats() 读取
+# - 进程退出时（atexit）把队列里剩下的邮件发完，最多等 DRAIN_TIMEOUT 秒
+#
+# 需要保证送达、可以重跑的批量邮件（情绪告警）走 common.outbox。
+# ------------------------------------------------------------
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+logger = logging.getLogger(__name__)
+
+MAIL_WORKERS = int(getattr(settings, "MAIL_WORKERS", 2))
+MAIL_QUEUE_SIZE = int(getattr(settings, "MAIL_QUEUE_SIZE", 100))
+
+# worker 空闲多久后关闭 SMTP 连接（秒）
+IDLE_TIMEOUT = 30.0
+
+# 退出时最多等多久把队列发完（秒）
+DRAIN_TIMEOUT = 10.0
+
+# 排队超过这个时间记一条 warning（秒）
+SLOW_QUEUE_WARNING = 5.0
+
+# 用最近多少封邮件的排队延迟计算分位数
+LATENCY_WINDOW = 500
+
+_STOP = object()
+
+
+class MailQueueFull(Exception):
+    """发送队列已满（调用方应返回 429，让客户端稍后重试）"""
+
+
+@dataclass
+class _Job:
+    subject: str
+    body: str
+    to: List[str]
+    from_email: Optional[str]
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class MailPool:
+    def __init__(self, workers: int = MAIL_WORKERS, queue_size: int = MAIL_QUEUE_SIZE) -> None:
+        self.workers = workers
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # 指标
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self._counters = {"submitted": 0, "rejected": 0, "sent": 0, "failed": 0}
+        self._max_latency = 0.0
+
+        for i in range(workers):
+            t = threading.Thread(target=self._work, name=f"mail-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    # ---------- 提交 ----------
+
+    def submit(self, subject: str, body: str, to: List[str], from_email: Optional[str] = None) -> None:
+        """
+        放入发送队列，立即返回
+
+        :raises MailQueueFull: 队列已满，或发送池已关闭
+        """
+        if self._closed:
+            raise MailQueueFull("mail pool is shut down")
+        try:
+            self._queue.put_nowait(_Job(subject, body, list(to), from_email))
+        except queue.Full:
+            self._count("rejected")
+            raise MailQueueFull(f"mail queue is full ({self._queue.maxsize} pending)")
+        self._count("submitted")
+
+    # ---------- worker ----------
+
+    def _work(self) -> None:
+        connection = None
+
+        while True:
+            try:
+                job = self._queue.get(timeout=IDLE_TIMEOUT)
+            except queue.Empty:
+                # 空闲了，关掉连接，下一封再建
+                if connection is not None:
+                    connection.close()
+                    connection = None
+                continue
+
+            if job is _STOP:
+                break
+
+            waited = time.monotonic() - job.enqueued_at
+            self._record_latency(waited)
+
+            try:
+                if connection is None:
+                    connection = get_connection(fail_silently=False)
+                # 连接已打开时 send_messages 不会关闭它，后续邮件复用同一会话
+                connection.open()
+                EmailMessage(
+                    subject=job.subject,
+                    body=job.body,
+                    from_email=job.from_email or settings.DEFAULT_FROM_EMAIL,
+                    to=job.to,
+                    connection=connection,
+                ).send()
+                self._count("sent")
+            except Exception:
+                self._count("failed")
+                logger.exception("Failed to send email to %s", ", ".join(job.to))
+                # 连接状态未知，下一封重新建立
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+                connection = None
+
+        if connection is not None:
+            connection.close()
+
+    # ---------- 指标 ----------
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _record_latency(self, waited: float) -> None:
+        with self._lock:
+            self._latencies.append(waited)
+            self._max_latency = max(self._max_latency, waited)
+        if waited > SLOW_QUEUE_WARNING:
+            logger.warning("Email waited %.1fs in the send queue", waited)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        :return: {
+            "workers", "queue_size", "queue_depth",
+            "submitted", "rejected", "sent", "failed",
+            "latency_p50", "latency_p95", "latency_max"（排队延迟，秒）
+        }
+        """
+        with self._lock:
+            latencies = list(self._latencies)
+            counters = dict(self._counters)
+            max_latency = self._max_latency
+
+        return {
+            "workers": self.workers,
+            "queue_size": self._queue.maxsize,
+            "queue_depth": self._queue.qsize(),
+            **counters,
+            "latency_p50": round(_percentile(latencies, 0.5), 3),
+            "latency_p95": round(_percentile(latencies, 0.95), 3),
+            "latency_max": round(max_latency, 3),
+        }
+
+    # ---------- 关闭 ----------
+
+    def shutdown(self, timeout: float = DRAIN_TIMEOUT) -> None:
+        """不再接收新邮件，把已入队的发完后停止 worker（最多等 timeout 秒）"""
+        if self._closed:
+            return
+        self._closed = True
+
+        # STOP 排在已有邮件之后；队列满时阻塞等待空位
+        deadline = time.monotonic() + timeout
+        for _ in self._threads:
+            try:
+                self._queue.put(_STOP, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+
+        for t in self._threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+
+        pending = self._queue.qsize()
+        if pending:
+            logger.warning("Mail pool shut down with %d emails still queued", pending)
+
+
+_pool: Optional[MailPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_mail_pool() -> MailPool:
+    """返回进程内共享的发送池（懒加载，退出时自动 drain）"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = MailPool()
+                atexit.register(_pool.shutdown)
+    return _pool
+
+
+def send_mail_async(subject: str, body: str, recipient: str, from_email: Optional[str] = None) -> None:
+    """
+    异步发送一封邮件
+
+    :raises MailQueueFull: 发送队列已满
+    """
+    get_mail_pool().submit(subject, body, [recipient], from_email)
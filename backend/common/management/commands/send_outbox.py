@@ -0,0 +1,48 @@
+# common/management/commands/send_outbox.py
+import time
+
+from django.core.management.base import BaseCommand
+from common.outbox import BATCH_SIZE, DEFAULT_RATE, MAX_ATTEMPTS, deliver_outbox
+
+
+class Command(BaseCommand):
+    help = "Send queued emails from the outbox (batched, one SMTP connection per batch)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=DEFAULT_RATE,
+            help=f"Max emails per second (default {DEFAULT_RATE})",
+        )
+        parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling the outbox instead of exiting when it is empty",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=10.0,
+            help="Polling interval in seconds when --loop is set",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            result = deliver_outbox(
+                batch_size=options["batch_size"],
+                rate=options["rate"],
+                max_attempts=options["max_attempts"],
+            )
+            if result.sent or result.retried or result.failed:
+                self.stdout.write(
+                    "Outbox: sent={sent} retried={retried} failed={failed}".format(**result.as_dict())
+                )
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS("Outbox delivery completed"))
@@ -1,3 +1,48 @@
+# common/models.py
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class EmailOutbox(models.Model):
+    """
+    待发送邮件（outbox）
+    由 common.outbox.deliver_outbox() 分批、复用 SMTP 连接发送
+
+    idempotency_key 唯一：同一封邮件重复入队只会保留一行，重跑不会重复发送
+    """
+    STATUS_PENDING = "PENDING"
+    STATUS_SENDING = "SENDING"
+    STATUS_SENT = "SENT"
+    STATUS_FAILED = "FAILED"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENDING, "Sending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    idempotency_key = models.CharField(max_length=200, unique=True)
+    to_email = models.EmailField()
+    from_email = models.CharField(max_length=254, blank=True)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # PENDING：最早可以发送的时间（重试退避）
+    # SENDING：租约到期时间，worker 崩溃后到期的行会被重新领取
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.to_email} {self.subject} ({self.status})"
@@ -0,0 +1,221 @@
+# common/outbox.py
+# ------------------------------------------------------------
+# 邮件 outbox：入队 + 批量发送
+#
+# - enqueue_email / enqueue_emails：写入 EmailOutbox，
+#   idempotency_key 冲突的直接忽略（重跑不会重复入队）
+# - deliver_outbox：分批领取到期的邮件，整批共用一个 SMTP 连接
+#   （get_connection + send_messages），按速率限流；
+#   失败的按指数退避重试，超过次数标记为 FAILED
+#
+# 领取时把状态改成 SENDING 并设置租约（next_attempt_at），
+# 多个 worker 并发时同一封邮件只会被一个 worker 领到；
+# worker 崩溃后租约到期的行会被重新领取。
+# ------------------------------------------------------------
+
+import smtplib
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Iterable, List, Mapping, Optional
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EmailOutbox
+from .rate_limit import RateLimiter
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 5
+
+# 重试退避：RETRY_BASE * 2^(attempts-1)，上限 RETRY_CAP
+RETRY_BASE = timedelta(minutes=1)
+RETRY_CAP = timedelta(hours=1)
+
+# SENDING 租约：超过这个时间还没有结果，视为 worker 已崩溃
+LEASE = timedelta(minutes=10)
+
+# 默认发送速率（封 / 秒），Gmail 等 SMTP 对突发很敏感
+DEFAULT_RATE = float(getattr(settings, "EMAIL_OUTBOX_RATE", 5))
+
+INSERT_CHUNK = 500
+
+# 这些错误只影响单封邮件，SMTP 会话仍可继续使用
+_MESSAGE_ERRORS = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+)
+
+
+@dataclass
+class DeliveryResult:
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0     # 超过 MAX_ATTEMPTS，不再重试
+
+    def as_dict(self):
+        return {"sent": self.sent, "retried": self.retried, "failed": self.failed}
+
+
+def _outbox_row(message: Mapping[str, Any]) -> EmailOutbox:
+    return EmailOutbox(
+        idempotency_key=message["key"],
+        to_email=message["to"],
+        subject=message["subject"],
+        body=message["body"],
+        from_email=message.get("from_email") or "",
+    )
+
+
+def enqueue_emails(messages: Iterable[Mapping[str, Any]]) -> int:
+    """
+    批量入队。每个 message: {"key", "to", "subject", "body", ["from_email"]}
+
+    :return: 新入队的条数（已存在的 key 不计）
+    """
+    created = 0
+    chunk: List[EmailOutbox] = []
+
+    def flush():
+        nonlocal created
+        if not chunk:
+            return
+        keys = [row.idempotency_key for row in chunk]
+        before = EmailOutbox.objects.filter(idempotency_key__in=keys).count()
+        EmailOutbox.objects.bulk_create(chunk, ignore_conflicts=True)
+        created += len(set(keys)) - before
+        chunk.clear()
+
+    for message in messages:
+        chunk.append(_outbox_row(message))
+        if len(chunk) >= INSERT_CHUNK:
+            flush()
+    flush()
+
+    return created
+
+
+def enqueue_email(key: str, to: str, subject: str, body: str, from_email: Optional[str] = None) -> bool:
+    """单封入队；key 已存在时返回 False"""
+    return enqueue_emails([{
+        "key": key, "to": to, "subject": subject, "body": body, "from_email": from_email,
+    }]) == 1
+
+
+def _claim(batch_size: int) -> List[EmailOutbox]:
+    """领取一批到期的邮件：PENDING 且到了重试时间，或 SENDING 但租约已过期"""
+    now = timezone.now()
+    due = (
+        EmailOutbox.objects
+        .filter(status__in=[EmailOutbox.STATUS_PENDING, EmailOutbox.STATUS_SENDING])
+        .filter(next_attempt_at__lte=now)
+        .order_by("id")
+        .values_list("id", flat=True)[:batch_size]
+    )
+    ids = list(due)
+    if not ids:
+        return []
+
+    # 条件 UPDATE：只有仍然到期的行会被本 worker 领到
+    EmailOutbox.objects.filter(id__in=ids, next_attempt_at__lte=now).filter(
+        Q(status=EmailOutbox.STATUS_PENDING) | Q(status=EmailOutbox.STATUS_SENDING)
+    ).update(status=EmailOutbox.STATUS_SENDING, next_attempt_at=now + LEASE)
+
+    return list(
+        EmailOutbox.objects.filter(
+            id__in=ids,
+            status=EmailOutbox.STATUS_SENDING,
+            next_attempt_at=now + LEASE,
+        )
+    )
+
+
+def _to_message(row: EmailOutbox, connection) -> EmailMessage:
+    return EmailMessage(
+        subject=row.subject,
+        body=row.body,
+        from_email=row.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=[row.to_email],
+        connection=connection,
+        headers={"X-Idempotency-Key": row.idempotency_key},
+    )
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return min(RETRY_CAP, RETRY_BASE * (2 ** (attempts - 1)))
+
+
+def _record_failure(row: EmailOutbox, error: Exception, max_attempts: int, result: DeliveryResult) -> None:
+    row.attempts += 1
+    row.last_error = f"{type(error).__name__}: {error}"[:2000]
+
+    if row.attempts >= max_attempts:
+        row.status = EmailOutbox.STATUS_FAILED
+        result.failed += 1
+    else:
+        row.status = EmailOutbox.STATUS_PENDING
+        row.next_attempt_at = timezone.now() + _retry_delay(row.attempts)
+        result.retried += 1
+
+    row.save(update_fields=["attempts", "last_error", "status", "next_attempt_at"])
+
+
+def _mark_sent(row: EmailOutbox) -> None:
+    # 每封发出后立即落库：worker 中途崩溃时，已发出的不会在租约到期后被重发
+    EmailOutbox.objects.filter(id=row.id).update(
+        status=EmailOutbox.STATUS_SENT,
+        sent_at=timezone.now(),
+        last_error="",
+    )
+
+
+def _send_batch(rows: List[EmailOutbox], limiter: RateLimiter, max_attempts: int, result: DeliveryResult) -> None:
+    connection = get_connection(fail_silently=False)
+
+    try:
+        for row in rows:
+            limiter.acquire()
+            try:
+                # 显式 open：send_messages 只有在自己打开连接时才会在返回前关闭，
+                # 连接已打开时整批复用同一个 SMTP 会话
+                connection.open()
+                connection.send_messages([_to_message(row, connection)])
+            except Exception as e:
+                _record_failure(row, e, max_attempts, result)
+                if not isinstance(e, _MESSAGE_ERRORS):
+                    # 连接可能已经断开，下一封重新建立
+                    connection.close()
+                continue
+
+            _mark_sent(row)
+            result.sent += 1
+    finally:
+        connection.close()
+
+
+def deliver_outbox(
+    batch_size: int = BATCH_SIZE,
+    rate: float = DEFAULT_RATE,
+    max_attempts: int = MAX_ATTEMPTS,
+    max_batches: Optional[int] = None,
+) -> DeliveryResult:
+    """
+    发送所有到期的邮件，直到没有可领取的为止
+
+    :param rate: 每秒最多发送几封
+    :param max_batches: 最多处理几批（None 表示直到取空）
+    """
+    limiter = RateLimiter(rate)
+    result = DeliveryResult()
+
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        rows = _claim(batch_size)
+        if not rows:
+            break
+        _send_batch(rows, limiter, max_attempts, result)
+        batches += 1
+
+    return result
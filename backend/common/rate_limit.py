@@ -0,0 +1,55 @@
+# common/rate_limit.py
+# ------------------------------------------------------------
+# 令牌桶限流（线程安全）
+#
+# rate 个令牌 / 秒匀速补充，桶容量为 burst。
+# acquire() 在没有令牌时阻塞到有令牌为止，用来把
+# 多线程的外部调用（第三方 API 配额、SMTP 等）压到固定速率以内。
+# ------------------------------------------------------------
+
+import threading
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    def __init__(self, rate: float, burst: Optional[int] = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+
+        self.rate = float(rate)
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        """有令牌则取走并返回 True，否则立即返回 False"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self) -> float:
+        """
+        阻塞直到拿到一个令牌
+
+        :return: 实际等待的秒数
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+            waited += wait
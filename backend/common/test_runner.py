@@ -0,0 +1,28 @@
+# common/test_runner.py
+# ------------------------------------------------------------
+# 测试时把 cache 换成进程内的 LocMemCache
+#
+# settings 默认使用共享的 SQLite 缓存文件（common.cache_backends），
+# 测试不能读到线上缓存里的旧数据，也不能往里写。
+# settings.TEST_RUNNER 指向这里；其它运行方式（脚本等）请设置 CACHE_BACKEND=locmem。
+# ------------------------------------------------------------
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+
+class LocMemCacheRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_override = override_settings(CACHES=TEST_CACHES)
+        self._cache_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_override.disable()
+        super().teardown_test_environment(**kwargs)
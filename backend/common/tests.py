@@ -1,3 +1,393 @@
-from django.test import TestCase
+import socketserver
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from .cache_backends import SQLiteCache
+from .downsample import lttb, parse_target
+from .mailer import MailPool, MailQueueFull
+from .models import EmailOutbox
+from .outbox import MAX_ATTEMPTS, deliver_outbox, enqueue_email, enqueue_emails
+from .rate_limit import RateLimiter
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """最小的 SMTP 会话：EHLO / MAIL / RCPT / DATA / RSET / NOOP / QUIT"""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+
+        self.reply("220 localhost test SMTP")
+        rcpt = []
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line.decode().strip()
+            verb = cmd.split(" ", 1)[0].upper()
+
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif verb == "MAIL":
+                rcpt = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                address = cmd.split(":", 1)[1].strip().strip("<>")
+                if address in server.reject:
+                    self.reply("550 No such user")
+                else:
+                    rcpt.append(address)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if chunk in (b".\r\n", b""):
+                        break
+                    data.append(chunk)
+                with server.lock:
+                    server.messages.append((rcpt, b"".join(data).decode()))
+                self.reply("250 OK")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = []
+        self.reject = set()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    @property
+    def recipients(self):
+        return [r for rcpt, _ in self.messages for r in rcpt]
+
+
+class LocalSMTPTestCase(TestCase):
+    """把 Django 的 SMTP 配置指向 LocalSMTPServer"""
+
+    def setUp(self):
+        self.smtp = LocalSMTPServer()
+        threading.Thread(target=self.smtp.serve_forever, args=(0.05,), daemon=True).start()
+
+        settings_override = override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=self.smtp.port,
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER="",
+            EMAIL_HOST_PASSWORD="",
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(self.smtp.server_close)
+        self.addCleanup(self.smtp.shutdown)
+
+
+class EmailOutboxTests(LocalSMTPTestCase):
+    def _enqueue(self, n, prefix="alert"):
+        return enqueue_emails(
+            {
+                "key": f"{prefix}:{i}",
+                "to": f"user{i}@example.com",
+                "subject": f"Subject {i}",
+                "body": "Hello",
+            }
+            for i in range(n)
+        )
+
+    def test_batch_reuses_one_connection(self):
+        self.assertEqual(self._enqueue(25), 25)
+
+        result = deliver_outbox(batch_size=50, rate=1000)
+
+        self.assertEqual(result.sent, 25)
+        self.assertEqual(self.smtp.connections, 1)
+        self.assertEqual(len(self.smtp.messages), 25)
+        self.assertEqual(
+            EmailOutbox.objects.filter(status=EmailOutbox.STATUS_SENT).count(), 25,
+        )
+        self.assertIn("X-Idempotency-Key: alert:0", self.smtp.messages[0][1])
+
+    def test_one_connection_per_batch(self):
+        self._enqueue(10)
+
+        deliver_outbox(batch_size=4, rate=1000)
+
+        self.assertEqual(len(self.smtp.messages), 10)
+        self.assertEqual(self.smtp.connections, 3)
+
+    def test_rerun_never_double_sends(self):
+        self._enqueue(5)
+        deliver_outbox(rate=1000)
+
+        # 同样的 key 再入队一次、再跑一次 worker
+        self.assertEqual(self._enqueue(5), 0)
+        self.assertFalse(enqueue_email("alert:0", "user0@example.com", "Subject 0", "Hello"))
+        result = deliver_outbox(rate=1000)
+
+        self.assertEqual(result.sent, 0)
+        self.assertEqual(len(self.smtp.messages), 5)
+        self.assertEqual(EmailOutbox.objects.count(), 5)
+
+    def test_rejected_recipient_is_retried_with_backoff(self):
+        self.smtp.reject.add("user1@example.com")
+        self._enqueue(3)
+
+        result = deliver_outbox(rate=1000)
+
+        self.assertEqual((result.sent, result.retried, result.failed), (2, 1, 0))
+        self.assertEqual(sorted(self.smtp.recipients), ["user0@example.com", "user2@example.com"])
+        # 被拒的那封不影响同一连接上的其它邮件
+        self.assertEqual(self.smtp.connections, 1)
+
+        row = EmailOutbox.objects.get(idempotency_key="alert:1")
+        self.assertEqual(row.status, EmailOutbox.STATUS_PENDING)
+        self.assertEqual(row.attempts, 1)
+        self.assertGreater(row.next_attempt_at, timezone.now())
+        self.assertIn("SMTPRecipientsRefused", row.last_error)
+
+        # 退避时间没到，不会重试
+        self.assertEqual(deliver_outbox(rate=1000).retried, 0)
+
+    def test_gives_up_after_max_attempts(self):
+        self.smtp.reject.add("user0@example.com")
+        self._enqueue(1)
+
+        for _ in range(MAX_ATTEMPTS):
+            EmailOutbox.objects.update(next_attempt_at=timezone.now())
+            deliver_outbox(rate=1000)
+
+        row = EmailOutbox.objects.get()
+        self.assertEqual(row.status, EmailOutbox.STATUS_FAILED)
+        self.assertEqual(row.attempts, MAX_ATTEMPTS)
+
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_outbox(rate=1000).as_dict(), {"sent": 0, "retried": 0, "failed": 0})
+
+    def test_expired_lease_is_reclaimed(self):
+        self._enqueue(1)
+        # 模拟 worker 领取后崩溃：SENDING 且租约已过期
+        EmailOutbox.objects.update(
+            status=EmailOutbox.STATUS_SENDING,
+            next_attempt_at=timezone.now() - timedelta(seconds=1),
+        )
+
+        self.assertEqual(deliver_outbox(rate=1000).sent, 1)
+
+    def test_active_lease_is_not_claimed(self):
+        self._enqueue(1)
+        EmailOutbox.objects.update(
+            status=EmailOutbox.STATUS_SENDING,
+            next_attempt_at=timezone.now() + timedelta(minutes=5),
+        )
+
+        self.assertEqual(deliver_outbox(rate=1000).sent, 0)
+        self.assertEqual(self.smtp.messages, [])
+
+    def test_rate_limit(self):
+        limiter = RateLimiter(rate=1000, burst=2)
+        self.assertTrue(limiter.try_acquire())
+        self.assertTrue(limiter.try_acquire())
+        self.assertFalse(limiter.try_acquire())
+        self.assertGreater(limiter.acquire(), 0)
+
+
+class MailPoolTests(LocalSMTPTestCase):
+    def _submit(self, pool, n):
+        for i in range(n):
+            pool.submit(f"Subject {i}", "Hello", [f"user{i}@example.com"])
+
+    def test_worker_reuses_one_connection(self):
+        pool = MailPool(workers=1, queue_size=10)
+        self._submit(pool, 5)
+        pool.shutdown(timeout=5)
+
+        self.assertEqual(len(self.smtp.messages), 5)
+        self.assertEqual(self.smtp.connections, 1)
+        self.assertEqual(pool.stats()["sent"], 5)
+
+    def test_full_queue_rejects(self):
+        # 没有 worker：队列只进不出
+        pool = MailPool(workers=0, queue_size=2)
+        self._submit(pool, 2)
+
+        with self.assertRaises(MailQueueFull):
+            pool.submit("Overflow", "Hello", ["late@example.com"])
+
+        stats = pool.stats()
+        self.assertEqual(stats["submitted"], 2)
+        self.assertEqual(stats["rejected"], 1)
+        self.assertEqual(stats["queue_depth"], 2)
+
+    def test_shutdown_drains_queue(self):
+        pool = MailPool(workers=2, queue_size=50)
+        self._submit(pool, 20)
+        pool.shutdown(timeout=5)
+
+        self.assertEqual(sorted(self.smtp.recipients), sorted(f"user{i}@example.com" for i in range(20)))
+        self.assertEqual(pool.stats()["queue_depth"], 0)
+
+        with self.assertRaises(MailQueueFull):
+            pool.submit("After shutdown", "Hello", ["late@example.com"])
+
+
+class SQLiteCacheTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = f"{tmp.name}/cache.sqlite3"
+
+    def _cache(self, **options):
+        options.setdefault("LOCK_WAIT", 5)
+        return SQLiteCache(self.path, {"KEY_PREFIX": "test", "OPTIONS": options})
+
+    def test_expiry_and_zero_timeout(self):
+        cache = self._cache()
+        now = time.time()
+        cache.set("a", 1, timeout=60)
+        cache.set("b", 2, timeout=None)
+
+        with mock.patch("common.cache_backends.time.time", return_value=now + 61):
+            self.assertIsNone(cache.get("a"))
+            self.assertEqual(cache.get("b"), 2)
+
+        cache.set("b", 3, timeout=0)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["size"], 1)
+
+    def test_add_overwrites_only_expired_row(self):
+        cache = self._cache()
+        now = time.time()
+        cache.set("k", "old", timeout=10)
+
+        self.assertFalse(cache.add("k", "new", timeout=10))
+        self.assertEqual(cache.get("k"), "old")
+
+        with mock.patch("common.cache_backends.time.time", return_value=now + 11):
+            self.assertTrue(cache.add("k", "new", timeout=10))
+        self.assertEqual(cache.get("k"), "new")
+
+    def test_cull_keeps_latest_expiring(self):
+        cache = self._cache(MAX_ENTRIES=10, CULL_FREQUENCY=2)
+        for i in range(30):
+            cache.set(f"k{i}", i, timeout=100 + i)
+            self.assertLessEqual(cache.stats()["size"], 10)
+
+        self.assertEqual(cache.get("k29"), 29)
+        self.assertIsNone(cache.get("k0"))
+
+    def test_versioned_keys(self):
+        cache = self._cache()
+        cache.set("k", "v1", version=1)
+        cache.set("k", "v2", version=2)
+
+        self.assertEqual(cache.get("k", version=1), "v1")
+        self.assertEqual(cache.get("k", version=2), "v2")
+        self.assertIsNone(cache.get("k", version=3))
+
+    def test_get_or_set_single_loader(self):
+        cache = self._cache()
+        calls = []
+        results = []
+        barrier = threading.Barrier(8)
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.3)
+            return {"price": 42}
+
+        def worker():
+            barrier.wait()
+            results.append(cache.get_or_set("quote", loader, timeout=60))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"price": 42}] * 8)
+        self.assertIsNone(cache.get("quote:lock"))
+
+    def test_get_or_set_releases_lock_on_error(self):
+        cache = self._cache()
+
+        def broken():
+            raise RuntimeError("upstream down")
+
+        with self.assertRaises(RuntimeError):
+            cache.get_or_set("quote", broken, timeout=60)
+        self.assertIsNone(cache.get("quote:lock"))
+        self.assertIsNone(cache.get("quote"))
+
+        self.assertEqual(cache.get_or_set("quote", lambda: 7, timeout=60), 7)
+        self.assertIsNone(cache.get("quote:lock"))
+
+
+class LTTBTests(SimpleTestCase):
+    def test_keeps_endpoints_and_length(self):
+        x = np.arange(1000, dtype=float)
+        y = np.sin(x / 50)
+
+        for n in (3, 10, 150, 999):
+            with self.subTest(n=n):
+                idx = lttb(x, y, n)
+                self.assertEqual(len(idx), n)
+                self.assertEqual((idx[0], idx[-1]), (0, 999))
+                self.assertTrue(np.all(np.diff(idx) > 0))
+
+    def test_short_series_returned_whole(self):
+        x = np.arange(5, dtype=float)
+        self.assertEqual(lttb(x, x, 5).tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(lttb(x, x, 10).tolist(), [0, 1, 2, 3, 4])
+
+    def test_skips_nan_points(self):
+        y = np.array([np.nan, 1, 2, np.nan, 3, 4, np.nan])
+        x = np.arange(len(y), dtype=float)
+
+        self.assertEqual(lttb(x, y, 10).tolist(), [1, 2, 4, 5])
+        idx = lttb(x, y, 3)
+        self.assertEqual((idx[0], idx[-1]), (1, 5))
+        self.assertFalse(np.isnan(y[idx]).any())
+
+    def test_keeps_spike(self):
+        y = np.zeros(500)
+        y[250] = 100
+        self.assertIn(250, lttb(np.arange(500, dtype=float), y, 20).tolist())
+
+    def test_parse_target(self):
+        self.assertEqual(parse_target({}), (None, None))
+        self.assertEqual(parse_target({"points": "50", "resolution": "chart"}), (50, None))
+        self.assertEqual(parse_target({"resolution": "sparkline"}), (60, "sparkline"))
+        for params in ({"points": "2"}, {"points": "abc"}, {"resolution": "huge"}):
+            with self.subTest(params=params), self.assertRaises(ValueError):
+                parse_target(params)
@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+Long-lived endpoints (the /api/stocks/stream/ SSE feed) need this entry
+point, e.g. ``uvicorn config.asgi:application``; under WSGI every open
+stream would hold a worker thread.
 """
 
 import os
@@ -101,6 +101,11 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "config.wsgi.application"
+ASGI_APPLICATION = "config.asgi.application"
+
+# 以 ASGI 运行时（uvicorn config.asgi:application）设 ASYNC_VIEWS=1，
+# 单条 K 线 / 当前价格 / 新闻接口改用 async 视图
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "0") == "1"
 
 # -------------------------------------------------------------
 # DATABASE (sqlite3)
@@ -112,6 +117,34 @@ DATABASES = {
     }
 }
 
+# -------------------------------------------------------------
+# CACHE（多进程共享的 SQLite 文件，见 common/cache_backends.py）
+# -------------------------------------------------------------
+# 缓存内容的格式变化（升级后旧条目不兼容）时把 CACHE_VERSION 加 1
+# CACHE_BACKEND=locmem 时用进程内缓存（脚本 / 不需要共享的场景）；
+# manage.py test 通过 TEST_RUNNER 换成进程内缓存，不读写真实的缓存文件
+if os.getenv("CACHE_BACKEND", "sqlite") == "locmem":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "common.cache_backends.SQLiteCache",
+            "LOCATION": os.getenv("CACHE_LOCATION", BASE_DIR / "cache.sqlite3"),
+            "VERSION": int(os.getenv("CACHE_VERSION", "1")),
+            "KEY_PREFIX": "algotrading",
+            "OPTIONS": {
+                "MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", "20000")),
+                "CULL_FREQUENCY": 4,
+            },
+        }
+    }
+
+TEST_RUNNER = "common.test_runner.LocMemCacheRunner"
+
 # -------------------------------------------------------------
 # PASSWORD VALIDATORS
 # -------------------------------------------------------------
@@ -184,3 +217,7 @@ EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 
 DEFAULT_FROM_EMAIL = "AlgorithmTrading <algorithmtrading.noreply@gmail.com>"
+
+# 请求内即时邮件（验证码 / 订阅确认）的发送池：worker 数、队列上限（满了返回 429）
+MAIL_WORKERS = int(os.getenv("MAIL_WORKERS", "2"))
+MAIL_QUEUE_SIZE = int(os.getenv("MAIL_QUEUE_SIZE", "100"))
@@ -1,8 +1,10 @@
 # core/admin.py
 from django.contrib import admin
-from .models import UserProfile, Watchlist, EmailSubscription, Portfolio
+from .models import UserProfile, Watchlist, EmailSubscription, Portfolio, Holding, WatchlistEntry
 
 admin.site.register(UserProfile)
 admin.site.register(Watchlist)
 admin.site.register(EmailSubscription)
 admin.site.register(Portfolio)
+admin.site.register(Holding)
+admin.site.register(WatchlistEntry)
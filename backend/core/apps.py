@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # 注册 post_save：JSON 持仓 / 自选股 -> Holding / WatchlistEntry
+        from . import signals  # noqa: F401
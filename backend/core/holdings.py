@@ -0,0 +1,126 @@
+# core/holdings.py
+# ------------------------------------------------------------
+# 持仓 / 自选股的关系表（Holding / WatchlistEntry）
+#
+# Portfolio 的 JSON 持仓、Watchlist.symbols 仍然是 API 读写的数据源；
+# 每次保存后（core.signals）把它们展开成按 symbol 建了索引的行：
+#   - tracked_symbols()：所有被持有 / 关注的 symbol（预热行情用）
+#   - holders_of(symbol)：持有或关注某个 symbol 的用户
+# 都是索引查询，不需要把每个用户的 JSON 读出来解析。
+#
+# 注意：QuerySet.update() 不触发 post_save，绕过它改 JSON 后
+# 需要手动调用 sync_portfolio / sync_watchlist。
+# ------------------------------------------------------------
+
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q, QuerySet
+
+from .models import Holding, WatchlistEntry
+
+# Portfolio 上存放持仓的 JSON 字段：
+#   holdings             -> [{"symbol", "shares", "buy_price"}]
+#   portfolio1 / 2       -> {"name", "holdings": [...]}
+HOLDING_SOURCES = ("holdings", "portfolio1", "portfolio2")
+
+
+def normalize_symbol(value: Any) -> str:
+    return str(value or "").strip().upper()
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _positions(value: Any) -> List[Any]:
+    if isinstance(value, dict):
+        value = value.get("holdings")
+    return value if isinstance(value, list) else []
+
+
+def iter_holdings(portfolio: Any) -> Iterator[Dict[str, Any]]:
+    """
+    把一个 Portfolio 的 JSON 持仓展开成行
+
+    symbol 为空、格式不对的条目跳过
+    """
+    for source in HOLDING_SOURCES:
+        for position, h in enumerate(_positions(getattr(portfolio, source, None))):
+            if not isinstance(h, dict):
+                continue
+            symbol = normalize_symbol(h.get("symbol"))
+            if not symbol:
+                continue
+            yield {
+                "source": source,
+                "position": position,
+                "symbol": symbol,
+                "shares": _to_float(h.get("shares")),
+                "buy_price": _to_float(h.get("buy_price")),
+            }
+
+
+def iter_watchlist(watchlist: Any) -> Iterator[Dict[str, Any]]:
+    """Watchlist.symbols 展开成行（去空、去重、保持顺序）"""
+    symbols = watchlist.symbols if isinstance(watchlist.symbols, list) else []
+    uniq = dict.fromkeys(normalize_symbol(s) for s in symbols)
+    for position, symbol in enumerate(s for s in uniq if s):
+        yield {"symbol": symbol, "position": position}
+
+
+@transaction.atomic
+def sync_portfolio(portfolio: Any) -> int:
+    """用 JSON 持仓重建该组合的 Holding 行，返回行数"""
+    Holding.objects.filter(portfolio=portfolio).delete()
+    rows = [
+        Holding(portfolio=portfolio, user_id=portfolio.user_id, **row)
+        for row in iter_holdings(portfolio)
+    ]
+    Holding.objects.bulk_create(rows)
+    return len(rows)
+
+
+@transaction.atomic
+def sync_watchlist(watchlist: Any) -> int:
+    """用 Watchlist.symbols 重建 WatchlistEntry 行，返回行数"""
+    WatchlistEntry.objects.filter(watchlist=watchlist).delete()
+    rows = [
+        WatchlistEntry(watchlist=watchlist, user_id=watchlist.user_id, **row)
+        for row in iter_watchlist(watchlist)
+    ]
+    WatchlistEntry.objects.bulk_create(rows)
+    return len(rows)
+
+
+def tracked_symbols(holdings: bool = True, watchlists: bool = True) -> Set[str]:
+    """所有被持有 / 关注的 symbol"""
+    symbols: Set[str] = set()
+    if holdings:
+        symbols.update(Holding.objects.values_list("symbol", flat=True).distinct())
+    if watchlists:
+        symbols.update(WatchlistEntry.objects.values_list("symbol", flat=True).distinct())
+    return symbols
+
+
+def holders_of(symbol: str, holdings: bool = True, watchlists: bool = True) -> QuerySet:
+    """
+    持有（holdings=True）或关注（watchlists=True）symbol 的用户
+
+    :return: User QuerySet（去重）
+    """
+    symbol = normalize_symbol(symbol)
+    User = get_user_model()
+
+    q = Q()
+    if holdings:
+        q |= Q(pk__in=Holding.objects.filter(symbol=symbol).values("user_id"))
+    if watchlists:
+        q |= Q(pk__in=WatchlistEntry.objects.filter(symbol=symbol).values("user_id"))
+    if not q:
+        return User.objects.none()
+    return User.objects.filter(q)
@@ -0,0 +1,116 @@
+# Generated by Django 5.0.3 on 2026-10-18 18:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# 解析逻辑从 core/holdings.py 复制而来（migration 不引用应用代码，之后修改不影响这里）
+HOLDING_SOURCES = ("holdings", "portfolio1", "portfolio2")
+
+
+def normalize_symbol(value):
+    return str(value or "").strip().upper()
+
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def positions(value):
+    if isinstance(value, dict):
+        value = value.get("holdings")
+    return value if isinstance(value, list) else []
+
+
+def iter_holdings(portfolio):
+    for source in HOLDING_SOURCES:
+        for position, h in enumerate(positions(getattr(portfolio, source, None))):
+            if not isinstance(h, dict):
+                continue
+            symbol = normalize_symbol(h.get("symbol"))
+            if not symbol:
+                continue
+            yield {
+                "source": source,
+                "position": position,
+                "symbol": symbol,
+                "shares": to_float(h.get("shares")),
+                "buy_price": to_float(h.get("buy_price")),
+            }
+
+
+def iter_watchlist(watchlist):
+    symbols = watchlist.symbols if isinstance(watchlist.symbols, list) else []
+    uniq = dict.fromkeys(normalize_symbol(s) for s in symbols)
+    for position, symbol in enumerate(s for s in uniq if s):
+        yield {"symbol": symbol, "position": position}
+
+
+def backfill(apps, schema_editor):
+    Portfolio = apps.get_model("core", "Portfolio")
+    Watchlist = apps.get_model("core", "Watchlist")
+    Holding = apps.get_model("core", "Holding")
+    WatchlistEntry = apps.get_model("core", "WatchlistEntry")
+
+    Holding.objects.bulk_create(
+        [
+            Holding(portfolio_id=p.id, user_id=p.user_id, **row)
+            for p in Portfolio.objects.iterator()
+            for row in iter_holdings(p)
+        ],
+        batch_size=1000,
+    )
+    WatchlistEntry.objects.bulk_create(
+        [
+            WatchlistEntry(watchlist_id=w.id, user_id=w.user_id, **row)
+            for w in Watchlist.objects.iterator()
+            for row in iter_watchlist(w)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_portfolio_holdings_portfolio_portfolio1_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Holding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=16)),
+                ('position', models.PositiveIntegerField()),
+                ('symbol', models.CharField(max_length=32)),
+                ('shares', models.FloatField(blank=True, null=True)),
+                ('buy_price', models.FloatField(blank=True, null=True)),
+                ('portfolio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holding_rows', to='core.portfolio')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['symbol', 'user'], name='core_holdin_symbol_6bf810_idx')],
+                'unique_together': {('portfolio', 'source', 'position')},
+            },
+        ),
+        migrations.CreateModel(
+            name='WatchlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=32)),
+                ('position', models.PositiveIntegerField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('watchlist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='core.watchlist')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['symbol', 'user'], name='core_watchl_symbol_ce6f00_idx')],
+                'unique_together': {('watchlist', 'symbol')},
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
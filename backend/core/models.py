@@ -108,3 +108,47 @@ class Portfolio(models.Model):
 
     def __str__(self):
         return f"{self.user} - {self.name}"
+
+
+class Holding(models.Model):
+    """
+    Normalized copy of the JSON holdings on Portfolio
+    (holdings / portfolio1 / portfolio2), one row per position.
+    Kept in sync by core.signals; query this instead of parsing JSON.
+    """
+    portfolio = models.ForeignKey(Portfolio, on_delete=models.CASCADE, related_name="holding_rows")
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    source = models.CharField(max_length=16)          # 来自哪个 JSON 字段
+    position = models.PositiveIntegerField()          # 在 JSON 列表里的顺序
+    symbol = models.CharField(max_length=32)
+    shares = models.FloatField(blank=True, null=True)
+    buy_price = models.FloatField(blank=True, null=True)
+
+    class Meta:
+        unique_together = ("portfolio", "source", "position")
+        indexes = [
+            models.Index(fields=["symbol", "user"]),  # ✅ 谁持有 X
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.symbol}"
+
+
+class WatchlistEntry(models.Model):
+    """
+    Normalized copy of Watchlist.symbols, one row per symbol.
+    Kept in sync by core.signals.
+    """
+    watchlist = models.ForeignKey(Watchlist, on_delete=models.CASCADE, related_name="entries")
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    symbol = models.CharField(max_length=32)
+    position = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ("watchlist", "symbol")
+        indexes = [
+            models.Index(fields=["symbol", "user"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.symbol}"
@@ -0,0 +1,30 @@
+# core/signals.py
+# ------------------------------------------------------------
+# Portfolio / Watchlist 保存后同步关系表（Holding / WatchlistEntry）
+# 删除时由外键 CASCADE 一并删除
+# ------------------------------------------------------------
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .holdings import HOLDING_SOURCES, sync_portfolio, sync_watchlist
+from .models import Portfolio, Watchlist
+
+
+def _touches(update_fields, fields) -> bool:
+    """save(update_fields=...) 没有改到这些字段时不需要同步"""
+    return update_fields is None or bool(set(update_fields) & set(fields))
+
+
+@receiver(post_save, sender=Portfolio, dispatch_uid="core.sync_portfolio_holdings")
+def portfolio_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _touches(update_fields, HOLDING_SOURCES):
+        return
+    sync_portfolio(instance)
+
+
+@receiver(post_save, sender=Watchlist, dispatch_uid="core.sync_watchlist_entries")
+def watchlist_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _touches(update_fields, ("symbols",)):
+        return
+    sync_watchlist(instance)
@@ -1,3 +1,221 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
 from django.test import TestCase
 
-# Create your tests here.
+from common.mailer import MailQueueFull
+
+from .holdings import holders_of, iter_holdings, tracked_symbols
+from .valuation import collect_symbols, value_portfolios
+from .models import EmailSubscription, Holding, Portfolio, Watchlist, WatchlistEntry
+
+URL = "/api/core/email-subscription/"
+
+
+@mock.patch("core.views.send_mail_async", side_effect=MailQueueFull("full"))
+class EmailSubscriptionMailQueueTests(TestCase):
+    """发送队列满时：订阅返回 429 且不留下记录；取消订阅照常成功"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("alice", password="pw")
+        self.client.force_login(self.user)
+
+    def test_subscribe_returns_429_and_rolls_back(self, _send):
+        response = self.client.post(URL, {"email": "a@example.com"}, content_type="application/json")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "5")
+        self.assertFalse(EmailSubscription.objects.filter(user=self.user).exists())
+
+    def test_unsubscribe_succeeds_when_queue_is_full(self, send):
+        sub = EmailSubscription.objects.create(user=self.user, email="a@example.com")
+
+        response = self.client.delete(URL, {"id": sub.id}, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(EmailSubscription.objects.filter(pk=sub.pk).exists())
+        send.assert_called_once()
+
+
+class HoldingSyncTests(TestCase):
+    """post_save 之后 Holding / WatchlistEntry 与 JSON 一致"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("bob", password="pw")
+
+    def _rows(self, portfolio):
+        return list(
+            Holding.objects.filter(portfolio=portfolio)
+            .order_by("source", "position")
+            .values("source", "position", "symbol", "shares", "buy_price")
+        )
+
+    def _expected(self, portfolio):
+        return sorted(iter_holdings(portfolio), key=lambda r: (r["source"], r["position"]))
+
+    def test_create_syncs_all_sources(self):
+        p = Portfolio.objects.create(
+            user=self.user,
+            name="main",
+            holdings=[{"symbol": " msft ", "shares": "2", "buy_price": 300}, {"symbol": ""}, "junk"],
+        )
+
+        self.assertEqual(self._rows(p), self._expected(p))
+        # 默认的 portfolio1 / portfolio2 各 3 只 + holdings 里有效的 1 只
+        self.assertEqual(len(self._rows(p)), 7)
+        self.assertIn({"source": "holdings", "position": 0, "symbol": "MSFT", "shares": 2.0, "buy_price": 300.0}, self._rows(p))
+
+    def test_update_replaces_rows(self):
+        p = Portfolio.objects.create(user=self.user, name="main")
+
+        p.portfolio1 = {"name": "P1", "holdings": [{"symbol": "AMZN", "shares": 5, "buy_price": 100}]}
+        p.portfolio2 = {"name": "P2", "holdings": []}
+        p.save()
+
+        self.assertEqual(self._rows(p), self._expected(p))
+        self.assertEqual(tracked_symbols(watchlists=False), {"AMZN"})
+
+    def test_update_fields_without_json_skips_sync(self):
+        p = Portfolio.objects.create(user=self.user, name="main")
+        before = self._rows(p)
+
+        p.portfolio1 = {"name": "P1", "holdings": [{"symbol": "AMZN", "shares": 1}]}
+        p.name = "renamed"
+        p.save(update_fields=["name"])
+        self.assertEqual(self._rows(p), before)
+
+        p.save(update_fields=["portfolio1"])
+        self.assertEqual(self._rows(p), self._expected(p))
+
+    def test_watchlist_sync(self):
+        w = Watchlist.objects.create(user=self.user, symbols=["aapl", "NVDA", "AAPL", ""])
+
+        def entries():
+            return list(
+                WatchlistEntry.objects.filter(watchlist=w).order_by("position").values_list("symbol", flat=True)
+            )
+
+        self.assertEqual(entries(), ["AAPL", "NVDA"])
+
+        w.symbols = ["TSLA"]
+        w.save(update_fields=["symbols"])
+        self.assertEqual(entries(), ["TSLA"])
+        self.assertEqual(list(holders_of("tsla", holdings=False)), [self.user])
+
+
+VALUATION_URL = "/api/core/portfolios/valuation/"
+
+QUOTES = {
+    "AAPL": {"symbol": "AAPL", "price": 110.0, "previous_close": 105.0},
+    "MSFT": {"symbol": "MSFT", "price": 190.0, "previous_close": 200.0},
+    "TSLA": {"symbol": "TSLA", "price": 50.0, "previous_close": 40.0},
+}
+
+
+def fake_prices(symbols):
+    """get_current_prices 的替身：QUOTES 里没有的 symbol 算取报价失败"""
+    quotes = {s: QUOTES[s] for s in symbols if s in QUOTES}
+    errors = {s: "no quote" for s in symbols if s not in QUOTES}
+    return quotes, errors
+
+
+@mock.patch("core.valuation.get_current_prices", side_effect=fake_prices)
+class PortfolioValuationTests(TestCase):
+    """组合估值的汇总；已存储的 JSON 格式不对时跳过坏条目而不是 500"""
+
+    HOLDINGS = [
+        {"symbol": "aapl", "shares": 10, "buy_price": 100},
+        {"symbol": "MSFT", "shares": "5", "buy_price": "200"},
+        {"symbol": "TSLA", "shares": 2},
+        {"symbol": "NOQ", "shares": 1, "buy_price": 10},
+    ]
+
+    def setUp(self):
+        self.user = User.objects.create_user("carol", password="pw")
+        self.client.force_login(self.user)
+
+    def test_totals(self, _prices):
+        (valuation,), errors = value_portfolios([{"name": "main", "holdings": self.HOLDINGS}])
+
+        self.assertEqual(errors, {"NOQ": "no quote"})
+        self.assertEqual(valuation["name"], "main")
+        self.assertEqual(valuation["missing"], ["NOQ"])
+        # 缺买入价的 TSLA 不计入成本和盈亏；缺报价的 NOQ 不计入任何汇总
+        self.assertEqual(valuation["totals"], {
+            "market_value": 2150.0,
+            "cost_basis": 2000.0,
+            "unrealized_pnl": 50.0,
+            "unrealized_pnl_pct": 2.5,
+            "day_change": 20.0,
+            "day_change_pct": 0.939,
+        })
+
+        rows = {r["symbol"]: r for r in valuation["holdings"]}
+        self.assertEqual([r["weight"] for r in valuation["holdings"]], [51.1628, 44.186, 4.6512, None])
+        self.assertEqual(rows["AAPL"]["unrealized_pnl_pct"], 10.0)
+        self.assertEqual(rows["MSFT"]["day_change"], -50.0)
+        self.assertIsNone(rows["TSLA"]["unrealized_pnl"])
+        self.assertIsNone(rows["NOQ"]["market_value"])
+
+    def test_one_quote_request_for_all_portfolios(self, prices):
+        portfolios = [
+            {"holdings": [{"symbol": "AAPL", "shares": 1}, {"symbol": "msft", "shares": 1}]},
+            {"holdings": [{"symbol": "MSFT", "shares": 1}, {"symbol": " "}]},
+        ]
+
+        value_portfolios(portfolios)
+
+        prices.assert_called_once_with(["AAPL", "MSFT"])
+
+    def test_malformed_entries_are_skipped(self, _prices):
+        portfolios = [
+            {"holdings": [{"symbol": "AAPL", "shares": 1}, "junk", None, ["MSFT", 1]]},
+            {"holdings": "AAPL"},
+            ["not", "a", "portfolio"],
+        ]
+        self.assertEqual(collect_symbols(portfolios), ["AAPL"])
+
+        valuations, _ = value_portfolios(portfolios)
+
+        self.assertEqual([r["symbol"] for r in valuations[0]["holdings"]], ["AAPL"])
+        self.assertEqual(valuations[1]["holdings"], [])
+        self.assertEqual(valuations[2]["holdings"], [])
+        self.assertIsNone(valuations[2]["name"])
+
+    def test_get_with_malformed_stored_portfolio(self, _prices):
+        p = Portfolio.objects.create(
+            user=self.user,
+            name="main",
+            portfolio1={"name": "P1", "holdings": [{"symbol": "AAPL", "shares": 10, "buy_price": 100}, "junk"]},
+            portfolio2=["junk"],
+        )
+
+        response = self.client.get(VALUATION_URL)
+
+        self.assertEqual(response.status_code, 200)
+        first, second = response.json()["portfolios"]
+        self.assertEqual((first["id"], first["field"], first["name"]), (p.id, "portfolio1", "P1"))
+        self.assertEqual(first["totals"]["market_value"], 1100.0)
+        self.assertEqual((second["field"], second["holdings"]), ("portfolio2", []))
+
+    def test_post_values_unsaved_holdings(self, _prices):
+        body = {"portfolios": [{"name": "draft", "holdings": self.HOLDINGS}]}
+
+        response = self.client.post(VALUATION_URL, body, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        (valuation,) = response.json()["portfolios"]
+        self.assertEqual(valuation["totals"]["market_value"], 2150.0)
+        self.assertNotIn("id", valuation)
+
+    def test_post_rejects_malformed_body(self, prices):
+        for body in (
+            "not json",
+            {"portfolios": {}},
+            {"portfolios": [{"holdings": "AAPL"}]},
+            {"portfolios": [{"holdings": ["AAPL"]}]},
+        ):
+            with self.subTest(body=body):
+                response = self.client.post(VALUATION_URL, body, content_type="application/json")
+                self.assertEqual(response.status_code, 400)
+        prices.assert_not_called()
@@ -0,0 +1,150 @@
+# core/valuation.py
+# ------------------------------------------------------------
+# 组合估值 / 盈亏（服务端计算）
+#
+# - 一个用户所有组合里的 symbol 去重后一次批量取报价
+#   （finance 的共享报价缓存：多个用户持有同一只股票时只请求一次上游）
+# - 每个组合的持仓转成 numpy 数组，一次算出市值、成本、
+#   未实现盈亏、日涨跌、权重；缺报价 / 缺买入价的位置为 NaN，
+#   汇总时跳过，输出为 None
+# ------------------------------------------------------------
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from finance.price_service import get_current_prices
+
+# 组合 JSON 里存放持仓的字段（Portfolio.portfolio1 / portfolio2）
+PORTFOLIO_FIELDS = ("portfolio1", "portfolio2")
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _normalize_symbol(value: Any) -> str:
+    return str(value or "").strip().upper()
+
+
+def _nullable(values: np.ndarray, ndigits: int) -> List[Optional[float]]:
+    return [None if np.isnan(v) else round(float(v), ndigits) for v in values]
+
+
+def _scalar(value: float, ndigits: int) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), ndigits)
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    """num / den * 100，den 为 0 / NaN 时为 NaN"""
+    out = np.full(np.shape(num), np.nan)
+    ok = ~np.isnan(den) & (den != 0)
+    np.divide(num, den, out=out, where=ok)
+    return out * 100
+
+
+def _total(values: np.ndarray) -> float:
+    """忽略 NaN 求和；全是 NaN 时返回 NaN"""
+    return float(np.nansum(values)) if np.any(~np.isnan(values)) else np.nan
+
+
+def _holdings(portfolio: Any) -> List[Mapping[str, Any]]:
+    """
+    组合里可以估值的持仓：格式不对（不是 dict）或 symbol 为空的条目跳过
+
+    GET 估值读的是已存储的 JSON，不能假定格式一定正确
+    """
+    holdings = portfolio.get("holdings") if isinstance(portfolio, Mapping) else None
+    if not isinstance(holdings, list):
+        return []
+    return [h for h in holdings if isinstance(h, Mapping) and _normalize_symbol(h.get("symbol"))]
+
+
+def collect_symbols(portfolios: Iterable[Any]) -> List[str]:
+    """所有组合里的 symbol（去重、保持顺序）"""
+    symbols = (_normalize_symbol(h.get("symbol")) for p in portfolios for h in _holdings(p))
+    return list(dict.fromkeys(symbols))
+
+
+def value_portfolio(portfolio: Any, quotes: Mapping[str, Mapping[str, Any]]) -> Dict[str, Any]:
+    """
+    :param portfolio: {"name", "holdings": [{"symbol", "shares", "buy_price"}]}
+    :param quotes: symbol -> get_current_price 的返回值
+    """
+    holdings = _holdings(portfolio)
+    symbols = [_normalize_symbol(h.get("symbol")) for h in holdings]
+
+    shares = np.array([_to_float(h.get("shares")) for h in holdings], dtype=float)
+    buy = np.array([_to_float(h.get("buy_price")) for h in holdings], dtype=float)
+    price = np.array([_to_float((quotes.get(s) or {}).get("price")) for s in symbols], dtype=float)
+    prev = np.array([_to_float((quotes.get(s) or {}).get("previous_close")) for s in symbols], dtype=float)
+
+    market_value = shares * price
+    cost_basis = shares * buy
+    pnl = market_value - cost_basis
+    prev_value = shares * prev
+    day_change = market_value - prev_value
+
+    total_value = _total(market_value)
+    weights = (
+        market_value / total_value * 100
+        if not np.isnan(total_value) and total_value != 0
+        else np.full(len(holdings), np.nan)
+    )
+
+    # 汇总只算两边都有数据的持仓，避免缺买入价的持仓把盈亏算偏
+    has_pnl = ~np.isnan(pnl)
+    has_day = ~np.isnan(day_change)
+    total_cost = _total(cost_basis[has_pnl])
+    total_pnl = _total(pnl)
+    total_prev = _total(prev_value[has_day])
+    total_day = _total(day_change)
+
+    rows = []
+    columns = {
+        "price": _nullable(price, 4),
+        "previous_close": _nullable(prev, 4),
+        "market_value": _nullable(market_value, 2),
+        "cost_basis": _nullable(cost_basis, 2),
+        "unrealized_pnl": _nullable(pnl, 2),
+        "unrealized_pnl_pct": _nullable(_ratio(pnl, cost_basis), 4),
+        "day_change": _nullable(day_change, 2),
+        "day_change_pct": _nullable(_ratio(day_change, prev_value), 4),
+        "weight": _nullable(weights, 4),
+    }
+    for i, (h, s) in enumerate(zip(holdings, symbols)):
+        row = {
+            "symbol": s,
+            "shares": _scalar(shares[i], 6),
+            "buy_price": _scalar(buy[i], 4),
+        }
+        row.update({k: v[i] for k, v in columns.items()})
+        rows.append(row)
+
+    return {
+        "name": portfolio.get("name") if isinstance(portfolio, Mapping) else None,
+        "holdings": rows,
+        "totals": {
+            "market_value": _scalar(total_value, 2),
+            "cost_basis": _scalar(total_cost, 2),
+            "unrealized_pnl": _scalar(total_pnl, 2),
+            "unrealized_pnl_pct": _scalar(_ratio(np.array(total_pnl), np.array(total_cost)), 4),
+            "day_change": _scalar(total_day, 2),
+            "day_change_pct": _scalar(_ratio(np.array(total_day), np.array(total_prev)), 4),
+        },
+        "missing": sorted({s for s, p in zip(symbols, price) if np.isnan(p)}),
+    }
+
+
+def value_portfolios(portfolios: List[Any]) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """
+    批量估值：所有组合共用一次报价查询
+
+    :return: (valuations, errors)
+        errors: symbol -> 取报价失败的原因
+    """
+    quotes, errors = get_current_prices(collect_symbols(portfolios))
+    return [value_portfolio(p, quotes) for p in portfolios], errors
@@ -1,20 +1,31 @@
 # core/views.py
 import json
+import logging
 import profile
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
-from django.core.mail import send_mail
 from django.conf import settings
-from market_sentiment.services.alert_logic import classify, handle_alert
+from finance.snapshot import get_snapshots
+from common.mailer import MailQueueFull, send_mail_async
+from common.outbox import enqueue_emails
+from market_sentiment.models import MarketSentiment
+from market_sentiment.services.alert_logic import classify, evaluate_alerts_bulk
 import os
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 
 from market_sentiment.services.fetcher import fetch_daily_latest
 
 
 
 from .models import UserProfile, Watchlist, EmailSubscription, Portfolio
+from .valuation import PORTFOLIO_FIELDS, collect_symbols, value_portfolios
+
+logger = logging.getLogger(__name__)
+
+# POST /portfolios/valuation/ 一次最多估值的组合数 / symbol 数
+MAX_VALUATION_PORTFOLIOS = 10
+MAX_VALUATION_SYMBOLS = 200
 
 
 @login_required
@@ -95,6 +106,32 @@ def watchlist_api(request):
 
     return JsonResponse(wl.symbols, safe=False)
 
+@login_required
+@require_http_methods(["GET"])
+def watchlist_snapshot_api(request):
+    """
+    GET -> watchlist 里每个 symbol 的报价 + 日涨跌 + sparkline（一次请求）
+
+    {
+        "items": [{"symbol", "price", "time", "market_state", "previous_close",
+                   "change", "change_pct", "sparkline": {"time": [...], "close": [...]}}],
+        "errors": {"XXXX": "..."}
+    }
+    """
+    wl, _ = Watchlist.objects.get_or_create(user=request.user)
+    items, errors = get_snapshots(wl.symbols)
+    return JsonResponse({"items": items, "errors": errors})
+
+
+def _mail_busy():
+    response = JsonResponse(
+        {"error": "Too many requests, please try again shortly"},
+        status=429,
+    )
+    response["Retry-After"] = "5"
+    return response
+
+
 @login_required
 @require_http_methods(["GET", "POST", "PATCH", "DELETE"])
 def email_subscription_api(request):
@@ -147,18 +184,21 @@ def email_subscription_api(request):
                 status=400,
             )
 
-        # ✅ 订阅成功邮件
-        send_mail(
-            subject="Market Sentiment Alerts Enabled",
-            message=(
-                "You have subscribed to Market Sentiment alerts.\n\n"
-                "You will receive emails when the Fear & Greed Index "
-                "enters or exits extreme conditions."
-            ),
-            from_email=os.environ.get("EMAIL_HOST_USER"),
-            recipient_list=[email],
-            fail_silently=False,
-        )
+        # ✅ 订阅成功邮件（发送池异步发送；队列满时撤销订阅，返回 429）
+        try:
+            send_mail_async(
+                "Market Sentiment Alerts Enabled",
+                (
+                    "You have subscribed to Market Sentiment alerts.\n\n"
+                    "You will receive emails when the Fear & Greed Index "
+                    "enters or exits extreme conditions."
+                ),
+                email,
+                from_email=os.environ.get("EMAIL_HOST_USER"),
+            )
+        except MailQueueFull:
+            sub.delete()
+            return _mail_busy()
 
         # ⚠️ 关键：返回前端需要的数据
         return JsonResponse(
@@ -197,17 +237,19 @@ def email_subscription_api(request):
         email = sub.email
         sub.delete()
 
-        # ✅ 取消订阅邮件
-        send_mail(
-            subject="Market Sentiment Alerts Disabled",
-            message=(
-                "You have been unsubscribed from Market Sentiment alerts.\n\n"
-                "You will no longer receive these emails."
-            ),
-            from_email=os.environ.get("EMAIL_HOST_USER"),
-            recipient_list=[email],
-            fail_silently=False,
-        )
+        # ✅ 取消订阅总是成功；通知邮件尽力发送，队列满时只记日志
+        try:
+            send_mail_async(
+                "Market Sentiment Alerts Disabled",
+                (
+                    "You have been unsubscribed from Market Sentiment alerts.\n\n"
+                    "You will no longer receive these emails."
+                ),
+                email,
+                from_email=os.environ.get("EMAIL_HOST_USER"),
+            )
+        except MailQueueFull:
+            logger.warning("Mail queue full, skipped unsubscribe notice to %s", email)
 
         return JsonResponse({"ok": True})
 
@@ -218,58 +260,68 @@ def run_market_sentiment_alerts(request):
     Call once per day (cron / manual).
     """
 
-    # 1️⃣ 拿最新 Fear & Greed score
-    result = fetch_daily_latest()
+    # 1️⃣ 抓取并写入最新数据，再从库里拿最新 Fear & Greed score
+    fetch_daily_latest()
 
-    # 你 fetcher 如果直接返回 score
-    score = float(result["score"]) if isinstance(result, dict) else float(result)
+    latest = (
+        MarketSentiment.objects
+        .filter(index_name="fear_and_greed")
+        .order_by("-date")
+        .first()
+    )
+    if not latest:
+        return JsonResponse({"ok": False, "error": "No Fear & Greed data found"}, status=503)
+
+    score = float(latest.score)
 
     # 2️⃣ 算市场状态
     state = classify(score)
 
-    # 3️⃣ 对所有订阅跑 alert logic
+    # 3️⃣ 对所有订阅批量跑 alert logic（按状态分组的 UPDATE，事件流式产出）
+    #    邮件只写入 outbox，由 send_outbox worker 复用 SMTP 连接分批发送；
+    #    idempotency key 含日期（状态变化还含目标状态），重跑同一天不会重复入队，
+    #    同一天内的第二次状态变化（FEAR -> PANIC）仍会入队
+    #    状态更新和入队在同一个事务里：入队失败时状态回滚，下次重跑还会产生事件
     subs = EmailSubscription.objects.filter(enabled=True)
+    from_email = os.environ.get("EMAIL_HOST_USER")
 
-    sent = 0
-
-    for sub in subs:
-        events = handle_alert(sub, state)
-
-        for ev in events:
+    def messages():
+        for ev in evaluate_alerts_bulk(subs, state):
             if ev["type"] == "STATE_CHANGE":
-                send_mail(
-                    subject=f"Market Alert: {ev['to'].replace('_', ' ')}",
-                    message=(
+                yield {
+                    "key": f"sentiment-alert:{latest.date}:{ev['subscription_id']}:{ev['type']}:{ev['to']}",
+                    "to": ev["email"],
+                    "from_email": from_email,
+                    "subject": f"Market Alert: {ev['to'].replace('_', ' ')}",
+                    "body": (
                         f"Market sentiment has changed.\n\n"
                         f"Previous state: {ev['from']}\n"
                         f"Current state: {ev['to']}\n\n"
                         f"Fear & Greed score: {score}"
                     ),
-                    from_email=os.environ.get("EMAIL_HOST_USER"),
-                    recipient_list=[sub.email],
-                    fail_silently=False,
-                )
-                sent += 1
+                }
 
             elif ev["type"] == "PANIC_PERSIST":
-                send_mail(
-                    subject="Market Alert: Panic Persists",
-                    message=(
+                yield {
+                    "key": f"sentiment-alert:{latest.date}:{ev['subscription_id']}:{ev['type']}",
+                    "to": ev["email"],
+                    "from_email": from_email,
+                    "subject": "Market Alert: Panic Persists",
+                    "body": (
                         "The market remains in a PANIC state.\n\n"
                         "Fear & Greed Index is below 10.\n"
                         "This reminder is sent every 2 days while panic persists."
                     ),
-                    from_email=os.environ.get("EMAIL_HOST_USER"),
-                    recipient_list=[sub.email],
-                    fail_silently=False,
-                )
-                sent += 1
+                }
+
+    with transaction.atomic():
+        queued = enqueue_emails(messages())
 
     return JsonResponse({
         "ok": True,
         "score": score,
         "state": state,
-        "emails_sent": sent,
+        "emails_queued": queued,
     })
 
 
@@ -349,6 +401,78 @@ def portfolio_list_api(request):
         status=201,
     )
 
+def _parse_valuation_body(request):
+    """
+    POST body：{"portfolios": [{"name", "holdings": [{"symbol", "shares", "buy_price"}]}]}
+
+    :raises ValueError: 格式不对 / 组合或 symbol 太多
+    """
+    try:
+        body = json.loads(request.body or "{}")
+    except json.JSONDecodeError:
+        raise ValueError("invalid JSON")
+
+    portfolios = body.get("portfolios") if isinstance(body, dict) else None
+    if not isinstance(portfolios, list) or not all(
+        isinstance(p, dict) and isinstance(p.get("holdings", []), list)
+        and all(isinstance(h, dict) for h in p.get("holdings", []))
+        for p in portfolios
+    ):
+        raise ValueError("portfolios must be a list of {name, holdings: [...]}")
+    if len(portfolios) > MAX_VALUATION_PORTFOLIOS:
+        raise ValueError(f"At most {MAX_VALUATION_PORTFOLIOS} portfolios allowed")
+    if len(collect_symbols(portfolios)) > MAX_VALUATION_SYMBOLS:
+        raise ValueError(f"At most {MAX_VALUATION_SYMBOLS} symbols allowed")
+    return portfolios
+
+
+@login_required
+@require_http_methods(["GET", "POST"])
+def portfolio_valuation_api(request):
+    """
+    GET  -> 当前用户所有组合（portfolio1 / portfolio2）的估值和盈亏
+    POST -> 对 body 里的组合估值（页面正在编辑、尚未保存的持仓），
+            返回的 portfolios 与请求顺序一致，不带 id / field
+
+    {
+        "portfolios": [{
+            "id", "field", "name",
+            "holdings": [{"symbol", "shares", "buy_price", "price", "previous_close",
+                          "market_value", "cost_basis", "unrealized_pnl", "unrealized_pnl_pct",
+                          "day_change", "day_change_pct", "weight"}],
+            "totals": {"market_value", "cost_basis", "unrealized_pnl", "unrealized_pnl_pct",
+                       "day_change", "day_change_pct"},
+            "missing": [没有报价的 symbol],
+        }],
+        "errors": {"XXXX": "..."}
+    }
+    """
+    if request.method == "POST":
+        try:
+            portfolios = _parse_valuation_body(request)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        valuations, errors = value_portfolios(portfolios)
+        return JsonResponse({"portfolios": valuations, "errors": errors})
+
+    sources = []
+    for p in Portfolio.objects.filter(user=request.user).order_by("id"):
+        for field in PORTFOLIO_FIELDS:
+            data = getattr(p, field) or {}
+            sources.append((p.id, field, data))
+
+    valuations, errors = value_portfolios([data for _, _, data in sources])
+
+    return JsonResponse({
+        "portfolios": [
+            {"id": pid, "field": field, **valuation}
+            for (pid, field, _), valuation in zip(sources, valuations)
+        ],
+        "errors": errors,
+    })
+
+
 @login_required
 @require_http_methods(["PATCH"])
 def portfolio_detail_api(request, portfolio_id):
@@ -0,0 +1,97 @@
+# finance/async_http.py
+# ------------------------------------------------------------
+# async 版本的 HTTP GET（ASGI 部署下的 async 视图使用）
+#
+# 共享 httpx.AsyncClient：连接池 + keep-alive + 超时。
+# AsyncClient 绑定在事件循环上，因此每个事件循环一个实例；
+# ASGI 服务器下整个进程只有一个循环，所有请求共用同一个连接池。
+# ------------------------------------------------------------
+
+from __future__ import annotations
+
+import asyncio
+import time
+import weakref
+from typing import Any, Dict, Optional
+
+import httpx
+
+from .http_helper import HEADERS, backoff_delay, is_chart_response
+
+# 单进程可同时挂起的上游连接数
+MAX_CONNECTIONS = 200
+MAX_KEEPALIVE_CONNECTIONS = 50
+
+TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """返回当前事件循环共享的 AsyncClient（懒加载）"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            headers=HEADERS,
+            timeout=TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            follow_redirects=True,
+        )
+        _clients[loop] = client
+    return client
+
+
+async def async_get(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+) -> httpx.Response:
+    kwargs: Dict[str, Any] = {"params": params, "headers": headers}
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    return await get_async_client().get(url, **kwargs)
+
+
+async def async_http_get(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    retries: int = 3,
+    delay: float = 0.6,
+) -> Dict[str, Any]:
+    """
+    http_get 的 async 版本（带重试与反缓存），行为与 http_get 一致
+
+    :raises RuntimeError: 多次重试失败
+    """
+    if params is None:
+        params = {}
+
+    last_err: Optional[Exception] = None
+
+    for attempt in range(retries):
+        try:
+            full_params = dict(params)
+            full_params["_"] = int(time.time() * 1000)
+
+            resp = await async_get(url, params=full_params)
+            resp.raise_for_status()
+
+            js = resp.json()
+            if is_chart_response(js):
+                return js
+
+            last_err = RuntimeError("Invalid Yahoo Finance response structure")
+        except Exception as e:
+            last_err = e
+
+        if attempt < retries - 1:
+            await asyncio.sleep(backoff_delay(attempt, delay))
+
+    raise RuntimeError(f"HTTP request failed: {last_err}")
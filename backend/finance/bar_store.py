@@ -0,0 +1,47 @@
+# finance/bar_store.py
+# ------------------------------------------------------------
+# 1m K 线本地存储（IntradaySession 表）的读写
+# ------------------------------------------------------------
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from django.db import IntegrityError
+
+from .models import IntradaySession
+
+
+def get_session(symbol: str, trading_date: date) -> Optional[IntradaySession]:
+    return (
+        IntradaySession.objects
+        .filter(symbol=symbol, trading_date=trading_date)
+        .first()
+    )
+
+
+def save_session(
+    symbol: str,
+    trading_date: date,
+    bars: List[Dict[str, Any]],
+    last_timestamp: Optional[int],
+    complete: bool,
+) -> None:
+    defaults = {
+        "bars": bars,
+        "last_timestamp": last_timestamp,
+        "complete": complete,
+    }
+    try:
+        IntradaySession.objects.update_or_create(
+            symbol=symbol,
+            trading_date=trading_date,
+            defaults=defaults,
+        )
+    except IntegrityError:
+        # 并发请求同时创建同一条记录：另一方已插入，改为更新
+        IntradaySession.objects.filter(
+            symbol=symbol,
+            trading_date=trading_date,
+        ).update(**defaults)
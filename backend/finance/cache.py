@@ -0,0 +1,157 @@
+# finance/cache.py
+# ------------------------------------------------------------
+# 进程内 TTL + LRU 缓存（线程安全）
+#
+# - 每个 key 有自己的过期时间
+# - 超过 maxsize 时淘汰最久未使用的 key
+# - get_or_load(): 同一个 key 并发 miss 时只有一个线程去加载，
+#   其它线程等待同一个结果（single-flight）
+# ------------------------------------------------------------
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Tuple, Union
+
+# ttl 可以是固定秒数，也可以是 value -> 秒数 的函数
+TTL = Union[float, Callable[[Any], float]]
+
+
+class TTLCache:
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0    # 等待别人加载结果的次数
+        self.evictions = 0    # LRU 淘汰次数
+        self.expirations = 0  # 过期删除次数
+
+    # ---------- 内部工具（调用方需持有锁） ----------
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            return False, None
+
+        self._data.move_to_end(key)
+        return True, value
+
+    def _store(self, key: Hashable, value: Any, ttl: TTL) -> None:
+        seconds = ttl(value) if callable(ttl) else ttl
+        if seconds <= 0:
+            return
+
+        self._data[key] = (time.monotonic() + seconds, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    # ---------- 公共接口 ----------
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def get_many(self, keys: Iterable[Hashable]) -> Tuple[Dict[Hashable, Any], List[Hashable]]:
+        """
+        批量查询（只统计命中）
+
+        :return: (found, missing)
+            miss 的 key 通常紧接着会走 get_or_load，在那里计入 misses
+        """
+        found: Dict[Hashable, Any] = {}
+        missing: List[Hashable] = []
+
+        with self._lock:
+            for key in keys:
+                ok, value = self._lookup(key)
+                if ok:
+                    found[key] = value
+                    self.hits += 1
+                else:
+                    missing.append(key)
+
+        return found, missing
+
+    def set(self, key: Hashable, value: Any, ttl: TTL) -> None:
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: TTL) -> Any:
+        """
+        命中直接返回；miss 时调用 loader() 并写入缓存。
+        同一 key 的并发 miss 只会调用一次 loader，异常会传给所有等待者（不缓存异常）。
+        """
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                flight = Future()
+                self._inflight[key] = flight
+                leader = True
+
+        if not leader:
+            return flight.result()
+
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.set_exception(e)
+            raise
+
+        with self._lock:
+            self._store(key, value, ttl)
+            self._inflight.pop(key, None)
+        flight.set_result(value)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "inflight": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
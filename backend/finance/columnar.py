@@ -0,0 +1,197 @@
+# finance/columnar.py
+# ------------------------------------------------------------
+# 1m K 线的列式表示（NumPy 数组）
+#
+# Yahoo chart 接口本身就是列式的（timestamp / open / high / ...
+# 各是一个数组），这里直接转成 NumPy 数组：
+#   - RTH 过滤：每个交易日算一次 09:30 / 16:00 的时间戳，整体做掩码
+#   - 价格保留 2 位小数：np.round
+#   - 只有在输出 JSON 时才转成 Python list / dict
+# ------------------------------------------------------------
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .market_hours import NY_TZ, RTH_CLOSE, RTH_OPEN
+
+PRICE_FIELDS = ("open", "high", "low", "close")
+
+# 一天 1440 分钟的 "HH:MM" 查找表
+_HHMM = [f"{m // 60:02d}:{m % 60:02d}" for m in range(24 * 60)]
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _float_array(values: Optional[List[Any]], n: int) -> np.ndarray:
+    """list（可能含 None、可能短于 n）-> float64 数组，缺失为 NaN"""
+    arr = np.full(n, np.nan)
+    if values:
+        m = min(n, len(values))
+        arr[:m] = np.array(values[:m], dtype=float)
+    return arr
+
+
+def _nullable(arr: np.ndarray) -> List[Optional[float]]:
+    """NaN -> None，用于 JSON 输出"""
+    return np.where(np.isnan(arr), None, arr).tolist()
+
+
+def _local_days(timestamps: np.ndarray) -> np.ndarray:
+    """
+    每个时间戳对应的纽约日期（距 1970-01-01 的天数）
+
+    整个数组只用第一根的 UTC 偏移。夏令时切换发生在凌晨 2 点，
+    偏差的一小时不会把 RTH 内的时间划到另一天。
+    """
+    first = datetime.fromtimestamp(int(timestamps[0]), tz=NY_TZ)
+    offset = int(first.utcoffset().total_seconds())
+    return (timestamps + offset) // 86400
+
+
+@dataclass
+class IntradayColumns:
+    timestamps: np.ndarray  # int64，UNIX 秒
+    open: np.ndarray        # float64，缺失为 NaN
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray      # int64
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    # ---------- 构造 ----------
+    @classmethod
+    def empty(cls) -> "IntradayColumns":
+        return cls(
+            timestamps=np.empty(0, dtype=np.int64),
+            open=np.empty(0),
+            high=np.empty(0),
+            low=np.empty(0),
+            close=np.empty(0),
+            volume=np.empty(0, dtype=np.int64),
+        )
+
+    @classmethod
+    def from_chart(cls, result: Dict[str, Any]) -> "IntradayColumns":
+        """
+        解析 Yahoo chart.result[0]，只保留 RTH（09:30–16:00，含 16:00），价格保留 2 位小数
+        """
+        timestamps = np.array(result.get("timestamp") or [], dtype=np.int64)
+        n = len(timestamps)
+        if n == 0:
+            return cls.empty()
+
+        quote = (result.get("indicators") or {}).get("quote") or [{}]
+        quote0 = quote[0]
+
+        prices = {f: np.round(_float_array(quote0.get(f), n), 2) for f in PRICE_FIELDS}
+        volume = np.nan_to_num(_float_array(quote0.get("volume"), n)).astype(np.int64)
+
+        cols = cls(timestamps=timestamps, volume=volume, **prices)
+        return cols[rth_mask(timestamps)]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, List[Any]]) -> "IntradayColumns":
+        """从本地存储的列式 JSON 恢复"""
+        if not data:
+            return cls.empty()
+
+        n = len(data["timestamp"])
+        return cls(
+            timestamps=np.array(data["timestamp"], dtype=np.int64),
+            volume=np.array(data["volume"], dtype=np.int64),
+            **{f: _float_array(data[f], n) for f in PRICE_FIELDS},
+        )
+
+    # ---------- 运算 ----------
+    def __getitem__(self, index: Any) -> "IntradayColumns":
+        """按布尔掩码 / 切片取子集"""
+        return IntradayColumns(
+            timestamps=self.timestamps[index],
+            open=self.open[index],
+            high=self.high[index],
+            low=self.low[index],
+            close=self.close[index],
+            volume=self.volume[index],
+        )
+
+    def concat(self, other: "IntradayColumns") -> "IntradayColumns":
+        return IntradayColumns(
+            timestamps=np.concatenate([self.timestamps, other.timestamps]),
+            open=np.concatenate([self.open, other.open]),
+            high=np.concatenate([self.high, other.high]),
+            low=np.concatenate([self.low, other.low]),
+            close=np.concatenate([self.close, other.close]),
+            volume=np.concatenate([self.volume, other.volume]),
+        )
+
+    # ---------- 输出（JSON 边界） ----------
+    def times(self) -> List[str]:
+        """纽约时间 "YYYY-MM-DDTHH:mm" 字符串"""
+        if len(self) == 0:
+            return []
+
+        ts = self.timestamps
+        days = _local_days(ts)
+        out: List[str] = [""] * len(ts)
+
+        for d in np.unique(days):
+            day = date.fromordinal(_EPOCH_ORDINAL + int(d))
+            # 以当天 09:30 反推“本地零点”，避免夏令时切换日的偏差
+            open_local = datetime.combine(day, RTH_OPEN, tzinfo=NY_TZ)
+            base = int(open_local.timestamp()) - (RTH_OPEN.hour * 60 + RTH_OPEN.minute) * 60
+            prefix = day.isoformat()
+
+            idx = np.nonzero(days == d)[0]
+            minutes = ((ts[idx] - base) // 60).tolist()
+            for i, m in zip(idx.tolist(), minutes):
+                out[i] = f"{prefix}T{_HHMM[m]}"
+
+        return out
+
+    def to_json(self) -> Dict[str, List[Any]]:
+        """本地存储格式（保留 UNIX 时间戳）"""
+        return {
+            "timestamp": self.timestamps.tolist(),
+            **{f: _nullable(getattr(self, f)) for f in PRICE_FIELDS},
+            "volume": self.volume.tolist(),
+        }
+
+    def to_columns(self) -> Dict[str, List[Any]]:
+        """紧凑的 API 格式：平行数组"""
+        return {
+            "time": self.times(),
+            **{f: _nullable(getattr(self, f)) for f in PRICE_FIELDS},
+            "volume": self.volume.tolist(),
+        }
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """默认 API 格式：list[dict]，字段与 Node 版本完全一致"""
+        cols = self.to_columns()
+        keys = ("time",) + PRICE_FIELDS + ("volume",)
+        return [dict(zip(keys, row)) for row in zip(*(cols[k] for k in keys))]
+
+
+def rth_mask(timestamps: np.ndarray) -> np.ndarray:
+    """
+    RTH 掩码：每个交易日只算一次开收盘时间戳，再对整个数组比较
+    16:00 这一分钟包含在内（16:00:00–16:00:59）
+    """
+    mask = np.zeros(len(timestamps), dtype=bool)
+    if len(timestamps) == 0:
+        return mask
+
+    days = _local_days(timestamps)
+    for d in np.unique(days):
+        day = date.fromordinal(_EPOCH_ORDINAL + int(d))
+        open_ts = int(datetime.combine(day, RTH_OPEN, tzinfo=NY_TZ).timestamp())
+        close_ts = int(datetime.combine(day, RTH_CLOSE, tzinfo=NY_TZ).timestamp()) + 59
+        mask |= (timestamps >= open_ts) & (timestamps <= close_ts)
+
+    return mask
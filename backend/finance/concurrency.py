@@ -0,0 +1,85 @@
+# finance/concurrency.py
+# ------------------------------------------------------------
+# 上游请求并发工具
+# 多个 symbol 的请求放到一个有上限的共享线程池里并发执行，
+# 总耗时取决于最慢的那个，而不是所有请求之和。
+#
+# 带 timeout 的批次会把截止时间传给任务线程（http_helper.request_deadline）：
+# 上游请求的 timeout 被截到剩余时间内，过了截止时间不再重试，
+# 超时的任务不会在截止之后继续占着共享线程池。
+# ------------------------------------------------------------
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from django.db import close_old_connections
+
+from .http_helper import POOL_MAXSIZE, request_deadline, time_left
+
+# 线程数与每个 host 的连接数保持一致，多了也只是在连接池上排队
+MAX_WORKERS = POOL_MAXSIZE
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """返回进程内共享的线程池（懒加载）"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=MAX_WORKERS,
+                    thread_name_prefix="finance-fetch",
+                )
+    return _executor
+
+
+def _run(fn: Callable[[str], Any], key: str, deadline: Optional[float]) -> Any:
+    try:
+        with request_deadline(deadline):
+            time_left()  # 排队期间已经超时的直接放弃
+            return fn(key)
+    finally:
+        # 线程池线程不在 Django 请求周期内，用完数据库连接需要手动回收
+        close_old_connections()
+
+
+def fan_out(
+    fn: Callable[[str], Any],
+    keys: Iterable[str],
+    timeout: Optional[float] = None,
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    对每个 key 并发调用 fn(key)
+
+    :param timeout: 整批的截止时间（秒）；到时还没完成的 key 记为超时错误
+    :return: (results, errors)
+        results: key -> fn 的返回值
+        errors:  key -> 错误信息（单个失败不影响其它 key）
+    """
+    executor = get_executor()
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    futures = {key: executor.submit(_run, fn, key, deadline) for key in keys}
+
+    done, _ = wait(futures.values(), timeout=timeout)
+
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+
+    for key, fut in futures.items():
+        if fut not in done:
+            fut.cancel()  # 还在排队的直接取消；已在运行的会在下一次上游请求处因截止时间退出
+            errors[key] = f"Timed out after {timeout}s"
+            continue
+        try:
+            results[key] = fut.result()
+        except Exception as e:
+            errors[key] = str(e)
+
+    return results, errors
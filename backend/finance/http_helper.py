@@ -2,24 +2,233 @@
 # ------------------------------------------------------------
 # 通用 HTTP GET 工具（带重试和“反缓存”参数）
 # 对应 Node 版本的 httpHelper.js
+#
+# 所有上游请求（Yahoo / Google News）共用一个带连接池的
+# keep-alive Session，避免每次请求都重新做 TCP + TLS 握手。
 # ------------------------------------------------------------
 
+import random
+import threading
 import time
-from typing import Any, Dict, Optional
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 
 # 全局请求头（Headers），伪装浏览器 User-Agent
 HEADERS: Dict[str, str] = {
     "User-Agent": "Mozilla/5.0"
 }
 
+# 连接池配置
+POOL_CONNECTIONS = 10   # 最多缓存多少个 host 的连接池
+POOL_MAXSIZE = 8        # 每个 host 最多保持的连接数（per-host limit）
+POOL_BLOCK = True       # 连接用满时等待空闲连接，而不是无限新建
+POOL_TIMEOUT = 10       # 秒，等待空闲连接的上限（还受本线程截止时间限制）
+DEFAULT_TIMEOUT = 10    # 秒
+
+# 重试退避上限（秒）
+BACKOFF_CAP = 5.0
+
+
+class DeadlineExceeded(RuntimeError):
+    """当前线程的截止时间已到（fan_out 的整批 timeout）"""
+
+
+# 当前线程的截止时间（time.monotonic()），由 fan_out 设置：
+# 整批超时后，已经在跑的任务不再发起新请求 / 重试，尽快把线程还给线程池
+_deadline = threading.local()
+
+
+@contextmanager
+def request_deadline(deadline: Optional[float]) -> Iterator[None]:
+    """在 with 块内，本线程的上游请求的 timeout 不超过 deadline 的剩余时间"""
+    previous = getattr(_deadline, "at", None)
+    _deadline.at = deadline
+    try:
+        yield
+    finally:
+        _deadline.at = previous
+
+
+def time_left() -> Optional[float]:
+    """
+    距离本线程截止时间的剩余秒数；没有截止时间时返回 None
+
+    :raises DeadlineExceeded: 已经过了截止时间
+    """
+    at = getattr(_deadline, "at", None)
+    if at is None:
+        return None
+    left = at - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded("Deadline exceeded")
+    return left
+
+
+class PoolStats:
+    """
+    连接池计数器（线程安全）
+
+    - requests: 从连接池取连接的次数
+    - misses:   新建连接的次数（需要握手）
+    - hits:     复用已有 keep-alive 连接的次数
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.misses = 0
+
+    def incr(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hits": self.requests - self.misses,
+                "misses": self.misses,
+            }
+
+
+def pool_timeout() -> float:
+    """
+    等待空闲连接的秒数：POOL_TIMEOUT 与本线程截止时间的剩余时间取小
+
+    requests 不会把 pool_timeout 传给 urllib3，POOL_BLOCK=True 时
+    连接池用满的请求会一直等下去，fan_out 的截止时间也管不到
+
+    :raises DeadlineExceeded: 已经过了截止时间
+    """
+    left = time_left()
+    return POOL_TIMEOUT if left is None else min(POOL_TIMEOUT, left)
+
+
+def _counting_pool_class(base: type, stats: PoolStats) -> type:
+    """
+    生成一个会统计 hit / miss 的 urllib3 连接池类
+
+    取连接时等待的时间有上限（pool_timeout），超时抛 urllib3 的 EmptyPoolError
+    """
+
+    class _CountingPool(base):
+        def _get_conn(self, timeout=None):
+            stats.incr("requests")
+            if timeout is None:
+                timeout = pool_timeout()
+            return super()._get_conn(timeout=timeout)
+
+        def _new_conn(self):
+            stats.incr("misses")
+            return super()._new_conn()
+
+    _CountingPool.__name__ = f"Counting{base.__name__}"
+    return _CountingPool
+
+
+class PooledHTTPClient:
+    """
+    共享的 keep-alive HTTP 客户端
+
+    - 基于 requests.Session + HTTPAdapter（urllib3 连接池）
+    - pool_maxsize 限制每个 host 的并发连接数
+    - 多线程共用同一个实例是安全的
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = POOL_CONNECTIONS,
+        pool_maxsize: int = POOL_MAXSIZE,
+        pool_block: bool = POOL_BLOCK,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.stats = PoolStats()
+
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=0,  # 重试由调用方（http_get）控制
+        )
+        adapter.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool_class(HTTPConnectionPool, self.stats),
+            "https": _counting_pool_class(HTTPSConnectionPool, self.stats),
+        }
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or HEADERS)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        stream: bool = False,
+    ) -> requests.Response:
+        left = time_left()
+        if left is not None:
+            timeout = min(timeout, left)
+        return self.session.get(
+            url,
+            params=params,
+            headers=headers,
+            timeout=timeout,
+            stream=stream,
+        )
+
+    def get_stats(self) -> Dict[str, int]:
+        return self.stats.snapshot()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client: Optional[PooledHTTPClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> PooledHTTPClient:
+    """返回进程内共享的 PooledHTTPClient（懒加载）"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PooledHTTPClient()
+    return _client
+
+
+def backoff_delay(attempt: int, base: float, cap: float = BACKOFF_CAP) -> float:
+    """
+    指数退避 + 抖动（equal jitter）
+
+    第 attempt 次失败后等待 [d/2, d]，其中 d = min(cap, base * 2^attempt)
+    """
+    d = min(cap, base * (2 ** attempt))
+    return d / 2 + random.uniform(0, d / 2)
+
+
+def is_chart_response(js: Any) -> bool:
+    """是否为有效的 Yahoo Finance chart 响应（chart.result 非空）"""
+    return bool(
+        isinstance(js, dict)
+        and js.get("chart")
+        and js["chart"].get("result")
+        and len(js["chart"]["result"]) > 0
+    )
+
 
 def http_get(
     url: str,
     params: Optional[Dict[str, Any]] = None,
     retries: int = 3,
-    delay: float = 0.6,  # 秒，对应 JS 的 600ms
+    delay: float = 0.6,  # 秒，退避的基准值（对应 JS 的 600ms）
 ) -> Dict[str, Any]:
     """
     通用 HTTP GET 工具函数（带重试与反缓存）
@@ -27,63 +236,61 @@ def http_get(
     :param url: 请求 URL
     :param params: 查询参数字典
     :param retries: 重试次数
-    :param delay: 每次重试之间等待的秒数
+    :param delay: 重试退避的基准秒数（指数增长 + 抖动）
     :return: 解析后的 JSON 响应（dict）
     :raises RuntimeError: 多次重试失败
     """
     if params is None:
         params = {}
 
+    client = get_client()
     last_err: Optional[Exception] = None
 
-    for _ in range(retries):
+    for attempt in range(retries):
         try:
             # 反缓存参数 "_"（等价于 JS 里的 Date.now()）
             full_params = dict(params)
             full_params["_"] = int(time.time() * 1000)
 
-            resp = requests.get(
-                url,
-                params=full_params,
-                headers=HEADERS,
-                timeout=10,  # 10 秒超时
-            )
+            resp = client.get(url, params=full_params)
             resp.raise_for_status()  # HTTP 状态码不是 2xx 会抛异常
 
             js = resp.json()
 
             # 验证是否符合 Yahoo Finance（chart.result 非空）
-            if (
-                isinstance(js, dict)
-                and js.get("chart")
-                and js["chart"].get("result")
-                and len(js["chart"]["result"]) > 0
-            ):
+            if is_chart_response(js):
                 return js
 
             # 如果结构不对，也视为失败，进入重试
             last_err = RuntimeError("Invalid Yahoo Finance response structure")
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             last_err = e
-            time.sleep(delay)
+
+        # 最后一次失败后不再等待；等待会越过截止时间时也不再重试
+        if attempt < retries - 1:
+            wait = backoff_delay(attempt, delay)
+            left = time_left()
+            if left is not None and wait >= left:
+                break
+            time.sleep(wait)
 
     # 所有重试失败
     raise RuntimeError(f"HTTP request failed: {last_err}")
 
 def http_get1(url, params=None):
     headers = {
-        "User-Agent": "Mozilla/5.0",
         "Accept": "application/json",
-        "Connection": "keep-alive",
     }
 
     # Yahoo 不允许出现 param "_"
     if params and "_" in params:
         params.pop("_")
 
-    resp = requests.get(url, params=params, headers=headers, timeout=10)
+    resp = get_client().get(url, params=params, headers=headers)
 
     if resp.status_code != 200:
         raise RuntimeError(f"HTTP request failed: {resp.status_code} {resp.text}")
 
-    return resp.json()
\ No newline at end of file
+    return resp.json()
@@ -0,0 +1,171 @@
+# finance/indicator_service.py
+# ------------------------------------------------------------
+# 技术指标服务：在 fetch_intraday 的 K 线上计算指标并缓存
+#
+# 缓存粒度：(symbol, 交易日, 指标名+参数)
+#   - 已收盘交易日：结果写入 IntradaySession.indicators，永不重算
+#   - 当天盘中：每个 (symbol, 交易日) 在进程内保存增量指标状态，
+#     每次请求只把上次之后的新 bar 折叠进去（O(新 bar 数)）
+# ------------------------------------------------------------
+
+from __future__ import annotations
+
+import copy
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from . import bar_store
+from .cache import TTLCache
+from .columnar import IntradayColumns
+from .indicators import IndicatorSpec, compute, streaming, to_json, value_to_json
+from .market_hours import NY_TZ
+from .services import fetch_intraday_columns
+
+# 过期只是为了回收内存：过期后下次请求从头折叠一遍
+LIVE_STATE_TTL = 30 * 60
+
+_live_states = TTLCache(maxsize=512)
+
+
+class _Stream:
+    """单个指标的增量状态 + 已确定的输出序列（已转成 JSON 值）"""
+
+    def __init__(self, spec: IndicatorSpec) -> None:
+        self.state = streaming(spec)
+        self.values: Any = {"macd": [], "signal": [], "hist": []} if spec.kind == "macd" else []
+
+    def fold(self, bar: Dict[str, float]) -> None:
+        value = value_to_json(self.state.update(bar))
+        if isinstance(value, dict):
+            for k, v in value.items():
+                self.values[k].append(v)
+        else:
+            self.values.append(value)
+
+    def series(self, pending: Optional[Dict[str, float]]) -> Any:
+        """已确定的序列 + 最后一根（可能未走完的）bar 的临时结果"""
+        if pending is None:
+            return copy.copy(self.values)
+
+        value = value_to_json(copy.deepcopy(self.state).update(pending))
+        if isinstance(value, dict):
+            return {k: self.values[k] + [v] for k, v in value.items()}
+        return self.values + [value]
+
+
+class SessionIndicatorState:
+    """
+    某 symbol 某交易日（盘中）的增量指标状态
+
+    最后一根 bar 可能还没走完（下次拉取会被覆盖），所以不写入状态，
+    只在拷贝出来的状态上临时计算。
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.folded = 0                      # 已折叠的 bar 数
+        self.last_folded_ts: Optional[int] = None
+        self.streams: Dict[str, _Stream] = {}
+
+    def _reset(self) -> None:
+        self.folded = 0
+        self.last_folded_ts = None
+        self.streams = {}
+
+    def advance(self, cols: IntradayColumns, specs: List[IndicatorSpec]) -> Dict[str, Any]:
+        with self.lock:
+            # 已折叠的前缀和当前数据对不上（数据被重建）：从头开始
+            if self.folded > len(cols) or (
+                self.folded and int(cols.timestamps[self.folded - 1]) != self.last_folded_ts
+            ):
+                self._reset()
+
+            n = len(cols)
+            closed = max(n - 1, 0)
+
+            # 新请求的指标：补折叠已有的前缀
+            for spec in specs:
+                if spec.key not in self.streams:
+                    stream = _Stream(spec)
+                    for bar in _rows(cols, 0, self.folded):
+                        stream.fold(bar)
+                    self.streams[spec.key] = stream
+
+            # 只折叠上次之后新增的、已走完的 bar
+            for bar in _rows(cols, self.folded, closed):
+                for stream in self.streams.values():
+                    stream.fold(bar)
+
+            if closed > self.folded:
+                self.folded = closed
+                self.last_folded_ts = int(cols.timestamps[closed - 1])
+
+            pending = _rows(cols, n - 1, n)[0] if n else None
+            return {s.key: self.streams[s.key].series(pending) for s in specs}
+
+
+def _rows(cols: IntradayColumns, start: int, stop: int) -> List[Dict[str, float]]:
+    """cols[start:stop] -> 每根 bar 一个 dict（只转换需要的那一段）"""
+    high = cols.high[start:stop].tolist()
+    low = cols.low[start:stop].tolist()
+    close = cols.close[start:stop].tolist()
+    volume = cols.volume[start:stop].tolist()
+    return [
+        {"high": h, "low": l, "close": c, "volume": v}
+        for h, l, c, v in zip(high, low, close, volume)
+    ]
+
+
+def _trading_date(cols: IntradayColumns) -> Optional[date]:
+    if len(cols) == 0:
+        return None
+    return datetime.fromtimestamp(int(cols.timestamps[0]), tz=NY_TZ).date()
+
+
+def get_indicators(
+    symbol: str,
+    date_str: Optional[str],
+    specs: List[IndicatorSpec],
+) -> Dict[str, Any]:
+    """
+    计算 symbol 某交易日（默认最近一个）的多个指标
+
+    :return: {
+        "date": "YYYY-MM-DD" | None,
+        "time": [...],
+        "indicators": {"vwap": [...], "macd12_26_9": {"macd": [...], ...}}
+    }
+    """
+    symbol = symbol.upper()
+    cols = fetch_intraday_columns(symbol, date_str)
+    trading_date = _trading_date(cols)
+
+    result: Dict[str, Any] = {}
+
+    session = bar_store.get_session(symbol, trading_date) if trading_date else None
+
+    if session is not None and session.complete:
+        # 已收盘：只计算还没存过的指标
+        stored = session.indicators or {}
+        missing = [s for s in specs if s.key not in stored]
+        if missing:
+            for spec in missing:
+                stored[spec.key] = to_json(compute(spec, cols))
+            session.indicators = stored
+            session.save(update_fields=["indicators"])
+
+        result = {s.key: stored[s.key] for s in specs}
+    else:
+        state = _live_states.get_or_load(
+            (symbol, trading_date),
+            SessionIndicatorState,
+            ttl=LIVE_STATE_TTL,
+        )
+        result = state.advance(cols, specs)
+
+    return {
+        "date": trading_date.isoformat() if trading_date else None,
+        "time": cols.times(),
+        "indicators": result,
+    }
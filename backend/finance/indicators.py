@@ -0,0 +1,327 @@
+# finance/indicators.py
+# ------------------------------------------------------------
+# 技术指标计算（VWAP / EMA / RSI / MACD）
+#
+# 输入是 IntradayColumns 的 NumPy 数组，输出与 bar 一一对齐的数组，
+# 数据不足的位置为 NaN。
+#   - VWAP：累加和，完全向量化
+#   - EMA / RSI(Wilder) / MACD：一阶递推滤波
+#
+# Streaming* 类是同样算法的增量版本：每来一根 bar 调一次 update()，
+# O(1) 更新状态，结果与整段向量化计算一致。
+# ------------------------------------------------------------
+
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Tuple, Union
+
+import numpy as np
+
+from .columnar import IntradayColumns
+
+DEFAULT_RSI_PERIOD = 14
+DEFAULT_MACD = (12, 26, 9)
+
+_NAME_RE = re.compile(
+    r"^(?:(?P<vwap>vwap)"
+    r"|ema(?P<ema>\d+)"
+    r"|(?P<rsi_kw>rsi)(?P<rsi>\d+)?"
+    r"|macd(?:(?P<fast>\d+)_(?P<slow>\d+)_(?P<signal>\d+))?)$"
+)
+
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    kind: str                 # "vwap" / "ema" / "rsi" / "macd"
+    params: Tuple[int, ...]
+
+    @property
+    def key(self) -> str:
+        """规范化名称，例如 "rsi14"、"macd12_26_9"，同时用作缓存 key"""
+        if self.kind == "vwap":
+            return "vwap"
+        if self.kind == "macd":
+            return "macd" + "_".join(str(p) for p in self.params)
+        return f"{self.kind}{self.params[0]}"
+
+
+def parse_indicator(name: str) -> IndicatorSpec:
+    """
+    "vwap" / "ema20" / "rsi" / "rsi14" / "macd" / "macd12_26_9" -> IndicatorSpec
+
+    :raises ValueError: 无法识别的名称或参数
+    """
+    m = _NAME_RE.match(name.strip().lower())
+    if not m:
+        raise ValueError(f"Unknown indicator '{name}'")
+
+    if m.group("vwap"):
+        return IndicatorSpec("vwap", ())
+
+    if m.group("ema"):
+        params: Tuple[int, ...] = (int(m.group("ema")),)
+        kind = "ema"
+    elif m.group("rsi_kw"):
+        params = (int(m.group("rsi") or DEFAULT_RSI_PERIOD),)
+        kind = "rsi"
+    else:
+        if m.group("fast"):
+            params = (int(m.group("fast")), int(m.group("slow")), int(m.group("signal")))
+        else:
+            params = DEFAULT_MACD
+        if params[0] >= params[1]:
+            raise ValueError(f"Invalid indicator '{name}': fast period must be < slow period")
+        kind = "macd"
+
+    if any(p < 1 for p in params):
+        raise ValueError(f"Invalid indicator '{name}': periods must be >= 1")
+
+    return IndicatorSpec(kind, params)
+
+
+# ------------------------------------------------------------
+# 基础函数
+# ------------------------------------------------------------
+def _ffill(x: np.ndarray) -> np.ndarray:
+    """NaN 用前一个有效值填充（开头的 NaN 保留）"""
+    idx = np.where(np.isnan(x), 0, np.arange(len(x)))
+    np.maximum.accumulate(idx, out=idx)
+    return x[idx]
+
+
+def vwap(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """当日累计 VWAP：Σ(典型价 × 量) / Σ量，典型价 = (H + L + C) / 3"""
+    typical = (high + low + close) / 3
+    valid = ~np.isnan(typical)
+
+    pv = np.cumsum(np.where(valid, typical * volume, 0.0))
+    vol = np.cumsum(np.where(valid, volume, 0)).astype(float)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = pv / vol
+    out[vol == 0] = np.nan
+    return out
+
+
+def ema(x: np.ndarray, period: int) -> np.ndarray:
+    """
+    指数移动平均：y[t] = α·x[t] + (1-α)·y[t-1]，α = 2 / (period + 1)
+    用前 period 个值的 SMA 作为初始值
+    """
+    x = _ffill(np.asarray(x, dtype=float))
+    out = np.full(len(x), np.nan)
+
+    valid = np.nonzero(~np.isnan(x))[0]
+    if len(valid) < period:
+        return out
+
+    start = valid[0] + period - 1
+    alpha = 2.0 / (period + 1)
+
+    y = float(np.mean(x[valid[0]:start + 1]))
+    out[start] = y
+    for t in range(start + 1, len(x)):
+        y += alpha * (x[t] - y)
+        out[t] = y
+    return out
+
+
+def rsi(close: np.ndarray, period: int = DEFAULT_RSI_PERIOD) -> np.ndarray:
+    """
+    RSI（Wilder 平滑）
+    avg[t] = (avg[t-1]·(period-1) + x[t]) / period，首个 avg 为前 period 个变化的均值
+    """
+    close = _ffill(np.asarray(close, dtype=float))
+    out = np.full(len(close), np.nan)
+
+    valid = np.nonzero(~np.isnan(close))[0]
+    if len(valid) <= period:
+        return out
+
+    first = valid[0]
+    delta = np.diff(close[first:])
+    gain = np.clip(delta, 0, None)
+    loss = np.clip(-delta, 0, None)
+
+    avg_gain = float(np.mean(gain[:period]))
+    avg_loss = float(np.mean(loss[:period]))
+
+    def _value(g: float, l: float) -> float:
+        if l == 0:
+            return 100.0 if g > 0 else 50.0
+        return 100.0 - 100.0 / (1.0 + g / l)
+
+    out[first + period] = _value(avg_gain, avg_loss)
+    for i in range(period, len(delta)):
+        avg_gain = (avg_gain * (period - 1) + gain[i]) / period
+        avg_loss = (avg_loss * (period - 1) + loss[i]) / period
+        out[first + i + 1] = _value(avg_gain, avg_loss)
+    return out
+
+
+def macd(
+    close: np.ndarray,
+    fast: int = DEFAULT_MACD[0],
+    slow: int = DEFAULT_MACD[1],
+    signal: int = DEFAULT_MACD[2],
+) -> Dict[str, np.ndarray]:
+    """MACD = EMA(fast) - EMA(slow)，signal = EMA(MACD, signal)，hist = MACD - signal"""
+    line = ema(close, fast) - ema(close, slow)
+    sig = ema(line, signal)
+    return {"macd": line, "signal": sig, "hist": line - sig}
+
+
+# ------------------------------------------------------------
+# 增量（流式）版本
+# bar 为包含 high / low / close / volume 的 Mapping，缺失价格为 NaN
+# ------------------------------------------------------------
+StreamValue = Union[float, Dict[str, float]]
+
+
+class StreamingVWAP:
+    def __init__(self) -> None:
+        self.pv = 0.0
+        self.volume = 0.0
+
+    def update(self, bar: Mapping[str, float]) -> float:
+        typical = (bar["high"] + bar["low"] + bar["close"]) / 3
+        if not math.isnan(typical):
+            self.pv += typical * bar["volume"]
+            self.volume += bar["volume"]
+        return self.pv / self.volume if self.volume else math.nan
+
+
+class StreamingEMA:
+    def __init__(self, period: int) -> None:
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.last = math.nan     # 最近一个有效输入（缺失值用它填充）
+        self.count = 0
+        self.total = 0.0
+        self.value = math.nan
+
+    def push(self, x: float) -> float:
+        if math.isnan(x):
+            x = self.last
+            if math.isnan(x):
+                return math.nan
+        self.last = x
+
+        if self.count < self.period:
+            # 前 period 个值：累积 SMA 作为初始值
+            self.count += 1
+            self.total += x
+            if self.count == self.period:
+                self.value = self.total / self.period
+            return self.value
+
+        self.value += self.alpha * (x - self.value)
+        return self.value
+
+    def update(self, bar: Mapping[str, float]) -> float:
+        return self.push(bar["close"])
+
+
+class StreamingRSI:
+    def __init__(self, period: int = DEFAULT_RSI_PERIOD) -> None:
+        self.period = period
+        self.prev = math.nan
+        self.count = 0           # 已处理的价格变化个数
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def update(self, bar: Mapping[str, float]) -> float:
+        x = bar["close"]
+        if math.isnan(x):
+            x = self.prev
+            if math.isnan(x):
+                return math.nan
+
+        if math.isnan(self.prev):
+            self.prev = x
+            return math.nan
+
+        delta = x - self.prev
+        self.prev = x
+        gain = max(delta, 0.0)
+        loss = max(-delta, 0.0)
+
+        self.count += 1
+        if self.count <= self.period:
+            self.avg_gain += gain / self.period
+            self.avg_loss += loss / self.period
+            if self.count < self.period:
+                return math.nan
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+
+        if self.avg_loss == 0:
+            return 100.0 if self.avg_gain > 0 else 50.0
+        return 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+
+
+class StreamingMACD:
+    def __init__(
+        self,
+        fast: int = DEFAULT_MACD[0],
+        slow: int = DEFAULT_MACD[1],
+        signal: int = DEFAULT_MACD[2],
+    ) -> None:
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+
+    def update(self, bar: Mapping[str, float]) -> Dict[str, float]:
+        line = self.fast.update(bar) - self.slow.update(bar)
+        sig = self.signal.push(line)
+        return {"macd": line, "signal": sig, "hist": line - sig}
+
+
+def streaming(spec: IndicatorSpec):
+    """IndicatorSpec -> 对应的增量指标对象"""
+    if spec.kind == "vwap":
+        return StreamingVWAP()
+    if spec.kind == "ema":
+        return StreamingEMA(spec.params[0])
+    if spec.kind == "rsi":
+        return StreamingRSI(spec.params[0])
+    return StreamingMACD(*spec.params)
+
+
+# ------------------------------------------------------------
+# 对外入口
+# ------------------------------------------------------------
+def compute(spec: IndicatorSpec, cols: IntradayColumns):
+    """计算单个指标，返回 ndarray（macd 返回 dict[str, ndarray]）"""
+    if spec.kind == "vwap":
+        return vwap(cols.high, cols.low, cols.close, cols.volume)
+    if spec.kind == "ema":
+        return ema(cols.close, spec.params[0])
+    if spec.kind == "rsi":
+        return rsi(cols.close, spec.params[0])
+    return macd(cols.close, *spec.params)
+
+
+def to_json(values) -> object:
+    """ndarray -> list（NaN 为 None，保留 4 位小数）；dict 递归处理"""
+    if isinstance(values, dict):
+        return {k: to_json(v) for k, v in values.items()}
+    rounded = np.round(values, 4)
+    return np.where(np.isnan(rounded), None, rounded).tolist()
+
+
+def value_to_json(value: StreamValue) -> Any:
+    """单个增量结果 -> JSON（与 to_json 的取舍规则一致）"""
+    if isinstance(value, dict):
+        return {k: value_to_json(v) for k, v in value.items()}
+    return None if math.isnan(value) else round(value, 4)
+
+
+def parse_indicator_names(raw: str) -> List[IndicatorSpec]:
+    """解析 "vwap,rsi14,,RSI14" -> 去重后的 IndicatorSpec 列表（保持顺序）"""
+    specs = [parse_indicator(n) for n in raw.split(",") if n.strip()]
+    return list(dict.fromkeys(specs))
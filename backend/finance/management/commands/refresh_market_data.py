@@ -0,0 +1,84 @@
+# finance/management/commands/refresh_market_data.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.holdings import tracked_symbols
+from common.rate_limit import RateLimiter
+from finance.price_service import quote_ttl
+from finance.refresher import REFRESH_BATCH_SIZE, REFRESH_RATE, refresh_symbols
+from finance.services import INTRADAY_REFRESH
+
+# 在报价过期之前刷新，避免用户请求在两轮之间 miss
+REFRESH_AHEAD = 0.8
+
+
+class Command(BaseCommand):
+    help = "Keep quotes and today's 1m bars for all watchlist / portfolio symbols warm in the shared cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--symbols",
+            type=str,
+            default="",
+            help="Comma separated symbols (default: every watchlist / portfolio symbol)",
+        )
+        parser.add_argument("--batch-size", type=int, default=REFRESH_BATCH_SIZE)
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=REFRESH_RATE,
+            help=f"Max upstream requests per second (default {REFRESH_RATE})",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=None,
+            help="Seconds between quote refreshes (default: follows the quote TTL of the market session)",
+        )
+        parser.add_argument(
+            "--bars-interval",
+            type=float,
+            default=INTRADAY_REFRESH,
+            help=f"Seconds between intraday bar refreshes (default {INTRADAY_REFRESH})",
+        )
+        parser.add_argument("--no-bars", action="store_true", help="Only refresh quotes")
+        parser.add_argument("--once", action="store_true", help="Run a single round and exit")
+
+    def handle(self, *args, **options):
+        limiter = RateLimiter(options["rate"])
+        fixed = [s.strip().upper() for s in options["symbols"].split(",") if s.strip()]
+        last_bars = None
+
+        while True:
+            started = time.monotonic()
+            symbols = fixed or sorted(tracked_symbols())
+
+            bars = not options["no_bars"] and (
+                last_bars is None or started - last_bars >= options["bars_interval"]
+            )
+            if bars:
+                last_bars = started
+
+            result = refresh_symbols(
+                symbols,
+                limiter=limiter,
+                bars=bars,
+                batch_size=options["batch_size"],
+            )
+
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"Refreshed {result.symbols} symbols: quotes={result.quotes} "
+                f"bars={result.bars} errors={len(result.errors)} ({elapsed:.1f}s)"
+            )
+            for symbol, error in sorted(result.errors.items()):
+                self.stdout.write(self.style.WARNING(f"  {symbol}: {error}"))
+
+            if options["once"]:
+                break
+
+            interval = options["interval"] or quote_ttl() * REFRESH_AHEAD
+            time.sleep(max(0.0, interval - elapsed))
+
+        self.stdout.write(self.style.SUCCESS("Market data refresh completed"))
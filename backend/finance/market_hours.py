@@ -0,0 +1,71 @@
+# finance/market_hours.py
+# ------------------------------------------------------------
+# 美股交易时段判断（纽约时间）
+#   PRE     04:00–09:30
+#   RTH     09:30–16:00
+#   POST    16:00–20:00
+#   CLOSED  其余时间 + 周末
+# 注：暂不处理交易所节假日
+# ------------------------------------------------------------
+
+from __future__ import annotations
+
+from datetime import datetime, time as dtime, timedelta
+from typing import Optional
+
+from zoneinfo import ZoneInfo
+
+NY_TZ = ZoneInfo("America/New_York")
+
+SESSION_PRE = "PRE"
+SESSION_RTH = "RTH"
+SESSION_POST = "POST"
+SESSION_CLOSED = "CLOSED"
+
+PRE_OPEN = dtime(4, 0)
+RTH_OPEN = dtime(9, 30)
+RTH_CLOSE = dtime(16, 0)
+POST_CLOSE = dtime(20, 0)
+
+# 每天的时段边界（按时间顺序）
+_BOUNDARIES = (PRE_OPEN, RTH_OPEN, RTH_CLOSE, POST_CLOSE)
+
+
+def now_ny() -> datetime:
+    return datetime.now(tz=NY_TZ)
+
+
+def market_session(now: Optional[datetime] = None) -> str:
+    """返回 now 所处的交易时段（默认当前时间）"""
+    t = (now or now_ny()).astimezone(NY_TZ)
+
+    if t.weekday() >= 5:  # 周六、周日
+        return SESSION_CLOSED
+
+    clock = t.time()
+    if PRE_OPEN <= clock < RTH_OPEN:
+        return SESSION_PRE
+    if RTH_OPEN <= clock < RTH_CLOSE:
+        return SESSION_RTH
+    if RTH_CLOSE <= clock < POST_CLOSE:
+        return SESSION_POST
+    return SESSION_CLOSED
+
+
+def next_session_change(now: Optional[datetime] = None) -> datetime:
+    """返回下一次交易时段切换的时间点（纽约时间）"""
+    t = (now or now_ny()).astimezone(NY_TZ)
+
+    day = t.date()
+    while True:
+        if day.weekday() < 5:
+            for b in _BOUNDARIES:
+                candidate = datetime.combine(day, b, tzinfo=NY_TZ)
+                if candidate > t:
+                    return candidate
+        day += timedelta(days=1)
+
+
+def seconds_until_session_change(now: Optional[datetime] = None) -> float:
+    t = now or now_ny()
+    return (next_session_change(t) - t).total_seconds()
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.3 on 2026-10-18 18:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IntradaySession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=20)),
+                ('trading_date', models.DateField()),
+                ('complete', models.BooleanField(default=False)),
+                ('last_timestamp', models.BigIntegerField(blank=True, null=True)),
+                ('bars', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('symbol', 'trading_date')},
+            },
+        ),
+    ]
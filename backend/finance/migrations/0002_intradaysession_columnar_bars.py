@@ -0,0 +1,67 @@
+# Generated by Django 5.0.3 on 2026-10-18 18:10
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from django.db import migrations, models
+
+NY_TZ = ZoneInfo("America/New_York")
+FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def records_to_columns(apps, schema_editor):
+    IntradaySession = apps.get_model("finance", "IntradaySession")
+
+    for session in IntradaySession.objects.all():
+        if not isinstance(session.bars, list):
+            continue
+
+        columns = {"timestamp": []}
+        columns.update({f: [] for f in FIELDS})
+
+        for bar in session.bars:
+            t = datetime.strptime(bar["time"], "%Y-%m-%dT%H:%M").replace(tzinfo=NY_TZ)
+            columns["timestamp"].append(int(t.timestamp()))
+            for f in FIELDS:
+                columns[f].append(bar.get(f))
+
+        # last_timestamp 可能带秒（未走完的分钟），保留原值
+        if columns["timestamp"] and session.last_timestamp is not None:
+            columns["timestamp"][-1] = session.last_timestamp
+
+        session.bars = columns
+        session.save(update_fields=["bars"])
+
+
+def columns_to_records(apps, schema_editor):
+    IntradaySession = apps.get_model("finance", "IntradaySession")
+
+    for session in IntradaySession.objects.all():
+        if not isinstance(session.bars, dict):
+            continue
+
+        records = []
+        for i, ts in enumerate(session.bars.get("timestamp", [])):
+            t = datetime.fromtimestamp(ts, tz=NY_TZ)
+            bar = {"time": t.strftime("%Y-%m-%dT%H:%M")}
+            bar.update({f: session.bars[f][i] for f in FIELDS})
+            records.append(bar)
+
+        session.bars = records
+        session.save(update_fields=["bars"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='intradaysession',
+            name='bars',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.RunPython(records_to_columns, columns_to_records),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-18 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0002_intradaysession_columnar_bars'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='intradaysession',
+            name='indicators',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# finance/models.py
+from django.db import models
+
+
+class IntradaySession(models.Model):
+    """
+    某个 symbol 某个交易日的 1m K 线（RTH）本地存储。
+
+    - complete=True：该交易日已收盘，数据不会再变，直接从本地返回
+    - complete=False：当天盘中，只增量拉取 last_timestamp 之后的分钟
+    """
+    symbol = models.CharField(max_length=20)
+    trading_date = models.DateField()
+    complete = models.BooleanField(default=False)
+
+    # 最后一根 bar 的 UNIX 时间戳（秒），增量拉取的起点
+    last_timestamp = models.BigIntegerField(null=True, blank=True)
+
+    # 列式存储：{"timestamp": [...], "open": [...], ..., "volume": [...]}
+    # 见 finance.columnar.IntradayColumns.to_json()
+    bars = models.JSONField(default=dict)
+
+    # 已收盘交易日的指标结果：{"rsi14": [...], "macd12_26_9": {...}}
+    # 只在 complete=True 时写入，之后不再重新计算
+    indicators = models.JSONField(default=dict, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("symbol", "trading_date")
+
+    def __str__(self):
+        state = "complete" if self.complete else "partial"
+        count = len(self.bars.get("timestamp", []))
+        return f"{self.symbol} {self.trading_date} ({count} bars, {state})"
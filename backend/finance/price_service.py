@@ -1,15 +1,187 @@
 from __future__ import annotations
 
-from typing import Dict, Any
+import asyncio
+import time
+import weakref
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
+from django.core.cache import cache
+
+from .async_http import async_http_get
+from .cache import TTLCache
+from .concurrency import fan_out
 from .http_helper import http_get
+from .market_hours import (
+    SESSION_CLOSED,
+    SESSION_POST,
+    SESSION_PRE,
+    SESSION_RTH,
+    market_session,
+    now_ny,
+    seconds_until_session_change,
+)
 
 NY_TZ = ZoneInfo("America/New_York")
 
+# 报价缓存的 TTL（秒），按当前交易时段区分：
+# 盘中价格变化快 → 短 TTL；休市时价格不会变 → 长 TTL
+QUOTE_TTL = {
+    SESSION_RTH: 10,
+    SESSION_PRE: 30,
+    SESSION_POST: 30,
+    SESSION_CLOSED: 600,
+}
+
+QUOTE_CACHE_MAXSIZE = 2048
+
+QUOTE_PARAMS = {
+    "interval": "1m",
+    "range": "1d",
+    "includePrePost": "true",
+}
+
+# 进程内 L1；L2 是 Django cache（多进程 / refresh_market_data 共享），
+# L2 里存 {"quote", "fetched_at"}，按抓取时间算剩余有效期
+_quote_cache = TTLCache(maxsize=QUOTE_CACHE_MAXSIZE)
+
+SHARED_QUOTE_PREFIX = "finance:quote:"
+
+
+def get_quote_cache() -> TTLCache:
+    return _quote_cache
+
+
+def quote_ttl(_value: Any = None) -> float:
+    """当前时段的报价 TTL，且不跨越下一次时段切换（例如 09:30 开盘）"""
+    now = now_ny()
+    ttl = QUOTE_TTL[market_session(now)]
+    return max(1.0, min(ttl, seconds_until_session_change(now)))
+
+
+def _shared_key(symbol: str) -> str:
+    return f"{SHARED_QUOTE_PREFIX}{symbol}"
+
+
+def _shared_entry(quote: Dict[str, Any]) -> Dict[str, Any]:
+    return {"quote": quote, "fetched_at": time.time()}
+
+
+def _ttl_left(entry: Dict[str, Any]) -> float:
+    return quote_ttl() - (time.time() - entry["fetched_at"])
+
+
+def _from_shared(entries: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """L2 中仍然有效的报价写回 L1（剩余有效期），返回 symbol -> quote"""
+    quotes: Dict[str, Dict[str, Any]] = {}
+    for key, entry in entries.items():
+        left = _ttl_left(entry)
+        if left <= 0:
+            continue
+        symbol = key[len(SHARED_QUOTE_PREFIX):]
+        _quote_cache.set(symbol, entry["quote"], ttl=left)
+        quotes[symbol] = entry["quote"]
+    return quotes
+
+
+def _shared_quotes(symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    if not symbols:
+        return {}
+    return _from_shared(cache.get_many([_shared_key(s) for s in symbols]))
+
+
+def _share(symbol: str, quote: Dict[str, Any]) -> None:
+    """写入 L2；过期时间比 TTL 多 1 秒，是否有效以 fetched_at 为准"""
+    cache.set(_shared_key(symbol), _shared_entry(quote), int(quote_ttl()) + 1)
+
+
+def store_quote(symbol: str, quote: Dict[str, Any]) -> None:
+    """写入 L1 + L2（上游取到新报价后调用）"""
+    _quote_cache.set(symbol, quote, ttl=quote_ttl)
+    _share(symbol, quote)
+
+
+def _fetch_and_share(symbol: str) -> Dict[str, Any]:
+    """
+    L1 / L2 都 miss 时调用：通过 cache.get_or_set 取上游，
+    多个进程同时 miss 同一 symbol 时只有一个请求 Yahoo（共享 cache backend 支持时）
+    """
+    entry = cache.get_or_set(
+        _shared_key(symbol),
+        lambda: _shared_entry(_fetch_current_price(symbol)),
+        int(quote_ttl()) + 1,
+    )
+    if _ttl_left(entry) <= 0:
+        # 拿到的是另一个进程按旧 TTL 写入、已过期的条目
+        entry = _shared_entry(_fetch_current_price(symbol))
+        cache.set(_shared_key(symbol), entry, int(quote_ttl()) + 1)
+    return entry["quote"]
+
+
+def refresh_quote(symbol: str) -> Dict[str, Any]:
+    """无视缓存直接请求上游，并写入 L1 + L2（refresh_market_data 使用）"""
+    symbol = symbol.upper()
+    quote = _fetch_current_price(symbol)
+    store_quote(symbol, quote)
+    return dict(quote)
+
 
 def get_current_price(symbol: str) -> Dict[str, Any]:
+    """
+    获取当前价格（带缓存）
+
+    - 同一 symbol 在 TTL 内直接返回缓存结果（进程内 L1 -> 共享 L2）
+    - 多个请求同时 miss 同一 symbol 时，只请求一次上游
+    """
+    symbol = symbol.upper()
+
+    cached, _ = _quote_cache.get_many([symbol])
+    quote: Optional[Dict[str, Any]] = cached.get(symbol) or _shared_quotes([symbol]).get(symbol)
+    if quote is None:
+        quote = _quote_cache.get_or_load(
+            symbol,
+            lambda: _fetch_and_share(symbol),
+            ttl=quote_ttl,
+        )
+    return dict(quote)
+
+
+# async 版本的 single-flight：每个事件循环一份 symbol -> 正在进行的 Task
+_async_inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+async def get_current_price_async(symbol: str) -> Dict[str, Any]:
+    """get_current_price 的 async 版本：共用同一个报价缓存"""
+    symbol = symbol.upper()
+
+    quote = _quote_cache.get(symbol)
+    if quote is not None:
+        return dict(quote)
+
+    key = _shared_key(symbol)
+    entry = await cache.aget(key)
+    if entry is not None:
+        shared = _from_shared({key: entry})
+        if symbol in shared:
+            return dict(shared[symbol])
+
+    inflight = _async_inflight.setdefault(asyncio.get_running_loop(), {})
+    task = inflight.get(symbol)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_current_price_async(symbol))
+        inflight[symbol] = task
+        task.add_done_callback(lambda _t: inflight.pop(symbol, None))
+
+    quote = await asyncio.shield(task)
+    _quote_cache.set(symbol, quote, ttl=quote_ttl)
+    await cache.aset(key, _shared_entry(quote), int(quote_ttl()) + 1)
+    return dict(quote)
+
+
+def _fetch_current_price(symbol: str) -> Dict[str, Any]:
     """
     使用 intraday（1-minute）数据计算“当前价格”。
 
@@ -23,23 +195,27 @@ def get_current_price(symbol: str) -> Dict[str, Any]:
         "symbol": "AAPL",
         "price": 279.50,
         "time": "2025-12-15T09:34",
-        "market_state": "RTH"
+        "market_state": "RTH",
+        "previous_close": 278.10
     }
     """
 
     symbol = symbol.upper()
+    js = http_get(_quote_url(symbol), params=QUOTE_PARAMS)
+    return _parse_quote(symbol, js)
 
-    # Yahoo Finance chart API（1-minute）
-    url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
 
-    params = {
-        "interval": "1m",
-        "range": "1d",
-        "includePrePost": "true",
-    }
+async def _fetch_current_price_async(symbol: str) -> Dict[str, Any]:
+    js = await async_http_get(_quote_url(symbol), params=QUOTE_PARAMS)
+    return _parse_quote(symbol, js)
+
+
+def _quote_url(symbol: str) -> str:
+    # Yahoo Finance chart API（1-minute）
+    return f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
 
-    js = http_get(url, params=params)
 
+def _parse_quote(symbol: str, js: Dict[str, Any]) -> Dict[str, Any]:
     # -------- 解析 Yahoo chart 返回 --------
     chart = js.get("chart", {})
     result = chart.get("result")
@@ -50,10 +226,15 @@ def get_current_price(symbol: str) -> Dict[str, Any]:
             "price": None,
             "time": None,
             "market_state": None,
+            "previous_close": None,
         }
 
     r0 = result[0]
 
+    # 上一交易日收盘价（range=1d 时 chartPreviousClose 即昨收），用来算日涨跌
+    meta = r0.get("meta") or {}
+    previous_close = meta.get("chartPreviousClose") or meta.get("previousClose")
+
     timestamps = r0.get("timestamp")
     indicators = r0.get("indicators", {})
     quote = indicators.get("quote", [{}])[0]
@@ -66,6 +247,7 @@ def get_current_price(symbol: str) -> Dict[str, Any]:
             "price": None,
             "time": None,
             "market_state": None,
+            "previous_close": None,
         }
 
     # -------- 取最后一根有效 K 线 --------
@@ -80,6 +262,7 @@ def get_current_price(symbol: str) -> Dict[str, Any]:
             "price": None,
             "time": None,
             "market_state": None,
+            "previous_close": None,
         }
 
     price = closes[idx]
@@ -101,4 +284,33 @@ def get_current_price(symbol: str) -> Dict[str, Any]:
         "price": float(price),
         "time": time_str,
         "market_state": market_state,
+        "previous_close": float(previous_close) if previous_close is not None else None,
     }
+
+
+def get_current_prices(symbols: Iterable[str]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    批量获取多个 symbol 的当前价格
+
+    先查缓存（L1，再批量查 L2），只对缓存里都没有的 symbol 并发请求上游。
+
+    :return: (quotes, errors)
+        quotes: symbol -> get_current_price 的返回值
+        errors: symbol -> 错误信息
+    """
+    uniq = list(dict.fromkeys(s.upper() for s in symbols))
+
+    cached, missing = _quote_cache.get_many(uniq)
+    shared = _shared_quotes(missing)
+    fetched, errors = fan_out(get_current_price, [s for s in missing if s not in shared])
+
+    quotes: Dict[str, Any] = {}
+    for s in uniq:
+        if s in cached:
+            quotes[s] = dict(cached[s])
+        elif s in shared:
+            quotes[s] = dict(shared[s])
+        elif s in fetched:
+            quotes[s] = fetched[s]
+
+    return quotes, errors
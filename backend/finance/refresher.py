@@ -0,0 +1,77 @@
+# finance/refresher.py
+# ------------------------------------------------------------
+# 后台行情刷新（refresh_market_data 命令）
+#
+# 对所有被持有 / 关注的 symbol（core.holdings.tracked_symbols）：
+#   - 刷新报价：写入进程内缓存 + Django cache（get_current_price 的 L2）
+#   - 刷新当天 1m K 线：写入 IntradaySession（fetch_intraday 读本地）
+# 分批交给共享线程池并发，所有上游请求经过同一个令牌桶限速。
+# 用户请求因此基本只读缓存，上游请求量只与 symbol 数有关，与用户数无关。
+# ------------------------------------------------------------
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from common.rate_limit import RateLimiter
+
+from .concurrency import fan_out
+from .price_service import refresh_quote
+from .services import refresh_intraday
+
+# 每批交给线程池的 symbol 数
+REFRESH_BATCH_SIZE = 20
+
+# 上游请求速率（次 / 秒），报价和 K 线各算一次
+REFRESH_RATE = float(os.getenv("MARKET_DATA_RATE", "10"))
+
+# 单批的截止时间（秒），超时的 symbol 记入 errors
+BATCH_DEADLINE = 60.0
+
+
+@dataclass
+class RefreshResult:
+    symbols: int = 0
+    quotes: int = 0
+    bars: int = 0
+    errors: Dict[str, str] = field(default_factory=dict)
+
+
+def _chunks(items: List[str], size: int) -> Iterable[List[str]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def refresh_symbols(
+    symbols: Iterable[str],
+    limiter: Optional[RateLimiter] = None,
+    quotes: bool = True,
+    bars: bool = True,
+    batch_size: int = REFRESH_BATCH_SIZE,
+) -> RefreshResult:
+    """刷新一轮；单个 symbol 失败不影响其它 symbol"""
+    limiter = limiter or RateLimiter(REFRESH_RATE)
+    uniq = list(dict.fromkeys(s.upper() for s in symbols))
+    result = RefreshResult(symbols=len(uniq))
+
+    def refresh_one(symbol: str) -> Dict[str, bool]:
+        done = {"quote": False, "bars": False}
+        if quotes:
+            limiter.acquire()
+            refresh_quote(symbol)
+            done["quote"] = True
+        if bars:
+            limiter.acquire()
+            refresh_intraday(symbol)
+            done["bars"] = True
+        return done
+
+    for batch in _chunks(uniq, batch_size):
+        done, errors = fan_out(refresh_one, batch, timeout=BATCH_DEADLINE)
+        result.quotes += sum(d["quote"] for d in done.values())
+        result.bars += sum(d["bars"] for d in done.values())
+        result.errors.update(errors)
+
+    return result
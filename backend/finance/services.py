@@ -2,16 +2,27 @@
 # ------------------------------------------------------------
 # Yahoo Finance 数据服务（等价于 yahooService.js）
 # 提供 fetch_intraday() 获取 1m 盘中数据（只保留 RTH）
+# 内部全程使用列式 IntradayColumns，只在返回时转成 list[dict]
+#
+# 已收盘的交易日写入本地 IntradaySession 后不再请求上游；
+# 当天盘中只增量拉取最后一根 bar 之后的分钟（INTRADAY_REFRESH 秒内不重复拉取）。
 # ------------------------------------------------------------
 
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import datetime, date, time as dtime, timedelta
-from typing import List, Optional, Dict, Any
+from datetime import datetime, date, timedelta
+from typing import List, Optional, Dict, Any, Tuple
 
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
 from zoneinfo import ZoneInfo  # Python 3.9+ 推荐
+from common.downsample import lttb
+from . import bar_store
+from .async_http import async_http_get
+from .columnar import IntradayColumns
 from .http_helper import http_get
+from .market_hours import RTH_OPEN, RTH_CLOSE, now_ny, seconds_until_session_change
 
 
 # 常量定义
@@ -20,101 +31,322 @@ NY_TZ = ZoneInfo("America/New_York")
 INTERVAL = "1m"
 RANGE = "1d"
 
+# 收盘后再等几分钟，Yahoo 数据落定后才把当天标记为 complete
+SESSION_SETTLE = timedelta(minutes=5)
+
+# 已收盘交易日的降采样结果（按档位）缓存时间
+DOWNSAMPLE_CACHE_TTL = 24 * 3600
+
+# 当天盘中的本地数据在这么多秒内视为最新，不再向上游增量拉取
+# （refresh_market_data 在后台按这个节奏刷新，用户请求只读本地）
+INTRADAY_REFRESH = 30
+
+# range=1d（开盘前 / 周末）的结果缓存时间上限；下一次时段切换前内容不会变
+LATEST_SESSION_TTL = 3600
+
+
+def _session_bounds(trading_date: date) -> Tuple[datetime, datetime]:
+    """交易日的 RTH 请求区间：纽约时间 09:30 ~ 16:00（+2min buffer）"""
+    open_local = datetime.combine(trading_date, RTH_OPEN, tzinfo=NY_TZ)
+    close_local = datetime.combine(trading_date, RTH_CLOSE, tzinfo=NY_TZ) + timedelta(minutes=2)
+    return open_local, close_local
+
+
+def _is_session_complete(trading_date: date, now: datetime) -> bool:
+    close_local = datetime.combine(trading_date, RTH_CLOSE, tzinfo=NY_TZ)
+    return now >= close_local + SESSION_SETTLE
+
+
+def _request_bars(symbol: str, params: Dict[str, Any]) -> IntradayColumns:
+    """请求 Yahoo Finance 并解析为 RTH K 线（列式）"""
+    url = f"{BASE}{symbol}"
+    js = http_get(url, params={"interval": INTERVAL, **params})
+    return IntradayColumns.from_chart(js["chart"]["result"][0])
+
+
+async def _request_bars_async(symbol: str, params: Dict[str, Any]) -> IntradayColumns:
+    url = f"{BASE}{symbol}"
+    js = await async_http_get(url, params={"interval": INTERVAL, **params})
+    return IntradayColumns.from_chart(js["chart"]["result"][0])
+
 
 @dataclass
-class IntradayBar:
-    time: str      # "YYYY-MM-DDTHH:mm"
-    open: Optional[float]
-    high: Optional[float]
-    low: Optional[float]
-    close: Optional[float]
-    volume: int
-
-
-def _format_price(x: Optional[float]) -> Optional[float]:
-    """价格保留 2 位小数，等价 JS 的 toFixed(2) + Number(...)"""
-    if x is None:
-        return None
-    return float(f"{x:.2f}")
+class _SessionPlan:
+    """读本地存储后得出的结论：直接返回 stored，或按 params 增量请求上游"""
+    symbol: str
+    trading_date: date
+    complete: bool
+    stored: IntradayColumns
+    params: Optional[Dict[str, Any]] = None  # None 表示无需请求上游
 
 
-def fetch_intraday(symbol: str, date_str: Optional[str] = None) -> List[Dict[str, Any]]:
+def _plan_session(
+    symbol: str,
+    trading_date: date,
+    now: datetime,
+    max_age: float = INTRADAY_REFRESH,
+) -> _SessionPlan:
     """
-    获取 1 分钟盘中数据（只保留常规交易时段 RTH: 09:30–16:00）
+    从本地存储读取某交易日的 K 线，决定是否需要向上游补齐
+
+    - 已 complete：直接返回，无网络请求
+    - max_age 秒内刚更新过：直接返回本地数据
+    - 否则：从最后一根已存 bar 所在的分钟开始增量拉取（最后一根可能是未走完的分钟，
+      last_timestamp 可能带秒，按分钟向下取整，该分钟及之后的本地 bar 都会被覆盖）
+    """
+    session = bar_store.get_session(symbol, trading_date)
+    if session is not None and session.complete:
+        return _SessionPlan(symbol, trading_date, True, IntradayColumns.from_json(session.bars))
+
+    if session is not None and 0 <= (now - session.updated_at).total_seconds() < max_age:
+        return _SessionPlan(symbol, trading_date, False, IntradayColumns.from_json(session.bars))
+
+    open_local, close_local = _session_bounds(trading_date)
+    complete = _is_session_complete(trading_date, now)
+
+    stored = IntradayColumns.empty()
+    period1 = int(open_local.timestamp())
+
+    if session is not None and session.last_timestamp is not None:
+        stored = IntradayColumns.from_json(session.bars)
+        period1 = session.last_timestamp - session.last_timestamp % 60
+
+    plan = _SessionPlan(symbol, trading_date, complete, stored)
+
+    period2 = int(min(now, close_local).timestamp())
+    if period2 > period1:
+        plan.params = {"period1": period1, "period2": period2}
+    return plan
+
+
+def _apply_session(plan: _SessionPlan, fresh: IntradayColumns) -> IntradayColumns:
+    """把上游新拉到的 bar 合并进本地存储"""
+    period1 = plan.params["period1"]
+    fresh = fresh[fresh.timestamps >= period1]
+
+    # 重新拉到的分钟覆盖本地 period1 之后的所有 bar（包括带秒的未走完分钟）
+    stored = plan.stored
+    if len(fresh):
+        stored = stored[stored.timestamps < min(period1, int(fresh.timestamps[0]))]
+
+    cols = stored.concat(fresh)
+    last_timestamp = int(cols.timestamps[-1]) if len(cols) else None
+
+    bar_store.save_session(
+        plan.symbol,
+        plan.trading_date,
+        cols.to_json(),
+        last_timestamp,
+        plan.complete,
+    )
+    return cols
+
+
+def _load_session(
+    symbol: str,
+    trading_date: date,
+    now: datetime,
+    max_age: float = INTRADAY_REFRESH,
+) -> IntradayColumns:
+    plan = _plan_session(symbol, trading_date, now, max_age)
+    if plan.params is None:
+        return plan.stored
+    return _apply_session(plan, _request_bars(symbol, plan.params))
+
+
+async def _load_session_async(symbol: str, trading_date: date, now: datetime) -> IntradayColumns:
+    plan = await sync_to_async(_plan_session)(symbol, trading_date, now)
+    if plan.params is None:
+        return plan.stored
+    fresh = await _request_bars_async(symbol, plan.params)
+    return await sync_to_async(_apply_session)(plan, fresh)
+
+
+def _store_latest_session(symbol: str, cols: IntradayColumns, now: datetime) -> IntradayColumns:
+    """range=1d 的结果：已收盘的那一天顺便写入本地存储"""
+    if len(cols):
+        trading_date = datetime.fromtimestamp(int(cols.timestamps[0]), tz=NY_TZ).date()
+        if _is_session_complete(trading_date, now):
+            bar_store.save_session(
+                symbol,
+                trading_date,
+                cols.to_json(),
+                int(cols.timestamps[-1]),
+                True,
+            )
+
+    return cols
+
+
+def _latest_cache_key(symbol: str) -> str:
+    return f"finance:intraday:latest:{symbol}"
+
+
+def _latest_cache_ttl(now: datetime) -> int:
+    return max(1, int(min(LATEST_SESSION_TTL, seconds_until_session_change(now))))
+
+
+def _fetch_latest_session(symbol: str, now: datetime) -> IntradayColumns:
+    """
+    range=1d：返回最近一个交易日（开盘前 / 周末 / 节假日时即上一个交易日）
+    """
+    cached = cache.get_or_set(
+        _latest_cache_key(symbol),
+        lambda: _store_latest_session(symbol, _request_bars(symbol, {"range": RANGE}), now).to_json(),
+        _latest_cache_ttl(now),
+    )
+    return IntradayColumns.from_json(cached)
+
+
+async def _fetch_latest_session_async(symbol: str, now: datetime) -> IntradayColumns:
+    key = _latest_cache_key(symbol)
+    cached = await cache.aget(key)
+    if cached is not None:
+        return IntradayColumns.from_json(cached)
+
+    cols = await _request_bars_async(symbol, {"range": RANGE})
+    cols = await sync_to_async(_store_latest_session)(symbol, cols, now)
+    await cache.aset(key, cols.to_json(), _latest_cache_ttl(now))
+    return cols
+
+
+def _is_open_today(now: datetime) -> bool:
+    """今天是交易日且已开盘（未处理节假日：节假日取不到 bar，会退回 range=1d）"""
+    return now.weekday() < 5 and now.time() >= RTH_OPEN
+
+
+def fetch_intraday_columns(symbol: str, date_str: Optional[str] = None) -> IntradayColumns:
+    """
+    获取 1 分钟盘中数据（只保留常规交易时段 RTH: 09:30–16:00），列式返回
 
     :param symbol: 股票代码，例如 "AAPL"
     :param date_str: 日期字符串 "YYYY-MM-DD"，可选
-    :return: 标准化的 K 线数组（list[dict]），字段与 Node 版本完全一致
     """
+    symbol = symbol.upper()
+    now = now_ny()
+    today = now.date()
 
-    # 构造 URL + 基础参数
-    url = f"{BASE}{symbol}"
-    params: Dict[str, Any] = {"interval": INTERVAL}
+    if date_str:
+        trading_date: date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        if trading_date > today:
+            return IntradayColumns.empty()
+        return _load_session(symbol, trading_date, now)
+
+    # 未指定日期：今天已开盘则走本地存储 + 增量，否则取最近一个交易日
+    if _is_open_today(now):
+        cols = _load_session(symbol, today, now)
+        if len(cols):
+            return cols
+
+    return _fetch_latest_session(symbol, now)
+
+
+def refresh_intraday(symbol: str) -> IntradayColumns:
+    """
+    后台刷新（refresh_market_data 使用）：当天盘中无视 INTRADAY_REFRESH 立即增量拉取；
+    已收盘 / 未开盘时与 fetch_intraday_columns 相同（有本地或缓存数据就不请求上游）
+    """
+    symbol = symbol.upper()
+    now = now_ny()
+
+    if _is_open_today(now):
+        cols = _load_session(symbol, now.date(), now, max_age=0)
+        if len(cols):
+            return cols
+
+    return _fetch_latest_session(symbol, now)
+
+
+async def fetch_intraday_columns_async(symbol: str, date_str: Optional[str] = None) -> IntradayColumns:
+    """fetch_intraday_columns 的 async 版本（上游请求走 async HTTP 客户端）"""
+    symbol = symbol.upper()
+    now = now_ny()
+    today = now.date()
 
-    # 根据是否提供 date 决定使用 period1/period2 还是 range=1d
     if date_str:
-        # 将 YYYY-MM-DD 转为纽约时间 09:30 ~ 16:00（+2min buffer）
         trading_date: date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        if trading_date > today:
+            return IntradayColumns.empty()
+        return await _load_session_async(symbol, trading_date, now)
+
+    if _is_open_today(now):
+        cols = await _load_session_async(symbol, today, now)
+        if len(cols):
+            return cols
+
+    return await _fetch_latest_session_async(symbol, now)
+
+
+# ------------------------------------------------------------
+# 降采样（缩略图 / sparkline）
+# ------------------------------------------------------------
+def downsample_columns(cols: IntradayColumns, points: int) -> IntradayColumns:
+    """按收盘价做 LTTB，选出 points 根 bar（其余列跟着取）"""
+    if len(cols) <= points:
+        return cols
+    return cols[lttb(cols.timestamps, cols.close, points)]
 
-        open_local = datetime.combine(trading_date, dtime(9, 30), tzinfo=NY_TZ)
-        close_local = datetime.combine(trading_date, dtime(16, 0), tzinfo=NY_TZ) + timedelta(minutes=2)
-
-        params["period1"] = int(open_local.timestamp())
-        params["period2"] = int(close_local.timestamp())
-    else:
-        params["range"] = RANGE
-
-    # 请求 Yahoo Finance
-    js = http_get(url, params=params)
-
-    # 解析结构
-    result = js["chart"]["result"][0]
-    timestamps = result.get("timestamp") or []
-    quote = (result.get("indicators") or {}).get("quote") or [{}]
-    quote0 = quote[0]
-
-    opens = quote0.get("open") or []
-    highs = quote0.get("high") or []
-    lows = quote0.get("low") or []
-    closes = quote0.get("close") or []
-    volumes = quote0.get("volume") or []
-
-    bars: List[IntradayBar] = []
-
-    # 遍历每一个时间点，做 RTH 过滤 + 格式化
-    for i, ts in enumerate(timestamps):
-        # ts 是秒级 UNIX 时间戳
-        t_ny = datetime.fromtimestamp(ts, tz=NY_TZ)
-
-        hour = t_ny.hour
-        minute = t_ny.minute
-
-        # 只保留 RTH: 09:30–16:00（含 16:00）
-        is_rth = (
-            (hour > 9 or (hour == 9 and minute >= 30))
-            and (hour < 16 or (hour == 16 and minute == 0))
-        )
-        if not is_rth:
-            continue
-
-        time_str = t_ny.strftime("%Y-%m-%dT%H:%M")
-
-        # 各价格数组可能 None 或短于 timestamps，因此要防御性取值
-        o = opens[i] if i < len(opens) else None
-        h = highs[i] if i < len(highs) else None
-        l = lows[i] if i < len(lows) else None
-        c = closes[i] if i < len(closes) else None
-        v_raw = volumes[i] if i < len(volumes) else 0
-
-        bar = IntradayBar(
-            time=time_str,
-            open=_format_price(o),
-            high=_format_price(h),
-            low=_format_price(l),
-            close=_format_price(c),
-            volume=int(v_raw or 0),
-        )
-        bars.append(bar)
-
-    # 返回 JS 里 data.filter(Boolean) 之后的结果：list[dict]
-    return [bar.__dict__ for bar in bars]
+
+def _downsample_cache_key(symbol: str, date_str: Optional[str], level: Optional[str]) -> Optional[str]:
+    """只有“已收盘交易日 + 固定档位”的结果才缓存，返回 None 表示不缓存"""
+    if level is None or not date_str:
+        return None
+    trading_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+    if not _is_session_complete(trading_date, now_ny()):
+        return None
+    return f"finance:intraday:lttb:{symbol.upper()}:{date_str}:{level}"
+
+
+def fetch_intraday_downsampled(
+    symbol: str,
+    date_str: Optional[str],
+    points: int,
+    level: Optional[str] = None,
+) -> IntradayColumns:
+    """
+    fetch_intraday_columns + LTTB 降采样
+
+    :param level: 命名档位（common.downsample.RESOLUTIONS），已收盘交易日会缓存
+    """
+    key = _downsample_cache_key(symbol, date_str, level)
+    if key:
+        cached = cache.get(key)
+        if cached is not None:
+            return IntradayColumns.from_json(cached)
+
+    cols = downsample_columns(fetch_intraday_columns(symbol, date_str), points)
+
+    # 空结果不缓存（get_or_set 在部分 backend 上会把 None 也存进去）
+    if key and len(cols):
+        cache.set(key, cols.to_json(), DOWNSAMPLE_CACHE_TTL)
+    return cols
+
+
+async def fetch_intraday_downsampled_async(
+    symbol: str,
+    date_str: Optional[str],
+    points: int,
+    level: Optional[str] = None,
+) -> IntradayColumns:
+    key = _downsample_cache_key(symbol, date_str, level)
+    if key:
+        cached = await cache.aget(key)
+        if cached is not None:
+            return IntradayColumns.from_json(cached)
+
+    cols = downsample_columns(await fetch_intraday_columns_async(symbol, date_str), points)
+
+    if key and len(cols):
+        await cache.aset(key, cols.to_json(), DOWNSAMPLE_CACHE_TTL)
+    return cols
+
+
+def fetch_intraday(symbol: str, date_str: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    获取 1 分钟盘中数据（只保留常规交易时段 RTH: 09:30–16:00）
+
+    :param symbol: 股票代码，例如 "AAPL"
+    :param date_str: 日期字符串 "YYYY-MM-DD"，可选
+    :return: 标准化的 K 线数组（list[dict]），字段与 Node 版本完全一致
+    """
+    return fetch_intraday_columns(symbol, date_str).to_records()
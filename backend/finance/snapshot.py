@@ -0,0 +1,105 @@
+# finance/snapshot.py
+# ------------------------------------------------------------
+# watchlist 快照：一次返回每个 symbol 的报价、日涨跌和 sparkline
+#
+# - 报价走 price_service 的报价缓存
+# - sparkline = 最近一个交易日的 1m 收盘价做 LTTB（sparkline 档位），
+#   按报价同样的 TTL 缓存
+# - 两个缓存都命中的 symbol 直接返回，其余的用共享线程池并发获取
+# ------------------------------------------------------------
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from common.downsample import RESOLUTIONS
+
+from .cache import TTLCache
+from .concurrency import fan_out
+from .price_service import QUOTE_CACHE_MAXSIZE, get_current_price, get_quote_cache, quote_ttl
+from .services import downsample_columns, fetch_intraday_columns
+
+SPARKLINE_POINTS = RESOLUTIONS["sparkline"]
+
+# 整批的截止时间（秒），超时的 symbol 记入 errors
+SNAPSHOT_DEADLINE = 8.0
+
+# symbol -> {"time": [...], "close": [...]}
+_sparkline_cache = TTLCache(maxsize=QUOTE_CACHE_MAXSIZE)
+
+
+def get_sparkline_cache() -> TTLCache:
+    return _sparkline_cache
+
+
+def _load_sparkline(symbol: str) -> Dict[str, List[Any]]:
+    cols = downsample_columns(fetch_intraday_columns(symbol), SPARKLINE_POINTS)
+    columns = cols.to_columns()
+    return {"time": columns["time"], "close": columns["close"]}
+
+
+def get_sparkline(symbol: str) -> Dict[str, List[Any]]:
+    symbol = symbol.upper()
+    return _sparkline_cache.get_or_load(symbol, lambda: _load_sparkline(symbol), ttl=quote_ttl)
+
+
+def day_change(quote: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """相对昨收的涨跌额 / 涨跌幅（%）；缺数据时为 None"""
+    price = quote.get("price")
+    prev = quote.get("previous_close")
+    if price is None or not prev:
+        return {"change": None, "change_pct": None}
+
+    change = price - prev
+    return {
+        "change": round(change, 4),
+        "change_pct": round(change / prev * 100, 4),
+    }
+
+
+def _snapshot(quote: Dict[str, Any], sparkline: Optional[Dict[str, List[Any]]]) -> Dict[str, Any]:
+    return {**quote, **day_change(quote), "sparkline": sparkline}
+
+
+def _load_snapshot(symbol: str) -> Dict[str, Any]:
+    quote = get_current_price(symbol)
+    try:
+        sparkline = get_sparkline(symbol)
+    except Exception:
+        # 拿不到分钟线时仍然返回报价
+        sparkline = None
+    return _snapshot(quote, sparkline)
+
+
+def get_snapshots(symbols: Iterable[str]) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """
+    :return: (items, errors)
+        items:  按 symbols 顺序的快照
+                {symbol, price, time, market_state, previous_close,
+                 change, change_pct, sparkline: {"time", "close"}}
+        errors: symbol -> 错误信息
+    """
+    uniq = list(dict.fromkeys(s.upper() for s in symbols))
+
+    quotes, _ = get_quote_cache().get_many(uniq)
+    sparklines, _ = _sparkline_cache.get_many(uniq)
+
+    ready = {
+        s: _snapshot(dict(quotes[s]), sparklines[s])
+        for s in uniq
+        if s in quotes and s in sparklines
+    }
+    fetched, errors = fan_out(
+        _load_snapshot,
+        [s for s in uniq if s not in ready],
+        timeout=SNAPSHOT_DEADLINE,
+    )
+
+    items = []
+    for s in uniq:
+        if s in ready:
+            items.append(ready[s])
+        elif s in fetched:
+            items.append(fetched[s])
+
+    return items, errors
@@ -0,0 +1,201 @@
+# finance/stream.py
+# ------------------------------------------------------------
+# 行情推送（SSE，/api/stocks/stream/）
+#
+# 每个 symbol 只有一个轮询任务（_SymbolPoller），结果分发给所有订阅者：
+#   - quote：报价有变化时推送（get_current_price_async，读共享报价缓存）
+#   - bars：当天 1m K 线的增量（最后一根未走完的分钟会重复推送，按时间戳覆盖）
+# 没有订阅者后轮询任务自动退出。
+# 上游请求量只与被订阅的 symbol 数有关；服务器成本由连接数决定。
+#
+# Hub 绑定在事件循环上（ASGI 下整个进程一个循环）。
+# ------------------------------------------------------------
+
+from __future__ import annotations
+
+import asyncio
+import json
+import weakref
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from .market_hours import now_ny
+from .price_service import get_current_price_async, quote_ttl
+from .services import fetch_intraday_columns_async
+
+# 轮询间隔（秒）跟随报价 TTL，限制在这个范围内
+POLL_MIN_INTERVAL = 5.0
+POLL_MAX_INTERVAL = 60.0
+
+# 没有事件时每隔多少秒发一次心跳（防止代理断开空闲连接）
+HEARTBEAT_INTERVAL = 15.0
+
+# 每个连接的事件队列长度；消费太慢时丢弃最旧的事件
+SUBSCRIBER_QUEUE_SIZE = 100
+
+MAX_STREAM_SYMBOLS = 50
+MAX_STREAM_CONNECTIONS = 1000
+
+
+class StreamFull(Exception):
+    """连接数已达上限"""
+
+
+def _event(name: str, data: Dict[str, Any]) -> str:
+    return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class _Subscriber:
+    def __init__(self, symbols: List[str]) -> None:
+        self.symbols = symbols
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def push(self, message: str) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+
+class _SymbolPoller:
+    def __init__(self, hub: "QuoteHub", symbol: str) -> None:
+        self.hub = hub
+        self.symbol = symbol
+        self.subscribers: Set[_Subscriber] = set()
+
+        self.quote: Optional[Dict[str, Any]] = None
+        self.bars: Optional[Dict[str, Any]] = None   # 最近一次推送的 bars 增量
+        self.last_ts: Optional[int] = None
+
+        self.task = asyncio.ensure_future(self._run())
+
+    def publish(self, message: str) -> None:
+        for sub in list(self.subscribers):
+            sub.push(message)
+
+    def replay(self, sub: _Subscriber) -> None:
+        """新订阅者先收到最近的报价 / 最后一根 bar"""
+        if self.quote is not None:
+            sub.push(_event("quote", self.quote))
+        if self.bars is not None:
+            sub.push(_event("bars", self.bars))
+
+    async def _poll_quote(self) -> None:
+        quote = await get_current_price_async(self.symbol)
+        if quote != self.quote:
+            self.quote = quote
+            self.publish(_event("quote", quote))
+
+    async def _poll_bars(self) -> None:
+        cols = await fetch_intraday_columns_async(self.symbol)
+        if not len(cols):
+            return
+
+        # 从上次推送的最后一根开始（含），那一根可能还在变化
+        start = self.last_ts if self.last_ts is not None else int(cols.timestamps[-1])
+        tail = cols[cols.timestamps >= start]
+        if not len(tail):
+            return
+
+        payload = {"symbol": self.symbol, "columns": tail.to_columns()}
+        if payload != self.bars:
+            self.bars = payload
+            self.last_ts = int(tail.timestamps[-1])
+            self.publish(_event("bars", payload))
+
+    async def _run(self) -> None:
+        try:
+            while self.subscribers:
+                for poll in (self._poll_quote, self._poll_bars):
+                    try:
+                        await poll()
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        self.publish(_event("error", {"symbol": self.symbol, "error": str(e)}))
+
+                interval = min(POLL_MAX_INTERVAL, max(POLL_MIN_INTERVAL, quote_ttl()))
+                await asyncio.sleep(interval)
+        finally:
+            if self.hub._pollers.get(self.symbol) is self:
+                del self.hub._pollers[self.symbol]
+
+
+class QuoteHub:
+    def __init__(self) -> None:
+        self._pollers: Dict[str, _SymbolPoller] = {}
+        self._connections = 0
+
+    def subscribe(self, symbols: Iterable[str]) -> _Subscriber:
+        """
+        :raises StreamFull: 连接数已达 MAX_STREAM_CONNECTIONS
+        """
+        if self._connections >= MAX_STREAM_CONNECTIONS:
+            raise StreamFull(f"At most {MAX_STREAM_CONNECTIONS} stream connections")
+        self._connections += 1
+
+        sub = _Subscriber(list(symbols))
+        for symbol in sub.symbols:
+            poller = self._pollers.get(symbol)
+            if poller is None:
+                poller = _SymbolPoller(self, symbol)
+                self._pollers[symbol] = poller
+            else:
+                poller.replay(sub)
+            poller.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: _Subscriber) -> None:
+        self._connections -= 1
+        for symbol in sub.symbols:
+            poller = self._pollers.get(symbol)
+            if poller is None:
+                continue
+            poller.subscribers.discard(sub)
+            if not poller.subscribers:
+                poller.task.cancel()
+                self._pollers.pop(symbol, None)
+
+    def is_full(self) -> bool:
+        return self._connections >= MAX_STREAM_CONNECTIONS
+
+    def stats(self) -> Dict[str, int]:
+        return {"connections": self._connections, "symbols": len(self._pollers)}
+
+    async def stream(self, symbols: Iterable[str]) -> AsyncIterator[str]:
+        """
+        SSE 消息流
+
+        在生成器开始迭代时才订阅：响应没被发送时不会留下订阅；
+        客户端断开（生成器被关闭）时自动退订
+
+        视图返回响应前已经检查过 is_full()，但开始迭代之前名额仍可能被别的连接占满；
+        这时响应头已经发出，不能再改成 503，只发一条 error 事件后正常结束
+        """
+        try:
+            sub = self.subscribe(symbols)
+        except StreamFull as e:
+            yield _event("error", {"error": str(e)})
+            return
+
+        try:
+            yield _event("hello", {"symbols": sub.symbols, "time": now_ny().isoformat()})
+            while True:
+                try:
+                    message = await asyncio.wait_for(sub.queue.get(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    message = ": keep-alive\n\n"
+                yield message
+        finally:
+            self.unsubscribe(sub)
+
+
+_hubs: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, QuoteHub]" = weakref.WeakKeyDictionary()
+
+
+def get_hub() -> QuoteHub:
+    """返回当前事件循环的 QuoteHub（懒加载）"""
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = QuoteHub()
+        _hubs[loop] = hub
+    return hub
@@ -0,0 +1,651 @@
+import importlib
+import math
+from datetime import date, datetime, time, timedelta
+from time import monotonic
+from unittest import mock
+
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from urllib3.exceptions import EmptyPoolError
+
+from .columnar import IntradayColumns, rth_mask
+from .http_helper import DeadlineExceeded, PooledHTTPClient, request_deadline
+from .indicator_service import SessionIndicatorState, get_indicators
+from .indicators import (
+    compute,
+    ema,
+    macd,
+    parse_indicator,
+    parse_indicator_names,
+    rsi,
+    to_json,
+    vwap,
+)
+from .market_hours import NY_TZ
+from .models import IntradaySession
+from .price_service import get_quote_cache
+from .services import INTRADAY_REFRESH, fetch_intraday_columns, fetch_intraday_downsampled
+from .snapshot import SPARKLINE_POINTS, day_change, get_snapshots, get_sparkline_cache
+from .stream import QuoteHub
+from .views import stock_intraday_view_async, stock_stream_view
+
+NAN = math.nan
+DAY = date(2026, 3, 2)  # 周一
+OPEN_TS = int(datetime(2026, 3, 2, 9, 30, tzinfo=NY_TZ).timestamp())
+
+
+def make_cols(closes, start=OPEN_TS, volume=100):
+    """按分钟排列的 bar：open = high = low = close"""
+    close = np.array(closes, dtype=float)
+    return IntradayColumns(
+        timestamps=start + 60 * np.arange(len(close), dtype=np.int64),
+        open=close.copy(),
+        high=close.copy(),
+        low=close.copy(),
+        close=close,
+        volume=np.full(len(close), volume, dtype=np.int64),
+    )
+
+
+def random_session(n=390, seed=7):
+    """随机游走的一天 1m bar，夹带几段缺失价格（NaN）"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.2, n))
+    close[[0, 57, 58, 200]] = NAN
+    cols = make_cols(np.round(close, 2))
+    cols.high = cols.close + 0.05
+    cols.low = cols.close - 0.05
+    cols.volume = rng.integers(0, 5000, n)
+    return cols
+
+
+def chart(cols):
+    """IntradayColumns -> Yahoo chart 接口的 JSON"""
+    return {"chart": {"result": [{
+        "timestamp": cols.timestamps.tolist(),
+        "indicators": {"quote": [{
+            "open": cols.open.tolist(),
+            "high": cols.high.tolist(),
+            "low": cols.low.tolist(),
+            "close": cols.close.tolist(),
+            "volume": cols.volume.tolist(),
+        }]},
+    }]}}
+
+
+def ny(hour, minute, second=0, day=DAY):
+    return datetime.combine(day, time(hour, minute, second), tzinfo=NY_TZ)
+
+
+class IndicatorMathTests(SimpleTestCase):
+    """小序列上手算的结果；数据不足的位置为 NaN"""
+
+    def assertSeries(self, actual, expected):
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-4, equal_nan=True)
+
+    def test_vwap(self):
+        high = np.array([11.0, 22.0, NAN, 30.0])
+        low = np.array([9.0, 18.0, NAN, 30.0])
+        close = np.array([10.0, 20.0, NAN, 30.0])
+        volume = np.array([100, 300, 500, 0])
+
+        # (10·100 + 20·300) / 400；NaN 的 bar 不计量；量为 0 不改变结果
+        self.assertSeries(vwap(high, low, close, volume), [10.0, 17.5, 17.5, 17.5])
+
+    def test_vwap_without_volume_is_nan(self):
+        close = np.array([10.0, 11.0])
+        self.assertSeries(vwap(close, close, close, np.array([0, 0])), [NAN, NAN])
+
+    def test_ema_seeds_with_sma(self):
+        # SMA(1, 2, 3) = 2，α = 0.5
+        self.assertSeries(ema(np.array([1.0, 2, 3, 4, 5, 6]), 3), [NAN, NAN, 2, 3, 4, 5])
+
+    def test_ema_forward_fills_gaps(self):
+        # [1, 2, NaN, 4] -> [1, 2, 2, 4]；SMA(1, 2) = 1.5，α = 2/3
+        self.assertSeries(ema(np.array([1.0, 2, NAN, 4]), 2), [NAN, 1.5, 1.8333, 3.2778])
+
+    def test_ema_too_short(self):
+        self.assertSeries(ema(np.array([1.0, 2]), 3), [NAN, NAN])
+
+    def test_rsi_warm_up_and_wilder_smoothing(self):
+        # 变化 [+1, -1, +2, 0]；首个 avg_gain = avg_loss = 0.5 -> 50
+        # 之后 (1.25, 0.25) -> 83.33，(0.625, 0.125) -> 83.33
+        self.assertSeries(rsi(np.array([10.0, 11, 10, 12, 12]), 2), [NAN, NAN, 50, 83.3333, 83.3333])
+
+    def test_rsi_leading_nan_shifts_warm_up(self):
+        out = rsi(np.array([NAN, 10.0, 11, 10, 12, 12]), 2)
+        self.assertSeries(out, [NAN, NAN, NAN, 50, 83.3333, 83.3333])
+
+    def test_rsi_without_losses(self):
+        self.assertSeries(rsi(np.array([1.0, 2, 3, 4]), 2), [NAN, NAN, 100, 100])
+        self.assertSeries(rsi(np.array([5.0, 5, 5]), 2), [NAN, NAN, 50])
+
+    def test_rsi_too_short(self):
+        self.assertTrue(np.isnan(rsi(np.array([1.0, 2, 3]), 3)).all())
+
+    def test_macd_signal_alignment(self):
+        close = np.array([1.0, 3, 2, 5, 4, 6])
+        out = macd(close, 2, 3, 2)
+
+        # EMA2 = [_, 2, 2, 4, 4, 5.3333]，EMA3 = [_, _, 2, 3.5, 3.75, 4.875]
+        self.assertSeries(out["macd"], [NAN, NAN, 0, 0.5, 0.25, 0.4583])
+        # signal 从 MACD 的第一个有效值起再等 signal 根：下标 (3-1) + (2-1) = 3
+        self.assertSeries(out["signal"], [NAN, NAN, NAN, 0.25, 0.25, 0.3889])
+        self.assertSeries(out["hist"], [NAN, NAN, NAN, 0.25, 0, 0.0694])
+
+
+class IndicatorNameTests(SimpleTestCase):
+    def test_parse(self):
+        self.assertEqual(parse_indicator("RSI").key, "rsi14")
+        self.assertEqual(parse_indicator("macd").key, "macd12_26_9")
+        self.assertEqual(parse_indicator(" ema20 ").key, "ema20")
+        self.assertEqual([s.key for s in parse_indicator_names("vwap,rsi14,,RSI")], ["vwap", "rsi14"])
+
+    def test_invalid(self):
+        for name in ("sma20", "ema", "ema0", "rsi0", "macd26_12_9", "macd1_2"):
+            with self.subTest(name=name), self.assertRaises(ValueError):
+                parse_indicator(name)
+
+
+@mock.patch("finance.views.get_indicators")
+class IndicatorViewValidationTests(SimpleTestCase):
+    """非法的 names 在请求上游之前返回 400"""
+
+    def test_bad_names(self, get):
+        for names in ("foo", "vwap,sma5", "ema0", "macd26_12_9", ""):
+            with self.subTest(names=names):
+                response = self.client.get("/api/stocks/MSFT/indicators/", {"names": names})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+        get.assert_not_called()
+
+
+class CompletedSessionIndicatorTests(TestCase):
+    """已收盘交易日：每个 (symbol, 交易日, 指标+参数) 只计算一次，结果存进 IntradaySession"""
+
+    def setUp(self):
+        self.cols = make_cols([10, 11, 10, 12, 12, 13, 12, 14])
+        IntradaySession.objects.create(
+            symbol="MSFT",
+            trading_date=DAY,
+            complete=True,
+            last_timestamp=int(self.cols.timestamps[-1]),
+            bars=self.cols.to_json(),
+        )
+        patcher = mock.patch("finance.indicator_service.fetch_intraday_columns", return_value=self.cols)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_computed_once_per_indicator(self):
+        specs = parse_indicator_names("rsi2,ema3")
+
+        with mock.patch("finance.indicator_service.compute", wraps=compute) as spy:
+            first = get_indicators("msft", DAY.isoformat(), specs)
+            second = get_indicators("MSFT", DAY.isoformat(), specs)
+            self.assertEqual(spy.call_count, 2)
+
+            # 只有新的参数组合需要计算
+            get_indicators("MSFT", DAY.isoformat(), parse_indicator_names("rsi3,rsi2"))
+            self.assertEqual(spy.call_count, 3)
+
+        self.assertEqual(first, second)
+        self.assertEqual(first["date"], "2026-03-02")
+        self.assertEqual(first["indicators"]["rsi2"][:3], [None, None, 50.0])
+        stored = IntradaySession.objects.get(symbol="MSFT").indicators
+        self.assertEqual(set(stored), {"rsi2", "ema3", "rsi3"})
+
+
+class StreamingIndicatorTests(SimpleTestCase):
+    """SessionIndicatorState.advance 的增量结果必须与整段向量化计算一致"""
+
+    SPECS = parse_indicator_names("vwap,ema20,rsi14,macd")
+
+    def assertMatchesVectorized(self, result, cols, specs=SPECS):
+        for spec in specs:
+            expected = to_json(compute(spec, cols))
+            actual = result[spec.key]
+            if spec.kind == "macd":
+                for part in ("macd", "signal", "hist"):
+                    self.assertSeriesEqual(actual[part], expected[part], f"{spec.key}.{part}")
+            else:
+                self.assertSeriesEqual(actual, expected, spec.key)
+
+    def assertSeriesEqual(self, actual, expected, label):
+        self.assertEqual(len(actual), len(expected), label)
+        for i, (a, e) in enumerate(zip(actual, expected)):
+            if e is None:
+                self.assertIsNone(a, f"{label}[{i}]")
+            else:
+                self.assertAlmostEqual(a, e, places=3, msg=f"{label}[{i}]")
+
+    def test_full_session(self):
+        cols = random_session()
+        self.assertMatchesVectorized(SessionIndicatorState().advance(cols, self.SPECS), cols)
+
+    def test_partial_folds(self):
+        cols = random_session()
+        state = SessionIndicatorState()
+
+        for stop in (1, 2, 15, 16, 40, 41, 41, 120, 300, 390):
+            with self.subTest(stop=stop):
+                part = cols[:stop]
+                self.assertMatchesVectorized(state.advance(part, self.SPECS), part)
+
+        self.assertEqual(state.folded, 389)
+
+    def test_indicator_added_midway(self):
+        cols = random_session()
+        state = SessionIndicatorState()
+        state.advance(cols[:100], parse_indicator_names("vwap"))
+
+        part = cols[:250]
+        self.assertMatchesVectorized(state.advance(part, self.SPECS), part)
+
+    def test_forming_bar_rewritten(self):
+        cols = random_session()
+        state = SessionIndicatorState()
+
+        # 最后一根 bar 还没走完：下次拉取时同一分钟的数据变了
+        forming = cols[:121]
+        forming.close = forming.close.copy()
+        forming.close[-1] += 3.0
+        forming.high = forming.close + 0.05
+        self.assertMatchesVectorized(state.advance(forming, self.SPECS), forming)
+
+        # 重新拉取后同一分钟被覆盖，后面又来了新 bar
+        self.assertMatchesVectorized(state.advance(cols[:121], self.SPECS), cols[:121])
+        self.assertMatchesVectorized(state.advance(cols, self.SPECS), cols)
+
+    def test_rebuilt_data_restarts(self):
+        cols = random_session()
+        state = SessionIndicatorState()
+        state.advance(cols[:200], self.SPECS)
+
+        # 已折叠的前缀对不上（本地数据被重建）：从头重新折叠
+        shifted = random_session(seed=11)
+        shifted.timestamps = shifted.timestamps + 86400
+        self.assertMatchesVectorized(state.advance(shifted, self.SPECS), shifted)
+
+
+@mock.patch("finance.services.http_get")
+class IncrementalIntradayTests(TestCase):
+    """IntradaySession 的增量刷新：只向上游请求最后一根已存 bar 所在分钟及之后的数据"""
+
+    def _fetch(self, now):
+        with mock.patch("finance.services.now_ny", return_value=now):
+            return fetch_intraday_columns("msft", DAY.isoformat())
+
+    def _store(self, cols, complete=False, updated_at=None):
+        IntradaySession.objects.create(
+            symbol="MSFT",
+            trading_date=DAY,
+            complete=complete,
+            last_timestamp=int(cols.timestamps[-1]),
+            bars=cols.to_json(),
+        )
+        if updated_at is not None:
+            IntradaySession.objects.filter(symbol="MSFT").update(updated_at=updated_at)
+
+    def test_first_request_fetches_from_open(self, http_get):
+        http_get.return_value = chart(make_cols([10, 11, 12]))
+
+        cols = self._fetch(ny(9, 33))
+
+        params = http_get.call_args.kwargs["params"]
+        self.assertEqual(params["period1"], OPEN_TS)
+        self.assertEqual(params["period2"], int(ny(9, 33).timestamp()))
+        self.assertEqual(cols.close.tolist(), [10, 11, 12])
+
+        session = IntradaySession.objects.get(symbol="MSFT", trading_date=DAY)
+        self.assertFalse(session.complete)
+        self.assertEqual(session.last_timestamp, OPEN_TS + 120)
+
+    def test_period1_floored_to_minute_and_forming_bar_replaced(self, http_get):
+        stored = make_cols([10, 11, 12])
+        # 最后一根是未走完的 09:32（时间戳带秒）
+        stored.timestamps[-1] += 37
+        self._store(stored)
+
+        http_get.return_value = chart(make_cols([12.5, 13], start=OPEN_TS + 120))
+        cols = self._fetch(ny(9, 34))
+
+        self.assertEqual(http_get.call_args.kwargs["params"]["period1"], OPEN_TS + 120)
+        self.assertEqual(cols.timestamps.tolist(), [OPEN_TS, OPEN_TS + 60, OPEN_TS + 120, OPEN_TS + 180])
+        self.assertEqual(cols.close.tolist(), [10, 11, 12.5, 13])
+
+        session = IntradaySession.objects.get(symbol="MSFT", trading_date=DAY)
+        self.assertEqual(session.last_timestamp, OPEN_TS + 180)
+        self.assertEqual(IntradayColumns.from_json(session.bars).close.tolist(), [10, 11, 12.5, 13])
+
+    def test_recent_refresh_is_served_locally(self, http_get):
+        now = ny(9, 40)
+        self._store(make_cols([10, 11]), updated_at=now - timedelta(seconds=INTRADAY_REFRESH - 5))
+
+        self.assertEqual(len(self._fetch(now)), 2)
+        http_get.assert_not_called()
+
+    def test_session_marked_complete_after_close(self, http_get):
+        self._store(make_cols([10, 11]))
+        http_get.return_value = chart(make_cols([11, 12], start=OPEN_TS + 60))
+
+        cols = self._fetch(ny(16, 30))
+
+        self.assertEqual(http_get.call_args.kwargs["params"]["period2"], int(ny(16, 2).timestamp()))
+        self.assertEqual(cols.close.tolist(), [10, 11, 12])
+        self.assertTrue(IntradaySession.objects.get(symbol="MSFT", trading_date=DAY).complete)
+
+    def test_not_complete_before_settle(self, http_get):
+        http_get.return_value = chart(make_cols([10]))
+        self._fetch(ny(16, 3))
+        self.assertFalse(IntradaySession.objects.get(symbol="MSFT", trading_date=DAY).complete)
+
+    def test_completed_past_session_never_calls_upstream(self, http_get):
+        self._store(make_cols([10, 11, 12]), complete=True)
+
+        cols = self._fetch(ny(12, 0, day=DAY + timedelta(days=3)))
+
+        http_get.assert_not_called()
+        self.assertEqual(cols.close.tolist(), [10, 11, 12])
+
+
+class ColumnarTests(SimpleTestCase):
+    def test_from_chart_keeps_rth_and_rounds(self):
+        ts = [OPEN_TS - 60, OPEN_TS, OPEN_TS + 60, OPEN_TS + 390 * 60 + 30, OPEN_TS + 391 * 60]
+        cols = IntradayColumns.from_chart({
+            "timestamp": ts,
+            "indicators": {"quote": [{
+                "open": [1, 10.004, None, 12, 13],
+                "high": [1, 10.5, None, 12, 13],
+                "low": [1, 9.996, None, 12, 13],
+                "close": [1, 10.126, None, 12],     # 比 timestamp 短
+                "volume": [5, 100, None, 300, 400],
+            }]},
+        })
+
+        # 09:29 和 16:01 被过滤；16:00 这一分钟（含秒）保留
+        self.assertEqual(cols.timestamps.tolist(), ts[1:4])
+        self.assertEqual(cols.open.tolist()[0], 10.0)
+        self.assertEqual(cols.close.tolist()[0], 10.13)
+        self.assertTrue(np.isnan(cols.close[1]))
+        self.assertEqual(cols.volume.tolist(), [100, 0, 300])
+        self.assertEqual(cols.times(), ["2026-03-02T09:30", "2026-03-02T09:31", "2026-03-02T16:00"])
+
+    def test_from_chart_without_bars(self):
+        self.assertEqual(len(IntradayColumns.from_chart({"timestamp": None})), 0)
+
+    def test_json_round_trip(self):
+        cols = make_cols([10.5, NAN, 11.25])
+        cols.timestamps[-1] += 17  # 未走完的分钟
+
+        data = cols.to_json()
+        self.assertEqual(data["close"], [10.5, None, 11.25])
+
+        restored = IntradayColumns.from_json(data)
+        for field in ("timestamps", "open", "high", "low", "close", "volume"):
+            np.testing.assert_array_equal(getattr(restored, field), getattr(cols, field))
+        self.assertEqual(restored.volume.dtype, np.int64)
+        self.assertEqual(len(IntradayColumns.from_json({})), 0)
+
+    def test_records_match_columns(self):
+        cols = make_cols([10, NAN])
+        self.assertEqual(cols.to_records(), [
+            {"time": "2026-03-02T09:30", "open": 10.0, "high": 10.0, "low": 10.0, "close": 10.0, "volume": 100},
+            {"time": "2026-03-02T09:31", "open": None, "high": None, "low": None, "close": None, "volume": 100},
+        ])
+
+    def test_rth_mask_across_dst_change(self):
+        # 2026-03-08 开始夏令时：周五是 UTC-5，周一是 UTC-4
+        def at(day, hour, minute, second=0):
+            return int(datetime.combine(day, time(hour, minute, second), tzinfo=NY_TZ).timestamp())
+
+        friday, monday = date(2026, 3, 6), date(2026, 3, 9)
+        ts = np.array([
+            at(friday, 9, 29), at(friday, 9, 30), at(friday, 16, 0, 59), at(friday, 16, 1),
+            at(monday, 9, 29), at(monday, 9, 30), at(monday, 16, 0), at(monday, 16, 1),
+        ], dtype=np.int64)
+
+        self.assertEqual(rth_mask(ts).tolist(), [False, True, True, False] * 2)
+        self.assertEqual(
+            IntradayColumns.from_chart({"timestamp": ts.tolist()}).times(),
+            ["2026-03-06T09:30", "2026-03-06T16:00", "2026-03-09T09:30", "2026-03-09T16:00"],
+        )
+
+
+class ColumnarMigrationTests(TestCase):
+    """0002：list[dict] 的旧格式与列式 JSON 互相转换"""
+
+    migration = importlib.import_module("finance.migrations.0002_intradaysession_columnar_bars")
+
+    def test_records_to_columns_and_back(self):
+        records = [
+            {"time": "2026-03-02T09:30", "open": 10, "high": 11, "low": 9, "close": 10.5, "volume": 100},
+            {"time": "2026-03-02T09:31", "open": None, "high": None, "low": None, "close": None, "volume": 0},
+        ]
+        session = IntradaySession.objects.create(
+            symbol="MSFT", trading_date=DAY, last_timestamp=OPEN_TS + 60 + 42, bars=records,
+        )
+        IntradaySession.objects.create(
+            symbol="AAPL", trading_date=DAY, last_timestamp=OPEN_TS, bars=make_cols([1]).to_json(),
+        )
+
+        self.migration.records_to_columns(apps, None)
+        session.refresh_from_db()
+
+        # 最后一根保留 last_timestamp 的秒数
+        self.assertEqual(session.bars["timestamp"], [OPEN_TS, OPEN_TS + 102])
+        self.assertEqual(session.bars["close"], [10.5, None])
+        cols = IntradayColumns.from_json(session.bars)
+        self.assertEqual(cols.times(), ["2026-03-02T09:30", "2026-03-02T09:31"])
+        # 已经是列式的不受影响
+        self.assertEqual(IntradaySession.objects.get(symbol="AAPL").bars, make_cols([1]).to_json())
+
+        self.migration.columns_to_records(apps, None)
+        session.refresh_from_db()
+        self.assertEqual(session.bars, records)
+
+
+class DateParamTests(SimpleTestCase):
+    """非法的 date= 返回 400，不请求上游"""
+
+    BAD_DATES = ("2026-13-45", "2026-02-30", "yesterday")
+
+    def _assert_400(self, url, params):
+        for bad in self.BAD_DATES:
+            with self.subTest(url=url, date=bad):
+                response = self.client.get(url, {**params, "date": bad})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("YYYY-MM-DD", response.json()["error"])
+
+    @mock.patch("finance.views.fetch_intraday_columns")
+    def test_intraday(self, fetch):
+        self._assert_400("/api/stocks/MSFT/", {})
+        fetch.assert_not_called()
+
+    @mock.patch("finance.views.fetch_intraday_columns_async")
+    def test_intraday_async(self, fetch):
+        request = RequestFactory().get("/api/stocks/MSFT/", {"date": "2026-13-45"})
+        response = async_to_sync(stock_intraday_view_async)(request, "MSFT")
+        self.assertEqual(response.status_code, 400)
+        fetch.assert_not_called()
+
+    @mock.patch("finance.views.fetch_intraday_columns")
+    def test_batch(self, fetch):
+        self._assert_400("/api/stocks/batch/", {"symbols": "MSFT,AAPL"})
+        fetch.assert_not_called()
+
+    @mock.patch("finance.views.get_indicators")
+    def test_indicators(self, get):
+        self._assert_400("/api/stocks/MSFT/indicators/", {"names": "vwap"})
+        get.assert_not_called()
+
+    @mock.patch("finance.views.fetch_intraday_columns", return_value=IntradayColumns.empty())
+    def test_date_is_normalized(self, fetch):
+        response = self.client.get("/api/stocks/MSFT/", {"date": "2026-3-2"})
+        self.assertEqual(response.status_code, 200)
+        fetch.assert_called_once_with("MSFT", "2026-03-02")
+
+
+class DownsampleCacheTests(SimpleTestCase):
+    """已收盘交易日 + 命名档位的降采样结果缓存；空结果不缓存"""
+
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch("finance.services.fetch_intraday_columns")
+    def test_empty_result_not_cached(self, fetch):
+        fetch.side_effect = [IntradayColumns.empty(), random_session()]
+
+        self.assertEqual(len(fetch_intraday_downsampled("MSFT", DAY.isoformat(), 60, "sparkline")), 0)
+        self.assertEqual(len(fetch_intraday_downsampled("MSFT", DAY.isoformat(), 60, "sparkline")), 60)
+
+        # 第三次命中缓存
+        self.assertEqual(len(fetch_intraday_downsampled("MSFT", DAY.isoformat(), 60, "sparkline")), 60)
+        self.assertEqual(fetch.call_count, 2)
+
+    @mock.patch("finance.services.fetch_intraday_columns", return_value=random_session())
+    def test_ad_hoc_points_not_cached(self, fetch):
+        fetch_intraday_downsampled("MSFT", DAY.isoformat(), 60)
+        fetch_intraday_downsampled("MSFT", DAY.isoformat(), 60)
+        self.assertEqual(fetch.call_count, 2)
+
+
+def quote(symbol, price=110.0, previous_close=100.0):
+    return {"symbol": symbol, "price": price, "time": "2026-03-02 10:00:00",
+            "market_state": "REGULAR", "previous_close": previous_close}
+
+
+class SnapshotTests(SimpleTestCase):
+    """watchlist 快照：报价 + 日涨跌 + sparkline，两个缓存都命中时不请求上游"""
+
+    def setUp(self):
+        get_quote_cache().clear()
+        get_sparkline_cache().clear()
+        self.addCleanup(get_quote_cache().clear)
+        self.addCleanup(get_sparkline_cache().clear)
+
+        patcher = mock.patch("finance.snapshot.get_current_price", side_effect=lambda s: quote(s))
+        self.get_price = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch("finance.snapshot.fetch_intraday_columns", side_effect=lambda s: random_session())
+        self.fetch = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_day_change(self):
+        self.assertEqual(day_change(quote("A", 110.0, 100.0)), {"change": 10.0, "change_pct": 10.0})
+        self.assertEqual(day_change(quote("A", 99.0, 120.0)), {"change": -21.0, "change_pct": -17.5})
+        self.assertEqual(day_change(quote("A", 1.0, None)), {"change": None, "change_pct": None})
+        self.assertEqual(day_change(quote("A", 1.0, 0)), {"change": None, "change_pct": None})
+        self.assertEqual(day_change(quote("A", None, 1.0)), {"change": None, "change_pct": None})
+
+    def test_snapshot_items(self):
+        items, errors = get_snapshots(["msft", "AAPL", "MSFT"])
+
+        self.assertEqual(errors, {})
+        # 去重、保持请求顺序
+        self.assertEqual([i["symbol"] for i in items], ["MSFT", "AAPL"])
+        item = items[0]
+        self.assertEqual((item["price"], item["change"], item["change_pct"]), (110.0, 10.0, 10.0))
+        self.assertEqual(sorted(item["sparkline"]), ["close", "time"])
+        self.assertEqual(len(item["sparkline"]["time"]), SPARKLINE_POINTS)
+        self.assertEqual(len(item["sparkline"]["close"]), SPARKLINE_POINTS)
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_sparkline_is_cached(self):
+        first, _ = get_snapshots(["AAPL"])
+        second, _ = get_snapshots(["AAPL"])
+
+        self.assertEqual(second, first)
+        self.fetch.assert_called_once_with("AAPL")
+
+    def test_both_caches_hit_skips_upstream(self):
+        get_snapshots(["AAPL"])
+        get_quote_cache().set("AAPL", quote("AAPL", 120.0), ttl=60)
+        self.get_price.reset_mock()
+
+        (item,), errors = get_snapshots(["AAPL"])
+
+        self.assertEqual(errors, {})
+        self.get_price.assert_not_called()
+        self.fetch.assert_called_once()
+        self.assertEqual((item["price"], item["change"]), (120.0, 20.0))
+
+    def test_sparkline_failure_still_returns_quote(self):
+        self.fetch.side_effect = RuntimeError("no bars")
+
+        (item,), errors = get_snapshots(["AAPL"])
+
+        self.assertEqual(errors, {})
+        self.assertEqual(item["price"], 110.0)
+        self.assertIsNone(item["sparkline"])
+
+    def test_quote_failure_is_reported(self):
+        def price(symbol):
+            if symbol == "BAD":
+                raise ValueError("no such symbol")
+            return quote(symbol)
+
+        self.get_price.side_effect = price
+
+        items, errors = get_snapshots(["AAPL", "BAD", "MSFT"])
+
+        self.assertEqual([i["symbol"] for i in items], ["AAPL", "MSFT"])
+        self.assertEqual(list(errors), ["BAD"])
+        self.assertIn("no such symbol", errors["BAD"])
+
+
+class PoolTimeoutTests(SimpleTestCase):
+    """连接池用满（POOL_BLOCK=True）时，等待空闲连接的时间有上限"""
+
+    def setUp(self):
+        client = PooledHTTPClient(pool_maxsize=1)
+        self.addCleanup(client.close)
+        adapter = client.session.get_adapter("http://example.com")
+        self.pool = adapter.poolmanager.connection_from_url("http://example.com")
+        self.pool._get_conn()  # 占住唯一的连接
+
+    def test_waits_at_most_pool_timeout(self):
+        started = monotonic()
+        with mock.patch("finance.http_helper.POOL_TIMEOUT", 0.05):
+            with self.assertRaises(EmptyPoolError):
+                self.pool._get_conn()
+        self.assertLess(monotonic() - started, 1)
+
+    def test_deadline_bounds_the_wait(self):
+        started = monotonic()
+        with request_deadline(monotonic() + 0.05):
+            with self.assertRaises(EmptyPoolError):
+                self.pool._get_conn()
+        self.assertLess(monotonic() - started, 1)
+
+    def test_past_deadline_does_not_wait(self):
+        with request_deadline(monotonic() - 1):
+            with self.assertRaises(DeadlineExceeded):
+                self.pool._get_conn()
+
+
+@mock.patch("finance.stream.MAX_STREAM_CONNECTIONS", 0)
+class StreamCapacityTests(SimpleTestCase):
+    """连接数已满：视图返回 503；已经开始的流发一条 error 后正常结束"""
+
+    def test_view_returns_503(self):
+        request = RequestFactory().get("/api/stocks/stream/", {"symbols": "AAPL"})
+        with self.settings(ASYNC_VIEWS=True):
+            response = async_to_sync(stock_stream_view)(request)
+
+        self.assertEqual(response.status_code, 503)
+
+    def test_stream_closes_cleanly(self):
+        async def consume():
+            hub = QuoteHub()
+            messages = [m async for m in hub.stream(["AAPL"])]
+            return messages, hub.stats()
+
+        messages, stats = async_to_sync(consume)()
+
+        self.assertEqual(len(messages), 1)
+        self.assertTrue(messages[0].startswith("event: error\n"))
+        self.assertEqual(stats, {"connections": 0, "symbols": 0})
@@ -1,12 +1,43 @@
 # finance/urls.py
+from django.conf import settings
 from django.urls import path
-from .views import stock_intraday_view, current_price_view
+from .views import (
+    stock_intraday_view,
+    stock_intraday_view_async,
+    stock_intraday_batch_view,
+    stock_indicators_view,
+    current_price_view,
+    current_price_view_async,
+    current_prices_view,
+    stock_stream_view,
+)
 
 urlpatterns = [
+    # 0. 批量当前价格：?symbols=AAPL,NVDA
+    path("currentprice/", current_prices_view, name="current-prices"),
+
     # 1. 当前价格（必须放前面，否则被下面的 <symbol> 抢匹配）
-    path("currentprice/<str:symbol>/", current_price_view, name="current-price"),
+    #    ASGI 部署时打开 ASYNC_VIEWS，单条查询走 async 视图
+    path(
+        "currentprice/<str:symbol>/",
+        current_price_view_async if settings.ASYNC_VIEWS else current_price_view,
+        name="current-price",
+    ),
+
+    # 2. 批量分钟级 K 线：?symbols=QQQ,SPY（必须在 <symbol> 前面）
+    path("batch/", stock_intraday_batch_view, name="stock-intraday-batch"),
+
+    # 2.1 行情推送（SSE，需要 ASGI）：?symbols=AAPL,NVDA（必须在 <symbol> 前面）
+    path("stream/", stock_stream_view, name="stock-stream"),
+
+    # 3. 技术指标（VWAP / EMA / RSI / MACD）
+    path("<str:symbol>/indicators/", stock_indicators_view, name="stock-indicators"),
 
-    # 2. 分钟级 K 线数据
-    path("<str:symbol>/", stock_intraday_view, name="stock-intraday"),
+    # 4. 分钟级 K 线数据
+    path(
+        "<str:symbol>/",
+        stock_intraday_view_async if settings.ASYNC_VIEWS else stock_intraday_view,
+        name="stock-intraday",
+    ),
 ]
 
@@ -1,39 +1,206 @@
 # finance/views.py
 # ------------------------------------------------------------
 # 等价于 stockRoutes.js / fetchStockData 接口部分
-# GET /api/stocks/<symbol>?date=YYYY-MM-DD
+# GET /api/stocks/<symbol>?date=YYYY-MM-DD[&format=columnar]
 # ------------------------------------------------------------
 
-from typing import Any, Dict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
-from django.http import JsonResponse, HttpRequest
-from .services import fetch_intraday
-from .price_service import get_current_price
+from django.conf import settings
+from django.http import JsonResponse, HttpRequest, StreamingHttpResponse
+from common.downsample import parse_target
+from .columnar import IntradayColumns
+from .concurrency import fan_out
+from .services import (
+    fetch_intraday_columns,
+    fetch_intraday_columns_async,
+    fetch_intraday_downsampled,
+    fetch_intraday_downsampled_async,
+)
+from .price_service import get_current_price, get_current_prices, get_current_price_async
+from .indicators import parse_indicator_names
+from .indicator_service import get_indicators
+from .stream import MAX_STREAM_SYMBOLS, get_hub
+
+# 批量接口单次最多允许的 symbol 数
+MAX_BATCH_SYMBOLS = 50
+
+# 批量 K 线接口的整体截止时间（秒），超时的 symbol 记入 errors
+BATCH_INTRADAY_DEADLINE = 8.0
+
+
+def _parse_symbols(raw: str) -> List[str]:
+    """解析 "AAPL, nvda,,AAPL" -> ["AAPL", "NVDA"]（去空、去重、保持顺序）"""
+    symbols = [s.strip().upper() for s in raw.split(",")]
+    return list(dict.fromkeys(s for s in symbols if s))
+
+
+def _parse_date(raw: Optional[str]) -> Optional[str]:
+    """
+    校验查询参数 date=YYYY-MM-DD，返回规范化的日期字符串（未提供时为 None）
+
+    :raises ValueError: 格式或日期非法（例如 2026-13-45）
+    """
+    if not raw:
+        return None
+    try:
+        return datetime.strptime(raw, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        raise ValueError("date must be a valid date in YYYY-MM-DD format")
+
+
+def _intraday_payload(symbol: str, cols: IntradayColumns, columnar: bool) -> Dict[str, Any]:
+    resp: Dict[str, Any] = {
+        "symbol": symbol,
+        "timezone": "America/New_York",
+        "interval": "1m",
+        "session": "RTH (09:30–16:00)",
+        "count": len(cols),
+    }
+    if columnar:
+        resp["columns"] = cols.to_columns()
+    else:
+        resp["data"] = cols.to_records()
+    return resp
 
 
 def stock_intraday_view(request: HttpRequest, symbol: str) -> JsonResponse:
     """
     获取指定股票的 1m 盘中数据（RTH only）
     路由：GET /api/stocks/<symbol>?date=YYYY-MM-DD
+
+    format=columnar 时返回平行数组，体积更小：
+        "columns": {"time": [...], "open": [...], ..., "volume": [...]}
+    默认仍是 "data": [{time, open, high, low, close, volume}, ...]
+
+    points=N 或 resolution=sparkline|thumbnail|chart 时按收盘价做 LTTB 降采样
     """
+    try:
+        points, level = parse_target(request.GET)
+        date_str = _parse_date(request.GET.get("date"))  # 例如 "2025-12-10" 或 None
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
     try:
         symbol_upper = symbol.upper()
-        date_str = request.GET.get("date")  # 例如 "2025-12-10" 或 None
+        columnar = request.GET.get("format") == "columnar"
+
+        if points:
+            cols = fetch_intraday_downsampled(symbol_upper, date_str, points, level)
+        else:
+            cols = fetch_intraday_columns(symbol_upper, date_str)
+
+        resp = _intraday_payload(symbol_upper, cols, columnar)
+        return JsonResponse(resp, status=200, json_dumps_params={"ensure_ascii": False})
+    except Exception as e:
+        # 完整保留你 Node 里的 500 行为
+        return JsonResponse(
+            {"error": str(e)},
+            status=500,
+            json_dumps_params={"ensure_ascii": False},
+        )
+
+
+def current_price_view(request, symbol: str):
+    data = get_current_price(symbol)
+    return JsonResponse(data, safe=True)
+
+
+# ------------------------------------------------------------
+# async 版本（ASGI 部署 + settings.ASYNC_VIEWS 时由 urls.py 选用）
+# 等待上游时不占用 worker 线程，响应格式与同步版本完全一致
+# ------------------------------------------------------------
+async def stock_intraday_view_async(request: HttpRequest, symbol: str) -> JsonResponse:
+    """stock_intraday_view 的 async 版本"""
+    try:
+        points, level = parse_target(request.GET)
+        date_str = _parse_date(request.GET.get("date"))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        symbol_upper = symbol.upper()
+        columnar = request.GET.get("format") == "columnar"
+
+        if points:
+            cols = await fetch_intraday_downsampled_async(symbol_upper, date_str, points, level)
+        else:
+            cols = await fetch_intraday_columns_async(symbol_upper, date_str)
+
+        resp = _intraday_payload(symbol_upper, cols, columnar)
+        return JsonResponse(resp, status=200, json_dumps_params={"ensure_ascii": False})
+    except Exception as e:
+        return JsonResponse(
+            {"error": str(e)},
+            status=500,
+            json_dumps_params={"ensure_ascii": False},
+        )
+
+
+async def current_price_view_async(request, symbol: str):
+    data = await get_current_price_async(symbol)
+    return JsonResponse(data, safe=True)
+
 
-        data = fetch_intraday(symbol_upper, date_str)
+def current_prices_view(request: HttpRequest) -> JsonResponse:
+    """
+    批量获取当前价格
+    路由：GET /api/currentprice/?symbols=AAPL,NVDA,...
+
+    返回：
+    {
+        "quotes": {"AAPL": {...}, "NVDA": {...}},
+        "errors": {"XXXX": "HTTP request failed: ..."}
+    }
+    """
+    symbols = _parse_symbols(request.GET.get("symbols", ""))
+
+    if not symbols:
+        return JsonResponse({"error": "symbols is required"}, status=400)
+
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        return JsonResponse(
+            {"error": f"At most {MAX_BATCH_SYMBOLS} symbols allowed"},
+            status=400,
+        )
+
+    quotes, errors = get_current_prices(symbols)
+
+    return JsonResponse({"quotes": quotes, "errors": errors})
+
+
+def stock_indicators_view(request: HttpRequest, symbol: str) -> JsonResponse:
+    """
+    服务端计算技术指标
+    路由：GET /api/stocks/<symbol>/indicators/?names=vwap,rsi14,ema20,macd&date=YYYY-MM-DD
+
+    支持的 names：vwap、emaN、rsi / rsiN、macd / macdF_S_G
+    """
+    try:
+        specs = parse_indicator_names(request.GET.get("names", ""))
+        date_str = _parse_date(request.GET.get("date"))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    if not specs:
+        return JsonResponse({"error": "names is required"}, status=400)
+
+    try:
+        symbol_upper = symbol.upper()
+        data = get_indicators(symbol_upper, date_str, specs)
 
         resp: Dict[str, Any] = {
             "symbol": symbol_upper,
             "timezone": "America/New_York",
             "interval": "1m",
-            "session": "RTH (09:30–16:00)",
-            "count": len(data),
-            "data": data,
+            "date": data["date"],
+            "count": len(data["time"]),
+            "time": data["time"],
+            "indicators": data["indicators"],
         }
         return JsonResponse(resp, status=200, json_dumps_params={"ensure_ascii": False})
     except Exception as e:
-        # 完整保留你 Node 里的 500 行为
         return JsonResponse(
             {"error": str(e)},
             status=500,
@@ -41,6 +208,88 @@ def stock_intraday_view(request: HttpRequest, symbol: str) -> JsonResponse:
         )
 
 
-def current_price_view(request, symbol: str):
-    data = get_current_price(symbol)
-    return JsonResponse(data, safe=True)
+def stock_intraday_batch_view(request: HttpRequest) -> JsonResponse:
+    """
+    批量获取多个 symbol 的 1m 盘中数据（并发请求上游）
+    路由：GET /api/stocks/batch/?symbols=QQQ,SPY&date=YYYY-MM-DD[&format=columnar][&points=N]
+
+    返回：
+    {
+        "date": "YYYY-MM-DD" | null,
+        "results": {"QQQ": {与 stock_intraday_view 相同的结构}, ...},
+        "errors": {"XXX": "..."}
+    }
+    """
+    symbols = _parse_symbols(request.GET.get("symbols", ""))
+
+    if not symbols:
+        return JsonResponse({"error": "symbols is required"}, status=400)
+
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        return JsonResponse(
+            {"error": f"At most {MAX_BATCH_SYMBOLS} symbols allowed"},
+            status=400,
+        )
+
+    try:
+        points, level = parse_target(request.GET)
+        date_str = _parse_date(request.GET.get("date"))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    columnar = request.GET.get("format") == "columnar"
+
+    def load(symbol: str) -> Dict[str, Any]:
+        if points:
+            cols = fetch_intraday_downsampled(symbol, date_str, points, level)
+        else:
+            cols = fetch_intraday_columns(symbol, date_str)
+        return _intraday_payload(symbol, cols, columnar)
+
+    results, errors = fan_out(load, symbols, timeout=BATCH_INTRADAY_DEADLINE)
+
+    return JsonResponse(
+        {"date": date_str, "results": results, "errors": errors},
+        json_dumps_params={"ensure_ascii": False},
+    )
+
+
+async def stock_stream_view(request: HttpRequest):
+    """
+    行情推送（Server-Sent Events，需要 ASGI 部署）
+    路由：GET /api/stocks/stream/?symbols=AAPL,NVDA
+
+    事件：
+        hello   {"symbols": [...], "time"}
+        quote   与 /api/currentprice/<symbol>/ 相同，有变化时推送
+        bars    {"symbol", "columns": {...}}：当天 1m K 线的增量，按 time 覆盖 / 追加
+        error   {"symbol", "error"}
+
+    WSGI 下 StreamingHttpResponse 会先把整个 async 迭代器读进内存再发送，
+    永不结束的流会一直占住 worker，所以没有打开 ASYNC_VIEWS 时返回 501
+    """
+    if not settings.ASYNC_VIEWS:
+        return JsonResponse(
+            {"error": "Streaming requires the ASGI server (ASYNC_VIEWS=1)"},
+            status=501,
+        )
+
+    symbols = _parse_symbols(request.GET.get("symbols", ""))
+
+    if not symbols:
+        return JsonResponse({"error": "symbols is required"}, status=400)
+
+    if len(symbols) > MAX_STREAM_SYMBOLS:
+        return JsonResponse(
+            {"error": f"At most {MAX_STREAM_SYMBOLS} symbols allowed"},
+            status=400,
+        )
+
+    hub = get_hub()
+    if hub.is_full():
+        return JsonResponse({"error": "Too many stream connections"}, status=503)
+
+    response = StreamingHttpResponse(hub.stream(symbols), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx 不缓冲
+    return response
@@ -1,10 +1,52 @@
 # market_sentiment/management/commands/backfill_fear_greed.py
 from django.core.management.base import BaseCommand
-from market_sentiment.services.fetcher import backfill_if_supported
+from market_sentiment.services.fetcher import (
+    BACKFILL_DAYS,
+    SUPPORTED_INDEXES,
+    backfill_if_supported,
+)
 
 class Command(BaseCommand):
     help = "Backfill CNN Fear & Greed historical data if supported"
 
-    def handle(self, *args, **kwargs):
-        backfill_if_supported()
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=BACKFILL_DAYS,
+            help=f"Backfill window in days (default {BACKFILL_DAYS})",
+        )
+        parser.add_argument(
+            "--index",
+            action="append",
+            choices=SUPPORTED_INDEXES,
+            help="Only backfill this index (repeatable; default: all)",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Ignore per-index checkpoints and rewrite the whole window",
+        )
+
+    def handle(self, *args, **options):
+        report = backfill_if_supported(
+            days=options["days"],
+            indexes=options["index"],
+            full=options["full"],
+        )
+
+        for idx, item in report.items():
+            status = item["status"]
+            if status == "ok":
+                line = (
+                    f"{idx}: since {item['since']} inserted={item['inserted']} "
+                    f"updated={item['updated']} unchanged={item['unchanged']} "
+                    f"skipped={item['skipped']}"
+                )
+                self.stdout.write(line)
+            elif status == "error":
+                self.stdout.write(self.style.ERROR(f"{idx}: {item['error']}"))
+            else:
+                self.stdout.write(self.style.WARNING(f"{idx}: {status}"))
+
         self.stdout.write(self.style.SUCCESS("Backfill (if supported) completed"))
@@ -1,15 +1,28 @@
 from django.core.management.base import BaseCommand
 from market_sentiment.services.fetcher import fetch_daily_latest
 from market_sentiment.models import AlertSubscription, MarketSentiment
-from market_sentiment.services.alert_logic import classify, handle_alert
+from market_sentiment.services.alert_logic import classify, evaluate_alerts_bulk, handle_alert
 
 
 class Command(BaseCommand):
     help = "Fetch daily CNN Fear & Greed data and trigger alerts"
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--mode",
+            choices=["bulk", "loop"],
+            default="bulk",
+            help="bulk: set-based UPDATEs per state group (default); "
+                 "loop: handle_alert() per subscription",
+        )
+
+    def handle(self, *args, **options):
         # 1️⃣ Fetch and store today's Fear & Greed data
-        fetch_daily_latest()
+        ingest = fetch_daily_latest()
+        self.stdout.write(
+            "Ingest: inserted={inserted} updated={updated} "
+            "unchanged={unchanged} skipped={skipped}".format(**ingest.as_dict())
+        )
 
         # 2️⃣ Get today's Fear & Greed score from DB
         latest = (
@@ -31,11 +44,17 @@ class Command(BaseCommand):
         # 4️⃣ Run alert checks
         subscriptions = AlertSubscription.objects.filter(enabled=True)
 
-        for sub in subscriptions:
-            handle_alert(sub, state)
+        events = 0
+        if options["mode"] == "bulk":
+            for _ in evaluate_alerts_bulk(subscriptions, state):
+                events += 1
+        else:
+            for sub in subscriptions:
+                events += len(handle_alert(sub, state))
 
         self.stdout.write(
             self.style.SUCCESS(
-                f"Daily update completed. F&G={today_fg_score:.2f}, state={state}"
+                f"Daily update completed. F&G={today_fg_score:.2f}, state={state}, "
+                f"events={events}"
             )
         )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from market_sentiment.services.fetcher import SUPPORTED_INDEXES
+from market_sentiment.services.latest import rebuild_latest
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-index latest / coverage summary from MarketSentiment"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--index",
+            action="append",
+            choices=SUPPORTED_INDEXES,
+            help="Only rebuild this index (repeatable; default: all)",
+        )
+
+    def handle(self, *args, **options):
+        n = rebuild_latest(options["index"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt summary for {n} index(es)"))
@@ -0,0 +1,58 @@
+# Generated by Django 5.0.3 on 2026-10-18 18:18
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def build_latest(apps, schema_editor):
+    MarketSentiment = apps.get_model("market_sentiment", "MarketSentiment")
+    SentimentLatest = apps.get_model("market_sentiment", "SentimentLatest")
+
+    last_dates = (
+        MarketSentiment.objects
+        .values_list("index_name")
+        .annotate(last=Max("date"))
+    )
+
+    for index_name, last in last_dates:
+        row = (
+            MarketSentiment.objects
+            .filter(index_name=index_name, date=last)
+            .order_by("-timestamp")
+            .first()
+        )
+        SentimentLatest.objects.create(
+            index_name=index_name,
+            source=row.source,
+            date=row.date,
+            score=row.score,
+            rating=row.rating,
+            timestamp=row.timestamp,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market_sentiment', '0002_alertsubscription'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SentimentLatest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index_name', models.CharField(max_length=50, unique=True)),
+                ('source', models.CharField(max_length=20)),
+                ('date', models.DateField()),
+                ('score', models.FloatField()),
+                ('rating', models.CharField(max_length=20)),
+                ('timestamp', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['index_name'],
+            },
+        ),
+        migrations.RunPython(build_latest, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.3 on 2026-10-18 18:22
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def fill_coverage(apps, schema_editor):
+    MarketSentiment = apps.get_model("market_sentiment", "MarketSentiment")
+    SentimentLatest = apps.get_model("market_sentiment", "SentimentLatest")
+
+    coverage = (
+        MarketSentiment.objects
+        .values_list("index_name")
+        .annotate(count=Count("id"), first_date=Min("date"))
+    )
+
+    for index_name, count, first_date in coverage:
+        SentimentLatest.objects.filter(index_name=index_name).update(
+            count=count,
+            first_date=first_date,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market_sentiment', '0003_sentimentlatest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sentimentlatest',
+            name='count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sentimentlatest',
+            name='first_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_coverage, migrations.RunPython.noop),
+    ]
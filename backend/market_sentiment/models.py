@@ -20,6 +20,30 @@ class MarketSentiment(models.Model):
         return f"{self.date} {self.index_name} {self.score}"
 
 
+class SentimentLatest(models.Model):
+    """
+    每个指标的汇总行（由 ingest 增量维护）：
+    - 最新一条 MarketSentiment 的快照（date = last_date）
+    - 覆盖情况：count / first_date
+    SentimentOverview / SentimentMeta 一次查询读完所有指标
+    """
+    index_name = models.CharField(max_length=50, unique=True)
+    source = models.CharField(max_length=20)
+    date = models.DateField()
+    score = models.FloatField()
+    rating = models.CharField(max_length=20)
+    timestamp = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+    first_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["index_name"]
+
+    def __str__(self):
+        return f"{self.index_name} {self.date} {self.score}"
+
+
 class AlertSubscription(models.Model):
     email = models.EmailField(unique=True)
     enabled = models.BooleanField(default=True)
@@ -1,4 +1,5 @@
 from django.utils import timezone
+from django.db.models import Max, Q
 from datetime import timedelta
 
 # ===== 状态定义 =====
@@ -7,6 +8,12 @@ STATE_EXTREME_FEAR = "EXTREME_FEAR"
 STATE_NORMAL = "NORMAL"
 STATE_EXTREME_GREED = "EXTREME_GREED"
 
+# Panic 持续提醒的间隔
+PANIC_REMINDER_INTERVAL = timedelta(days=2)
+
+# 批量模式下读取订阅的分块大小
+BULK_CHUNK_SIZE = 2000
+
 
 def classify(score: float) -> str:
     if score < 10:
@@ -52,7 +59,7 @@ def handle_alert(subscription, new_state: str):
     if new_state == STATE_PANIC:
         last_sent = subscription.last_panic_sent_at
 
-        if not last_sent or (now - last_sent) >= timedelta(days=2):
+        if not last_sent or (now - last_sent) >= PANIC_REMINDER_INTERVAL:
             events.append({
                 "type": "PANIC_PERSIST",
             })
@@ -60,3 +67,68 @@ def handle_alert(subscription, new_state: str):
             subscription.save()
 
     return events
+
+
+def evaluate_alerts_bulk(subscriptions, new_state: str, now=None):
+    """
+    Set-based equivalent of handle_alert() over a queryset of
+    subscriptions (AlertSubscription / EmailSubscription).
+
+    Subscriptions are grouped by (last_state, panic-reminder eligibility):
+    - last_state == PANIC == new_state and reminder due -> PANIC_PERSIST
+    - one group per distinct last_state != new_state -> STATE_CHANGE
+    - everything else: no event, no write
+
+    Events are yielded as a stream, one dict per subscription:
+        {"subscription_id", "email", "type", ["from", "to"]}
+    Each group is written with a single UPDATE once all of its events
+    have been consumed. If the consumer stops early, the unfinished
+    group keeps its old state and is re-emitted on the next run.
+    Only rows that exist when evaluation starts (pk <= current max)
+    are touched.
+    """
+    now = now or timezone.now()
+
+    upper = subscriptions.aggregate(upper=Max("pk"))["upper"]
+    if upper is None:
+        return
+    subscriptions = subscriptions.filter(pk__lte=upper)
+
+    def stream(group, event):
+        rows = (
+            group
+            .order_by("pk")
+            .values_list("pk", "email")
+            .iterator(chunk_size=BULK_CHUNK_SIZE)
+        )
+        for pk, email in rows:
+            yield {"subscription_id": pk, "email": email, **event}
+
+    # ===== 1. Panic 持续提醒（每 2 天一次）=====
+    # 先于状态切换处理：本轮刚切到 PANIC 的订阅不会再收到提醒
+    if new_state == STATE_PANIC:
+        due = subscriptions.filter(last_state=STATE_PANIC).filter(
+            Q(last_panic_sent_at__isnull=True)
+            | Q(last_panic_sent_at__lte=now - PANIC_REMINDER_INTERVAL)
+        )
+        yield from stream(due, {"type": "PANIC_PERSIST"})
+        due.update(last_panic_sent_at=now)
+
+    # ===== 2. 状态切换：按旧状态分组 =====
+    old_states = (
+        subscriptions
+        .exclude(last_state=new_state)
+        .order_by()
+        .values_list("last_state", flat=True)
+        .distinct()
+    )
+
+    for old_state in list(old_states):
+        group = subscriptions.filter(last_state=old_state)
+        yield from stream(group, {"type": "STATE_CHANGE", "from": old_state, "to": new_state})
+
+        changes = {"last_state": new_state}
+        # 走出 panic，清空计时
+        if old_state == STATE_PANIC:
+            changes["last_panic_sent_at"] = None
+        group.update(**changes)
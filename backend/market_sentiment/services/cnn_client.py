@@ -3,9 +3,16 @@ import http.client
 import json
 import os
 
+from common.rate_limit import RateLimiter
+
 HOST = "cnn-fear-and-greed-index.p.rapidapi.com"
 
+# RapidAPI 配额：所有线程共用一个限流器（请求 / 秒）
+RATE_LIMIT = float(os.getenv("RAPIDAPI_RATE_LIMIT", "4"))
+_limiter = RateLimiter(RATE_LIMIT)
+
 def _request(path: str):
+    _limiter.acquire()
     conn = http.client.HTTPSConnection(HOST, timeout=15)
     headers = {
         "x-rapidapi-key": os.getenv("RAPIDAPI_KEY"),
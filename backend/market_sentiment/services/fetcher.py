@@ -1,7 +1,21 @@
 import http.client
 import json
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Max
+from django.utils import timezone
+
+from finance.concurrency import fan_out
 from market_sentiment.models import MarketSentiment
-from market_sentiment.services.normalizer import normalize_item
+from market_sentiment.services import cnn_client
+from market_sentiment.services.ingest import (
+    SOURCE,
+    IngestResult,
+    normalize_history,
+    normalize_payload,
+    upsert_rows,
+)
 
 RAPIDAPI_HOST = "cnn-fear-and-greed-index.p.rapidapi.com"
 
@@ -19,11 +33,16 @@ SUPPORTED_INDEXES = [
     "safe_haven_demand",
 ]
 
+# 默认回填窗口（天）
+BACKFILL_DAYS = 365
+
 
 def fetch_daily_latest():
     """
     Fetch latest daily sentiment data from CNN Fear & Greed API
-    and upsert into MarketSentiment table.
+    and upsert into MarketSentiment table (one batched upsert).
+
+    Returns an IngestResult with inserted / updated / unchanged counts.
     """
 
     conn = http.client.HTTPSConnection(RAPIDAPI_HOST)
@@ -37,31 +56,97 @@ def fetch_daily_latest():
     res = conn.getresponse()
 
     if res.status != 200:
-        return
+        return IngestResult()
 
     payload = json.loads(res.read().decode("utf-8"))
     data = payload.get("data")
 
     if not isinstance(data, dict):
-        return
+        return IngestResult()
+
+    rows, skipped = normalize_payload(data, SUPPORTED_INDEXES)
+    result = upsert_rows(rows)
+    result.skipped += skipped
+    return result
+
+
+# ------------------------------------------------------------
+# Historical backfill
+# ------------------------------------------------------------
+def _checkpoints(indexes: Iterable[str]) -> Dict[str, date]:
+    """index_name -> 已存储的最后一天（一次聚合查询）"""
+    return dict(
+        MarketSentiment.objects
+        .filter(source=SOURCE, index_name__in=list(indexes))
+        .values_list("index_name")
+        .annotate(last=Max("date"))
+    )
+
+
+def _fetch_history(index_name: str, since: date) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+    """
+    拉取单个 index 的历史数据，只保留 date >= since 的行
+
+    :return: (rows, skipped)；index 不支持 historical 时返回 None
+    """
+    items = cnn_client.fetch_index_historical(index_name)
+    if items is None:
+        return None
+
+    rows, skipped = normalize_history(index_name, items)
+    return [r for r in rows if r["date"] >= since], skipped
 
-    for idx in SUPPORTED_INDEXES:
-        item = data.get(idx)
-        if not item:
+
+def backfill_if_supported(
+    days: int = BACKFILL_DAYS,
+    indexes: Optional[Iterable[str]] = None,
+    full: bool = False,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Backfill historical data for every supported index.
+
+    - Indexes are fetched concurrently (shared thread pool); every request
+      goes through the RapidAPI rate limiter in cnn_client.
+    - Resumable: each index only keeps dates from its last stored row on
+      (the last row is re-read in case it was intraday). Indexes already
+      stored up to today are not requested at all. full=True ignores the
+      checkpoints and rewrites the whole window.
+    - Rows are written with one batched upsert per index.
+
+    Returns index_name -> {"status": ..., inserted / updated / ... counts}.
+    status is one of "ok", "up_to_date", "unsupported", "error".
+    """
+    indexes = list(indexes or SUPPORTED_INDEXES)
+    today = timezone.now().date()
+    start = today - timedelta(days=days)
+
+    checkpoints = {} if full else _checkpoints(indexes)
+
+    report: Dict[str, Dict[str, Any]] = {}
+    since: Dict[str, date] = {}
+
+    for idx in indexes:
+        last = checkpoints.get(idx)
+        if last is not None and last >= today:
+            report[idx] = {"status": "up_to_date", "since": last}
+            continue
+        since[idx] = max(start, last) if last else start
+
+    fetched, errors = fan_out(lambda idx: _fetch_history(idx, since[idx]), since)
+
+    # 写库在当前线程按 index 逐个进行：每个 index 写完即是一个检查点
+    for idx in since:
+        if idx in errors:
+            report[idx] = {"status": "error", "since": since[idx], "error": errors[idx]}
             continue
 
-        try:
-            normalized = normalize_item(idx, item)
-        except Exception:
+        if fetched[idx] is None:
+            report[idx] = {"status": "unsupported", "since": since[idx]}
             continue
 
-        MarketSentiment.objects.update_or_create(
-            index_name=idx,
-            date=normalized["date"],
-            defaults={
-                "score": normalized.get("score"),
-                "rating": normalized.get("rating"),
-                "timestamp": normalized.get("timestamp"),
-                "source": "CNN",
-            },
-        )
+        rows, skipped = fetched[idx]
+        result = upsert_rows(rows)
+        result.skipped += skipped
+        report[idx] = {"status": "ok", "since": since[idx], **result.as_dict()}
+
+    return {idx: report[idx] for idx in indexes}
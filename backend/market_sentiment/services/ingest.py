@@ -0,0 +1,185 @@
+# market_sentiment/services/ingest.py
+# ------------------------------------------------------------
+# MarketSentiment 批量写入
+#
+# 一次把整份 payload 规范化成行，再用一条（分批的）
+# INSERT ... ON CONFLICT (date, source, index_name) DO UPDATE 写入，
+# 整体放在一个事务里：
+#   - 先按 key 一次性读出已有的行，分出 新增 / 变化 / 未变化
+#   - 只有新增和变化的行才会写库
+#   - 写入的行同时用来增量刷新 SentimentLatest 汇总（最新值 + 覆盖情况）
+# ------------------------------------------------------------
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+from django.db import transaction
+
+from market_sentiment.models import MarketSentiment
+from market_sentiment.services.latest import refresh_latest
+from market_sentiment.services.normalizer import normalize_item
+
+SOURCE = "CNN"
+
+# 冲突时覆盖的字段（unique key 之外的全部字段）
+UPSERT_FIELDS = ("score", "rating", "timestamp")
+UNIQUE_FIELDS = ("date", "source", "index_name")
+
+# 单条 INSERT 的最大行数（SQLite 变量个数有上限）
+BATCH_SIZE = 500
+
+RowKey = Tuple[date, str]   # (date, index_name)，source 固定
+
+
+@dataclass
+class IngestResult:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: int = 0     # 无法解析 / 缺少 score 的条目
+
+    @property
+    def written(self) -> int:
+        return self.inserted + self.updated
+
+    def merge(self, other: "IngestResult") -> "IngestResult":
+        return IngestResult(
+            inserted=self.inserted + other.inserted,
+            updated=self.updated + other.updated,
+            unchanged=self.unchanged + other.unchanged,
+            skipped=self.skipped + other.skipped,
+        )
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "skipped": self.skipped,
+        }
+
+
+def _normalize(index_name: str, item: Mapping[str, Any]) -> Dict[str, Any] | None:
+    try:
+        row = normalize_item(index_name, item)
+    except Exception:
+        return None
+
+    if row.get("score") is None:
+        return None
+
+    row["rating"] = row.get("rating") or ""
+    return row
+
+
+def normalize_payload(data: Mapping[str, Any], indexes: Iterable[str]) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    latest 接口的 payload["data"]（index_name -> item）-> 行列表
+
+    :return: (rows, skipped)
+    """
+    rows, skipped = [], 0
+    for idx in indexes:
+        item = data.get(idx)
+        if not item:
+            continue
+
+        row = _normalize(idx, item)
+        if row is None:
+            skipped += 1
+        else:
+            rows.append(row)
+
+    return rows, skipped
+
+
+def normalize_history(index_name: str, items: Iterable[Mapping[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    historical 接口返回的 list -> 行列表
+
+    :return: (rows, skipped)
+    """
+    rows, skipped = [], 0
+    for item in items:
+        row = _normalize(index_name, item)
+        if row is None:
+            skipped += 1
+        else:
+            rows.append(row)
+
+    return rows, skipped
+
+
+def _same(existing: Tuple[float, str, datetime], row: Mapping[str, Any]) -> bool:
+    score, rating, timestamp = existing
+    return score == row["score"] and rating == row["rating"] and timestamp == row["timestamp"]
+
+
+@transaction.atomic
+def upsert_rows(rows: Iterable[Mapping[str, Any]], source: str = SOURCE) -> IngestResult:
+    """
+    批量 upsert，key 为 (date, source, index_name)
+
+    同一个 key 在 rows 中出现多次时以最后一次为准。
+    """
+    latest: Dict[RowKey, Mapping[str, Any]] = {}
+    for row in rows:
+        latest[(row["date"], row["index_name"])] = row
+
+    result = IngestResult()
+    if not latest:
+        return result
+
+    dates = [k[0] for k in latest]
+    index_names = {k[1] for k in latest}
+
+    # 一次查询取出可能冲突的已有行
+    existing: Dict[RowKey, Tuple[float, str, datetime]] = {
+        (d, idx): (score, rating, ts)
+        for d, idx, score, rating, ts in (
+            MarketSentiment.objects
+            .filter(
+                source=source,
+                index_name__in=index_names,
+                date__range=(min(dates), max(dates)),
+            )
+            .values_list("date", "index_name", *UPSERT_FIELDS)
+        )
+    }
+
+    to_write: List[MarketSentiment] = []
+    written: List[Mapping[str, Any]] = []
+    inserted: List[Mapping[str, Any]] = []
+    for key, row in latest.items():
+        old = existing.get(key)
+        if old is None:
+            result.inserted += 1
+            inserted.append(row)
+        elif _same(old, row):
+            result.unchanged += 1
+            continue
+        else:
+            result.updated += 1
+
+        written.append(row)
+        to_write.append(MarketSentiment(
+            date=row["date"],
+            source=source,
+            index_name=row["index_name"],
+            score=row["score"],
+            rating=row["rating"],
+            timestamp=row["timestamp"],
+        ))
+
+    if to_write:
+        MarketSentiment.objects.bulk_create(
+            to_write,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=list(UNIQUE_FIELDS),
+            update_fields=list(UPSERT_FIELDS),
+        )
+        refresh_latest(written, inserted, source)
+
+    return result
@@ -0,0 +1,234 @@
+# market_sentiment/services/latest.py
+# ------------------------------------------------------------
+# 每个指标的汇总（SentimentLatest 表 + Django cache）
+#   - 最新值：SentimentOverview
+#   - 覆盖情况 count / first_date / last_date：SentimentMeta
+#
+# - ingest 写入 MarketSentiment 后调用 refresh_latest()，增量更新：
+#   新增的行累加 count、推前 first_date；更晚（或同一天）的行覆盖最新值
+#   （F() 表达式，在数据库里原子地累加）
+# - 读取：先查 cache，未命中时一次查询读出全部指标
+# - 汇总变化后（事务提交时）删除 cache
+# - 直接改过 MarketSentiment（删数据、手工导入）时调用 rebuild_latest()
+#
+# 历史数据版本（history_version）：由 SentimentLatest 各行算出。
+# MarketSentiment 的任何写入（包括不影响最新值的回填 / 修正）都会在同一个
+# 事务里更新对应指标的 updated_at，所以版本直接来自数据库，不依赖共享 cache，
+# 多进程 + 进程内 cache（CACHE_BACKEND=locmem）时也不会返回过期的 304。
+# 历史接口的 ETag / 缓存 key 用它
+# ------------------------------------------------------------
+
+import hashlib
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Min, Q, Value, When
+from django.db.models.functions import Coalesce, Least
+from django.utils import timezone
+
+from market_sentiment.models import MarketSentiment, SentimentLatest
+
+LATEST_CACHE_KEY = "market_sentiment:latest:v2"
+
+# 数据一天只变一次；TTL 只是多进程下 cache 失效的兜底
+LATEST_CACHE_TTL = 300
+
+LATEST_FIELDS = ("source", "date", "score", "rating", "timestamp", "count", "first_date")
+
+
+def _load_snapshot() -> Dict[str, Any]:
+    indexes: Dict[str, Dict[str, Any]] = {}
+    meta: Dict[str, Dict[str, Any]] = {}
+    last_modified: Optional[datetime] = None
+
+    for row in SentimentLatest.objects.values(
+        "index_name", "date", "score", "rating", "count", "first_date", "updated_at",
+    ):
+        idx = row["index_name"]
+        indexes[idx] = {
+            "date": row["date"],
+            "score": row["score"],
+            "rating": row["rating"],
+        }
+        meta[idx] = {
+            "count": row["count"],
+            "first_date": row["first_date"],
+            "last_date": row["date"],
+        }
+        if last_modified is None or row["updated_at"] > last_modified:
+            last_modified = row["updated_at"]
+
+    digest = hashlib.md5(
+        json.dumps([indexes, meta], sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+    return {
+        "indexes": indexes,
+        "meta": meta,
+        "last_modified": last_modified,
+        "etag": digest,
+    }
+
+
+def get_latest_snapshot() -> Dict[str, Any]:
+    """
+    :return: {
+        "indexes": {index_name: {"date", "score", "rating"}},
+        "meta": {index_name: {"count", "first_date", "last_date"}},
+        "last_modified": 汇总最近一次变化的时间（无数据时为 None）,
+        "etag": 内容摘要（任何指标的数据变化都会改变）,
+    }
+    """
+    return cache.get_or_set(LATEST_CACHE_KEY, _load_snapshot, LATEST_CACHE_TTL)
+
+
+def invalidate_latest() -> None:
+    cache.delete(LATEST_CACHE_KEY)
+
+
+def history_version() -> str:
+    """MarketSentiment 的数据版本（一条查询，最多每个指标一行）"""
+    rows = SentimentLatest.objects.order_by("index_name").values_list(
+        "index_name", "date", "timestamp", "count", "updated_at",
+    )
+    return hashlib.md5(json.dumps(list(rows), default=str).encode("utf-8")).hexdigest()
+
+
+def _summary_row(index_name: str, row: Any, source: str, count: int, first_date: Optional[date]) -> SentimentLatest:
+    """row 可以是 ingest 的 dict，也可以是已有的 SentimentLatest / MarketSentiment"""
+    get = row.get if isinstance(row, Mapping) else lambda f: getattr(row, f)
+    return SentimentLatest(
+        index_name=index_name,
+        source=source,
+        date=get("date"),
+        score=get("score"),
+        rating=get("rating"),
+        timestamp=get("timestamp"),
+        count=count,
+        first_date=first_date,
+    )
+
+
+def _save(objs: List[SentimentLatest]) -> None:
+    if not objs:
+        return
+
+    # updated_at（auto_now）在 INSERT 时赋值，冲突时一并覆盖
+    SentimentLatest.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=["index_name"],
+        update_fields=list(LATEST_FIELDS) + ["updated_at"],
+    )
+    transaction.on_commit(invalidate_latest)
+
+
+def refresh_latest(
+    written: Iterable[Mapping[str, Any]],
+    inserted: Iterable[Mapping[str, Any]],
+    source: str,
+) -> int:
+    """
+    用刚写入的行增量更新汇总：
+    - 每个指标取日期最大的一行，不早于当前最新日期时覆盖最新值
+    - inserted（written 中新增的行）累加 count，并更新 first_date
+
+    需要在写入 MarketSentiment 的同一个事务里调用。
+    count / first_date / 最新值都在一条 UPDATE 里基于数据库中的当前值计算，
+    不先读后写，并发的 ingest 不会互相覆盖。
+
+    :return: 更新的指标数
+    """
+    newest: Dict[str, Mapping[str, Any]] = {}
+    for row in written:
+        cur = newest.get(row["index_name"])
+        if cur is None or (row["date"], row["timestamp"]) >= (cur["date"], cur["timestamp"]):
+            newest[row["index_name"]] = row
+
+    added: Dict[str, int] = {}
+    earliest: Dict[str, date] = {}
+    for row in inserted:
+        idx = row["index_name"]
+        added[idx] = added.get(idx, 0) + 1
+        if idx not in earliest or row["date"] < earliest[idx]:
+            earliest[idx] = row["date"]
+
+    if not newest:
+        return 0
+
+    # 还没有汇总行的指标先插入 count=0 的行（并发插入时冲突的一方忽略），下面统一累加
+    SentimentLatest.objects.bulk_create(
+        [_summary_row(idx, row, source, 0, None) for idx, row in newest.items()],
+        ignore_conflicts=True,
+    )
+
+    now = timezone.now()
+    changed = 0
+    for idx, row in newest.items():
+        moves_latest = Q(date__lte=row["date"])
+        updates: Dict[str, Any] = {
+            f: Case(
+                When(moves_latest, then=Value(v)),
+                default=F(f),
+                output_field=SentimentLatest._meta.get_field(f),
+            )
+            for f, v in (
+                ("source", source),
+                ("date", row["date"]),
+                ("score", row["score"]),
+                ("rating", row["rating"]),
+                ("timestamp", row["timestamp"]),
+            )
+        }
+
+        if idx in added:
+            first = Value(earliest[idx])
+            updates["count"] = F("count") + added[idx]
+            updates["first_date"] = Least(Coalesce("first_date", first), first)
+
+        # 只改了更早的行时最新值和覆盖情况不变，但 updated_at 照样更新（history_version）
+        changed += SentimentLatest.objects.filter(index_name=idx).update(updated_at=now, **updates)
+
+    if changed:
+        transaction.on_commit(invalidate_latest)
+    return changed
+
+
+@transaction.atomic
+def rebuild_latest(indexes: Optional[Iterable[str]] = None) -> int:
+    """
+    从 MarketSentiment 全量重算汇总（显式失效 / 修复用）
+
+    :param indexes: 只重算这些指标，默认全部
+    :return: 重算的指标数
+    """
+    qs = MarketSentiment.objects.all()
+    if indexes is not None:
+        indexes = list(indexes)
+        qs = qs.filter(index_name__in=indexes)
+
+    coverage = {
+        idx: (count, first, last)
+        for idx, count, first, last in (
+            qs.values_list("index_name")
+            .annotate(count=Count("id"), first=Min("date"), last=Max("date"))
+        )
+    }
+
+    stale = SentimentLatest.objects.exclude(index_name__in=coverage.keys())
+    if indexes is not None:
+        stale = stale.filter(index_name__in=indexes)
+    stale.delete()
+
+    rows = []
+    for idx, (count, first, last) in coverage.items():
+        latest = qs.filter(index_name=idx, date=last).order_by("-timestamp").first()
+        rows.append(_summary_row(idx, latest, latest.source, count, first))
+
+    _save(rows)
+    if not rows:
+        transaction.on_commit(invalidate_latest)
+    return len(rows)
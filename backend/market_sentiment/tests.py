@@ -1,3 +1,401 @@
+import json
+import threading
+import time
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+from itertools import product
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+
+from common.rate_limit import RateLimiter
+
+from .models import AlertSubscription, MarketSentiment, SentimentLatest
+from .services.alert_logic import (
+    STATE_EXTREME_FEAR,
+    STATE_EXTREME_GREED,
+    STATE_NORMAL,
+    STATE_PANIC,
+    PANIC_REMINDER_INTERVAL,
+    evaluate_alerts_bulk,
+    handle_alert,
+)
+from .services import cnn_client
+from .services.fetcher import SUPPORTED_INDEXES, backfill_if_supported
+from .services.ingest import IngestResult, normalize_history, upsert_rows
+
+STATES = [STATE_PANIC, STATE_EXTREME_FEAR, STATE_NORMAL, STATE_EXTREME_GREED]
+
+
+class BulkAlertEvaluationTests(TestCase):
+    """evaluate_alerts_bulk 必须与逐个 handle_alert 的结果完全一致"""
+
+    def setUp(self):
+        self.now = timezone.now()
+        # panic 提醒时间的各种边界：从未发过 / 未到期 / 恰好到期 / 已过期
+        self.sent_at = [
+            None,
+            self.now - timedelta(days=1),
+            self.now - PANIC_REMINDER_INTERVAL,
+            self.now - timedelta(days=3),
+        ]
+
+    def _make(self, prefix):
+        subs = []
+        for i, (state, sent) in enumerate(product(STATES, self.sent_at)):
+            subs.append(AlertSubscription.objects.create(
+                email=f"{prefix}{i}@example.com",
+                last_state=state,
+                last_panic_sent_at=sent,
+            ))
+        return subs
+
+    def _snapshot(self, prefix):
+        return {
+            sub.email[len(prefix):]: (sub.last_state, sub.last_panic_sent_at)
+            for sub in AlertSubscription.objects.filter(email__startswith=prefix)
+        }
+
+    def _run_loop(self, new_state):
+        events = {}
+        for sub in AlertSubscription.objects.filter(email__startswith="loop-").order_by("pk"):
+            result = handle_alert(sub, new_state)
+            if result:
+                events[sub.email[len("loop-"):]] = result
+
+        # handle_alert 用真实时间；只比较到期判断，时间戳统一替换成 self.now
+        AlertSubscription.objects.filter(
+            email__startswith="loop-", last_panic_sent_at__gt=self.now,
+        ).update(last_panic_sent_at=self.now)
+        return events
+
+    def _run_bulk(self, new_state):
+        events = {}
+        qs = AlertSubscription.objects.filter(email__startswith="bulk-")
+        for ev in evaluate_alerts_bulk(qs, new_state, now=self.now):
+            key = ev.pop("email")[len("bulk-"):]
+            ev.pop("subscription_id")
+            events.setdefault(key, []).append(ev)
+        return events
+
+    def _compare(self, *new_states):
+        self._make("loop-")
+        self._make("bulk-")
+
+        for new_state in new_states:
+            self.assertEqual(self._run_bulk(new_state), self._run_loop(new_state))
+            self.assertEqual(self._snapshot("bulk-"), self._snapshot("loop-"))
+
+    def test_matches_handle_alert_for_every_new_state(self):
+        for new_state in STATES:
+            with self.subTest(new_state=new_state):
+                self._compare(new_state)
+                AlertSubscription.objects.all().delete()
+
+    def test_matches_handle_alert_over_consecutive_runs(self):
+        self._compare(STATE_PANIC, STATE_PANIC, STATE_NORMAL, STATE_PANIC)
+
+    def test_second_run_only_sends_due_reminders(self):
+        self._make("bulk-")
+        qs = AlertSubscription.objects.filter(email__startswith="bulk-")
+
+        list(evaluate_alerts_bulk(qs, STATE_PANIC, now=self.now))
+        second = list(evaluate_alerts_bulk(qs, STATE_PANIC, now=self.now))
+
+        # 本轮刚切到 PANIC、且从未发过提醒的订阅，下一轮才收到提醒
+        self.assertTrue(all(ev["type"] == "PANIC_PERSIST" for ev in second))
+        self.assertEqual(list(evaluate_alerts_bulk(qs, STATE_PANIC, now=self.now)), [])
+
+    def test_uses_few_queries(self):
+        self._make("bulk-")
+        qs = AlertSubscription.objects.filter(email__startswith="bulk-")
+
+        # aggregate + panic 组（SELECT + UPDATE）+ distinct + 3 个旧状态组 × (SELECT + UPDATE)
+        with self.assertNumQueries(10):
+            list(evaluate_alerts_bulk(qs, STATE_PANIC, now=self.now))
+
+    def test_empty_queryset(self):
+        self.assertEqual(list(evaluate_alerts_bulk(AlertSubscription.objects.all(), STATE_NORMAL)), [])
+
+
+def history_items(scores, start="2026-03-02"):
+    """CNN historical 接口格式的条目，从 start 起每天一条"""
+    first = date.fromisoformat(start)
+    return [
+        {"timestamp": f"{first + timedelta(days=i)}T00:00:00Z", "score": score, "rating": "fear"}
+        for i, score in enumerate(scores)
+    ]
+
+
+class UpsertRowsTests(TestCase):
+    def _ingest(self, scores, index_name="fear_and_greed"):
+        rows, skipped = normalize_history(index_name, history_items(scores))
+        return upsert_rows(rows), skipped
+
+    def _scores(self):
+        return list(MarketSentiment.objects.order_by("date").values_list("score", flat=True))
+
+    def test_first_insert(self):
+        result, skipped = self._ingest([40, 41, None, 43])
+
+        self.assertEqual(skipped, 1)   # 缺少 score
+        self.assertEqual(result, IngestResult(inserted=3))
+        self.assertEqual(self._scores(), [40, 41, 43])
+
+    def test_identical_rows_are_unchanged(self):
+        self._ingest([40, 41, 42])
+        result, _ = self._ingest([40, 41, 42])
+
+        self.assertEqual(result, IngestResult(unchanged=3))
+        self.assertEqual(result.written, 0)
+        self.assertEqual(MarketSentiment.objects.count(), 3)
+
+    def test_changed_score_updates_in_place(self):
+        self._ingest([40, 41, 42])
+        ids = list(MarketSentiment.objects.order_by("date").values_list("id", flat=True))
+
+        result, _ = self._ingest([40, 45, 42, 50])
+
+        self.assertEqual(result, IngestResult(inserted=1, updated=1, unchanged=2))
+        self.assertEqual(self._scores(), [40, 45, 42, 50])
+        # ON CONFLICT DO UPDATE：原有行的主键不变
+        self.assertEqual(list(MarketSentiment.objects.order_by("date").values_list("id", flat=True))[:3], ids)
+
+    def test_last_duplicate_in_batch_wins(self):
+        rows, _ = normalize_history("fear_and_greed", history_items([40]) + history_items([55]))
+
+        self.assertEqual(upsert_rows(rows), IngestResult(inserted=1))
+        self.assertEqual(self._scores(), [55])
+
+    def test_indexes_are_independent(self):
+        self._ingest([40, 41])
+        result, _ = self._ingest([40, 41], index_name="market_momentum_sp500")
+
+        self.assertEqual(result, IngestResult(inserted=2))
+        self.assertEqual(MarketSentiment.objects.count(), 4)
+
+
+class SentimentLatestTests(TestCase):
+    """SentimentLatest 必须与 MarketSentiment 保持一致（count / first_date / 最新值）"""
+
+    def _ingest(self, scores, start, index_name="fear_and_greed"):
+        rows, _ = normalize_history(index_name, history_items(scores, start))
+        return upsert_rows(rows)
+
+    def _summary(self, index_name="fear_and_greed"):
+        return SentimentLatest.objects.filter(index_name=index_name).values(
+            "date", "score", "count", "first_date",
+        ).first()
+
+    def _expected(self, index_name="fear_and_greed"):
+        qs = MarketSentiment.objects.filter(index_name=index_name).order_by("date")
+        if not qs.exists():
+            return None
+        last = qs.last()
+        return {"date": last.date, "score": last.score, "count": qs.count(), "first_date": qs.first().date}
+
+    def test_count_and_first_date(self):
+        self._ingest([40, 41, 42], "2026-03-02")
+        self.assertEqual(self._summary(), {
+            "date": date(2026, 3, 4), "score": 42, "count": 3, "first_date": date(2026, 3, 2),
+        })
+
+        # 回填更早的数据 + 追加更晚的数据（和已有行重叠的部分不重复计数）
+        self._ingest([30, 31, 40, 41], "2026-02-28")
+        self._ingest([42, 43], "2026-03-04")
+        self.assertEqual(self._summary(), self._expected())
+        self.assertEqual(self._summary()["count"], 6)
+
+    def test_older_row_update_keeps_latest(self):
+        self._ingest([40, 41, 42], "2026-03-02")
+        self._ingest([10], "2026-03-02")
+
+        summary = self._summary()
+        self.assertEqual((summary["date"], summary["score"], summary["count"]), (date(2026, 3, 4), 42, 3))
+
+        # 同一天的修正覆盖最新值
+        self._ingest([45], "2026-03-04")
+        self.assertEqual(self._summary()["score"], 45)
+        self.assertEqual(self._summary(), self._expected())
+
+    def test_count_adds_to_stored_value(self):
+        self._ingest([40], "2026-03-02")
+        # 另一个 ingest 已经提交了自己的新增
+        SentimentLatest.objects.filter(index_name="fear_and_greed").update(count=10)
+
+        self._ingest([41], "2026-03-03")
+        self.assertEqual(self._summary()["count"], 11)
+
+    def test_rebuild_after_deletes(self):
+        self._ingest([40, 41, 42, 43], "2026-03-02")
+        self._ingest([50, 51], "2026-03-02", index_name="market_momentum_sp500")
+
+        MarketSentiment.objects.filter(index_name="fear_and_greed", date__in=[date(2026, 3, 2), date(2026, 3, 5)]).delete()
+        MarketSentiment.objects.filter(index_name="market_momentum_sp500").delete()
+
+        call_command("rebuild_sentiment_summary", stdout=StringIO())
+
+        self.assertEqual(self._summary(), self._expected())
+        self.assertEqual(self._summary()["count"], 2)
+        self.assertIsNone(self._summary("market_momentum_sp500"))
+
+
+class BackfillTests(TestCase):
+    """backfill_if_supported：按 index 建立检查点，中断后续跑不重复拉取已完成的 index"""
+
+    def _history(self, index_name, days=10):
+        start = timezone.now().date() - timedelta(days=days - 1)
+        return history_items(range(40, 40 + days), start.isoformat())
+
+    def test_resume_after_interrupt(self):
+        real_upsert = upsert_rows
+        calls = []
+
+        def crash_on_third(rows):
+            calls.append(rows[0]["index_name"])
+            if len(calls) == 3:
+                raise RuntimeError("killed")
+            return real_upsert(rows)
+
+        with mock.patch.object(cnn_client, "fetch_index_historical", side_effect=self._history) as fetch:
+            with mock.patch("market_sentiment.services.fetcher.upsert_rows", side_effect=crash_on_third):
+                with self.assertRaises(RuntimeError):
+                    backfill_if_supported(days=30)
+            self.assertEqual(fetch.call_count, len(SUPPORTED_INDEXES))
+
+            done = calls[:2]
+            fetch.reset_mock()
+            report = backfill_if_supported(days=30)
+
+        refetched = {c.args[0] for c in fetch.call_args_list}
+        self.assertEqual(refetched, set(SUPPORTED_INDEXES) - set(done))
+        for idx in done:
+            self.assertEqual(report[idx]["status"], "up_to_date")
+        for idx in refetched:
+            self.assertEqual(report[idx]["status"], "ok")
+            self.assertEqual(report[idx]["inserted"], 10)
+        self.assertEqual(MarketSentiment.objects.count(), 10 * len(SUPPORTED_INDEXES))
+
+    def test_resume_refetches_from_checkpoint(self):
+        idx = "fear_and_greed"
+        with mock.patch.object(cnn_client, "fetch_index_historical", side_effect=lambda i: self._history(i)[:5]):
+            backfill_if_supported(days=30, indexes=[idx])
+
+        with mock.patch.object(cnn_client, "fetch_index_historical", side_effect=self._history):
+            report = backfill_if_supported(days=30, indexes=[idx])
+
+        # 从最后一个已存日期开始（该行重新读一次），之前的行不再处理
+        self.assertEqual(report[idx]["since"], timezone.now().date() - timedelta(days=5))
+        self.assertEqual((report[idx]["inserted"], report[idx]["unchanged"]), (5, 1))
+
+    def test_unsupported_and_failed_indexes(self):
+        def fetch(index_name):
+            if index_name == "put_call_options":
+                return None
+            if index_name == "junk_bond_demand":
+                raise RuntimeError("junk_bond_demand historical failed: 500")
+            return self._history(index_name)
+
+        with mock.patch.object(cnn_client, "fetch_index_historical", side_effect=fetch):
+            report = backfill_if_supported(days=30)
+
+        self.assertEqual(report["put_call_options"]["status"], "unsupported")
+        self.assertEqual(report["junk_bond_demand"]["status"], "error")
+        self.assertEqual(report["fear_and_greed"]["status"], "ok")
+
+    def test_requests_run_concurrently_under_rate_limit(self):
+        rate = 40.0
+        in_flight, peak = [0], [0]
+        lock = threading.Lock()
+
+        class Response:
+            status = 200
+
+            def read(self):
+                with lock:
+                    in_flight[0] -= 1
+                return json.dumps({"data": []}).encode()
+
+        class Connection:
+            def __init__(self, *args, **kwargs):
+                pass
+
+            def request(self, *args, **kwargs):
+                with lock:
+                    in_flight[0] += 1
+                    peak[0] = max(peak[0], in_flight[0])
+
+            def getresponse(self):
+                time.sleep(0.1)
+                return Response()
+
+        limiter = RateLimiter(rate, burst=1)
+        with mock.patch.object(cnn_client, "_limiter", limiter), \
+                mock.patch.object(cnn_client.http.client, "HTTPSConnection", Connection):
+            started = time.monotonic()
+            report = backfill_if_supported(days=30)
+            elapsed = time.monotonic() - started
+
+        self.assertTrue(all(item["status"] == "ok" for item in report.values()))
+        # 限流：n 个请求至少要 (n - 1) / rate 秒；并发：同一时刻有多个请求在途
+        self.assertGreaterEqual(elapsed, (len(SUPPORTED_INDEXES) - 1) / rate * 0.9)
+        self.assertGreater(peak[0], 1)
+
+
+class SentimentHistoryCacheTests(TestCase):
+    """单指标 / 多指标历史接口：ETag 由数据版本算出，resolution= 的结果按 ETag 缓存"""
+
+    URL = "/api/sentiment/index/fear_and_greed/history/"
+
+    def setUp(self):
+        cache.clear()
+        start = timezone.now().date() - timedelta(days=199)
+        rows, _ = normalize_history("fear_and_greed", history_items(range(200), start.isoformat()))
+        upsert_rows(rows)
+
+    def test_resolution_is_cached(self):
+        first = self.client.get(self.URL, {"resolution": "sparkline"})
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(len(first.json()), 60)
+
+        # 只读 SentimentLatest 算数据版本
+        with self.assertNumQueries(1):
+            second = self.client.get(self.URL, {"resolution": "sparkline"})
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_not_modified_until_data_changes(self):
+        etag = self.client.get(self.URL, {"points": "20"})["ETag"]
+
+        self.assertEqual(self.client.get(self.URL, {"points": "20"}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # 参数不同 ETag 不同
+        self.assertNotEqual(self.client.get(self.URL, {"points": "30"})["ETag"], etag)
+
+        # 改一条旧数据（不影响最新值）也会换 ETag
+        rows, _ = normalize_history("fear_and_greed", history_items([99], (timezone.now().date() - timedelta(days=150)).isoformat()))
+        upsert_rows(rows)
+        self.assertEqual(self.client.get(self.URL, {"points": "20"}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_rebuild_changes_version(self):
+        url = "/api/sentiment/history/"
+        etag = self.client.get(url, {"resolution": "chart"})["ETag"]
+
+        MarketSentiment.objects.filter(date__lt=timezone.now().date() - timedelta(days=100)).delete()
+        call_command("rebuild_sentiment_summary", stdout=StringIO())
+
+        response = self.client.get(url, {"resolution": "chart"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["indexes"]["fear_and_greed"]["date"]), 101)
+
+    def test_single_and_multi_do_not_share_cache_entries(self):
+        single = self.client.get(self.URL, {"resolution": "sparkline"})
+        multi = self.client.get("/api/sentiment/history/", {"indexes": "fear_and_greed", "resolution": "sparkline"})
+
+        self.assertIsInstance(single.json(), list)
+        self.assertEqual(len(multi.json()["indexes"]["fear_and_greed"]["date"]), 60)
 
-# Create your tests here.
+    def test_unknown_index(self):
+        self.assertEqual(self.client.get("/api/sentiment/index/nope/history/").status_code, 404)
@@ -3,6 +3,7 @@ from django.urls import path
 from .views import (
     SentimentOverview,
     SentimentHistory,
+    SentimentHistoryMulti,
     SentimentMeta,
 )
 from .views_alerts import subscribe_alert
@@ -10,6 +11,7 @@ from .views_alerts import subscribe_alert
 urlpatterns = [
     path("overview/", SentimentOverview.as_view()),
     path("index/<str:index_name>/history/", SentimentHistory.as_view()),
+    path("history/", SentimentHistoryMulti.as_view()),
     path("meta/", SentimentMeta.as_view()),
 
     path("alerts/subscribe", subscribe_alert),
@@ -1,13 +1,24 @@
 # market_sentiment/views.py
-from datetime import timedelta
+import hashlib
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
 from django.utils.timezone import now
-from django.db.models import Max, Min, Count
+from django.views.decorators.gzip import gzip_page
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.exceptions import NotFound
 
+from common.downsample import lttb, parse_target
+from common.http import not_modified, set_validators
 from .models import MarketSentiment
 from .serializers import MarketSentimentSerializer
+from .services.fetcher import SUPPORTED_INDEXES
+from .services.latest import get_latest_snapshot, history_version
 
 CORE_INDEXES = [
     "fear_and_greed",
@@ -15,75 +26,221 @@ CORE_INDEXES = [
     "put_call_options",
 ]
 
+# 命名档位（resolution=）降采样结果的缓存时间
+DOWNSAMPLE_CACHE_TTL = 3600
+
+# days= 的上限（再大 timedelta 会溢出，也没有这么早的数据）
+MAX_HISTORY_DAYS = 365 * 30
+
+
+def _parse_days(params) -> int:
+    """?days=N（1..MAX_HISTORY_DAYS，默认 365），非法时抛 ValueError"""
+    raw = params.get("days")
+    if not raw:
+        return 365
+    try:
+        days = int(raw)
+    except ValueError:
+        raise ValueError("days must be an integer")
+    if not 1 <= days <= MAX_HISTORY_DAYS:
+        raise ValueError(f"days must be between 1 and {MAX_HISTORY_DAYS}")
+    return days
+
+
+def _downsample_indices(dates: List[date], scores: List[float], points: int) -> List[int]:
+    """按 (日期序号, score) 做 LTTB，返回选中行的下标"""
+    x = np.fromiter((d.toordinal() for d in dates), dtype=float, count=len(dates))
+    return lttb(x, np.asarray(scores, dtype=float), points).tolist()
+
+
+def _history_etag(
+    kind: str,
+    selected: List[str],
+    days: int,
+    start_date: date,
+    points: Optional[int],
+    level: Optional[str],
+) -> str:
+    """历史接口的 ETag：(历史数据版本, 接口, 查询参数)，数据有任何写入都会变"""
+    raw = f"{kind}:{history_version()}:{days}:{start_date}:{points}:{level}:{','.join(selected)}"
+    return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+
+def _history_cache_key(etag: str) -> str:
+    """resolution= 的降采样结果按 ETag 缓存，数据变化后旧结果自然失效"""
+    return f"market_sentiment:history:{etag}"
+
 
 class SentimentOverview(APIView):
     """
-    返回 3 个核心指标的最新值
+    返回核心指标的最新值（读 SentimentLatest 快照，cache 命中时不查库）
+
+    ?indexes=all            全部指标
+    ?indexes=a,b            指定指标
+    默认只返回 CORE_INDEXES
+    支持 If-None-Match / If-Modified-Since（304）
     """
     def get(self, request):
-        result = {}
+        snapshot = get_latest_snapshot()
+        latest = snapshot["indexes"]
 
-        for idx in CORE_INDEXES:
-            latest = (
-                MarketSentiment.objects
-                .filter(index_name=idx)
-                .order_by("-date")
-                .first()
-            )
-            if latest:
-                result[idx] = {
-                    "date": latest.date,
-                    "score": latest.score,
-                    "rating": latest.rating,
-                }
+        raw = request.GET.get("indexes", "").strip()
+        if raw == "all":
+            selected = list(latest)
+        elif raw:
+            selected = list(dict.fromkeys(s.strip() for s in raw.split(",") if s.strip()))
+        else:
+            selected = CORE_INDEXES
+
+        etag = hashlib.md5(
+            f"{snapshot['etag']}:{','.join(selected)}".encode("utf-8")
+        ).hexdigest()
+        last_modified = snapshot["last_modified"]
+
+        cached = not_modified(request, etag, last_modified)
+        if cached is not None:
+            return cached
+
+        result = {idx: latest[idx] for idx in selected if idx in latest}
 
-        return Response(result)
+        return set_validators(Response(result), etag, last_modified)
 
 
 class SentimentHistory(APIView):
     """
     单个指标的历史时间序列
+    points=N 或 resolution=sparkline|thumbnail|chart 时做 LTTB 降采样
+
+    ETag / 降采样结果的缓存与 SentimentHistoryMulti 相同
     """
     def get(self, request, index_name: str):
-        days = int(request.GET.get("days", 365))
+        try:
+            days = _parse_days(request.GET)
+            points, level = parse_target(request.GET)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        start_date = now().date() - timedelta(days=days)
+
+        etag = _history_etag("index", [index_name], days, start_date, points, level)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+
+        def load() -> List[Dict[str, Any]]:
+            rows = list(
+                MarketSentiment.objects
+                .filter(index_name=index_name, date__gte=start_date)
+                .order_by("date")
+            )
+            if not rows:
+                raise NotFound(f"No data for index '{index_name}'")
+
+            if points and len(rows) > points:
+                keep = _downsample_indices([r.date for r in rows], [r.score for r in rows], points)
+                rows = [rows[i] for i in keep]
+            return MarketSentimentSerializer(rows, many=True).data
+
+        if level:
+            data = cache.get_or_set(_history_cache_key(etag), load, DOWNSAMPLE_CACHE_TTL)
+        else:
+            data = load()
+
+        return set_validators(Response(data), etag)
+
+
+@method_decorator(gzip_page, name="dispatch")
+class SentimentHistoryMulti(APIView):
+    """
+    多个指标的历史时间序列（一次请求、一条查询）
+    GET /api/sentiment/history/?indexes=a,b,c&days=365[&points=N | &resolution=sparkline]
+    indexes 省略或为 all 时返回全部指标
+
+    列式返回，不实例化 model / serializer：
+    {
+        "days": 365,
+        "start": "YYYY-MM-DD",
+        "indexes": {
+            "fear_and_greed": {"date": [...], "score": [...], "rating": [...]},
+            ...
+        }
+    }
+
+    ETag 由 (历史数据版本, 查询参数) 算出，先比较 If-None-Match 再查库；
+    resolution= 的降采样结果按同一个 key 缓存，数据没有变化时不再查库。
+    """
+    def get(self, request):
+        raw = request.GET.get("indexes", "").strip()
+        if not raw or raw == "all":
+            selected = SUPPORTED_INDEXES
+        else:
+            selected = list(dict.fromkeys(s.strip() for s in raw.split(",") if s.strip()))
+
+        try:
+            days = _parse_days(request.GET)
+            points, level = parse_target(request.GET)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
         start_date = now().date() - timedelta(days=days)
 
-        qs = MarketSentiment.objects.filter(
-            index_name=index_name,
-            date__gte=start_date,
-        ).order_by("date")
+        etag = _history_etag("multi", selected, days, start_date, points, level)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
 
-        if not qs.exists():
-            raise NotFound(f"No data for index '{index_name}'")
+        def load() -> Dict[str, Any]:
+            return {
+                "days": days,
+                "start": start_date.isoformat(),
+                "indexes": self._columns(selected, start_date, points),
+            }
+
+        if level:
+            payload = cache.get_or_set(_history_cache_key(etag), load, DOWNSAMPLE_CACHE_TTL)
+        else:
+            payload = load()
+
+        return set_validators(JsonResponse(payload), etag)
 
-        return Response(
-            MarketSentimentSerializer(qs, many=True).data
+    @staticmethod
+    def _columns(selected: List[str], start_date: date, points: int | None) -> Dict[str, Dict[str, List[Any]]]:
+        rows = (
+            MarketSentiment.objects
+            .filter(index_name__in=selected, date__gte=start_date)
+            .order_by("index_name", "date")
+            .values_list("index_name", "date", "score", "rating")
         )
 
+        columns = {idx: {"date": [], "score": [], "rating": []} for idx in selected}
+        for idx, d, score, rating in rows:
+            col = columns[idx]
+            col["date"].append(d)
+            col["score"].append(score)
+            col["rating"].append(rating)
+
+        for idx, col in columns.items():
+            if points and len(col["date"]) > points:
+                keep = _downsample_indices(col["date"], col["score"], points)
+                col = columns[idx] = {k: [v[i] for i in keep] for k, v in col.items()}
+            col["date"] = [d.isoformat() for d in col["date"]]
+
+        return columns
+
 
 class SentimentMeta(APIView):
     """
     返回每个 index 的数据覆盖情况
+    读 SentimentLatest 汇总（ingest 增量维护），不再对全表 GROUP BY
     """
-    qs = (
-        MarketSentiment.objects
-        .values("index_name")
-        .annotate(
-            count=Count("id"),
-            first_date=Min("date"),
-            last_date=Max("date"),
-        )
-        .order_by("index_name")
-    )
-
     def get(self, request):
-        result = {}
+        snapshot = get_latest_snapshot()
+        etag, last_modified = snapshot["etag"], snapshot["last_modified"]
 
-        for item in self.qs:
-            result[item["index_name"]] = {
-                "count": item["count"],
-                "first_date": item["first_date"],
-                "last_date": item["last_date"],
-            }
+        cached = not_modified(request, etag, last_modified)
+        if cached is not None:
+            return cached
+
+        result = dict(sorted(snapshot["meta"].items()))
 
-        return Response(result)
+        return set_validators(Response(result), etag, last_modified)
@@ -1,26 +1,268 @@
-import requests
+# news/services.py
+# ------------------------------------------------------------
+# Google News RSS
+#
+# - 每个 (symbol, limit) 缓存 NEWS_TTL 秒；并发 miss 只请求一次上游
+# - 过期后带 If-None-Match / If-Modified-Since 重新验证，
+#   上游返回 304 时直接沿用上一次的结果，不再下载、解析
+# - 增量解析（XMLPullParser，边下载边解析），拿到 limit 条 <item>
+#   就停止读取，不再为整份 feed 建 ElementTree
+# - fetch_google_news_many：多个 symbol 并发获取（watchlist 用）
+# ------------------------------------------------------------
+
+import asyncio
+import weakref
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from xml.etree import ElementTree
 
-def fetch_google_news(symbol: str, limit=6):
+from finance.async_http import get_async_client
+from finance.cache import TTLCache
+from finance.concurrency import fan_out
+from finance.http_helper import get_client
+
+DEFAULT_LIMIT = 6
+MAX_LIMIT = 20
+
+# 新闻列表的新鲜期（秒），过期后走条件请求
+NEWS_TTL = 300
+
+# ETag / Last-Modified 保留多久（秒），超过后重新完整下载
+VALIDATOR_TTL = 24 * 3600
+
+NEWS_CACHE_MAXSIZE = 512
+
+FETCH_TIMEOUT = 8
+
+# 多 symbol 接口的整体截止时间（秒），超时的 symbol 记入 errors
+BATCH_DEADLINE = 8.0
+
+CHUNK_SIZE = 8192
+
+# (symbol, limit) -> items
+_news_cache = TTLCache(maxsize=NEWS_CACHE_MAXSIZE)
+
+# (symbol, limit) -> {"etag", "last_modified", "items"}
+_validators = TTLCache(maxsize=NEWS_CACHE_MAXSIZE)
+
+
+def get_news_cache() -> TTLCache:
+    return _news_cache
+
+
+def _news_url(symbol: str) -> str:
     query = f"{symbol} stock"
-    url = (
+    return (
         "https://news.google.com/rss/search"
         f"?q={query}&hl=en-US&gl=US&ceid=US:en"
     )
 
-    resp = requests.get(url, timeout=8)
-    resp.raise_for_status()
 
-    root = ElementTree.fromstring(resp.text)
-    items = root.findall(".//item")
+class _ItemParser:
+    """边喂数据边解析 <item>，收满 limit 条后 feed() 返回 True"""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.items: List[Dict[str, Any]] = []
+        self._parser = ElementTree.XMLPullParser(events=("end",))
+
+    @property
+    def done(self) -> bool:
+        return len(self.items) >= self.limit
+
+    def feed(self, chunk: bytes) -> bool:
+        self._parser.feed(chunk)
+        return self._collect()
+
+    def close(self) -> None:
+        """body 读完但没收满 limit 条：结束解析，文档不完整（被截断）时抛 ParseError"""
+        self._parser.close()
+        self._collect()
+
+    def _collect(self) -> bool:
+        for _event, elem in self._parser.read_events():
+            if elem.tag != "item":
+                continue
+            self.items.append({
+                "title": elem.findtext("title"),
+                "link": elem.findtext("link"),
+                "source": elem.findtext("source"),
+                "published": elem.findtext("pubDate"),
+            })
+            elem.clear()
+            if self.done:
+                break
+        return self.done
+
+
+def _conditional_headers(prev: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    headers: Dict[str, str] = {}
+    if prev:
+        if prev.get("etag"):
+            headers["If-None-Match"] = prev["etag"]
+        if prev.get("last_modified"):
+            headers["If-Modified-Since"] = prev["last_modified"]
+    return headers
+
+
+def _remember(key: Tuple[str, int], headers: Any, items: List[Dict[str, Any]]) -> None:
+    etag = headers.get("ETag")
+    last_modified = headers.get("Last-Modified")
+    if etag or last_modified:
+        _validators.set(
+            key,
+            {"etag": etag, "last_modified": last_modified, "items": items},
+            ttl=VALIDATOR_TTL,
+        )
+
+
+def _load(symbol: str, limit: int) -> List[Dict[str, Any]]:
+    key = (symbol, limit)
+    prev = _validators.get(key)
+
+    # 复用共享连接池（keep-alive），避免每次重新握手
+    resp = get_client().get(
+        _news_url(symbol),
+        headers=_conditional_headers(prev),
+        timeout=FETCH_TIMEOUT,
+        stream=True,
+    )
+    try:
+        if resp.status_code == 304 and prev is not None:
+            # 内容没变：沿用上次的结果，并延长校验信息的保留时间
+            _validators.set(key, prev, ttl=VALIDATOR_TTL)
+            return prev["items"]
+        resp.raise_for_status()
+
+        parser = _ItemParser(limit)
+        for chunk in resp.iter_content(CHUNK_SIZE):
+            if parser.feed(chunk):
+                break
+        else:
+            parser.close()
+    finally:
+        # 提前停止时剩余的 body 不再读取
+        resp.close()
+
+    _remember(key, resp.headers, parser.items)
+    return parser.items
+
+
+def fetch_google_news(symbol: str, limit=DEFAULT_LIMIT):
+    if limit <= 0:
+        return []
+    items = _news_cache.get_or_load(
+        (symbol, limit),
+        lambda: _load(symbol, limit),
+        ttl=NEWS_TTL,
+    )
+    return list(items)
+
+
+def fetch_google_news_many(
+    symbols: Iterable[str],
+    limit=DEFAULT_LIMIT,
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    多个 symbol 的新闻：先查缓存，只对缓存里没有的并发请求上游
+
+    :return: (news, errors)
+        news:   symbol -> 新闻列表
+        errors: symbol -> 错误信息
+    """
+    uniq = list(dict.fromkeys(symbols))
+
+    cached, missing = _news_cache.get_many((s, limit) for s in uniq)
+    fetched, errors = fan_out(
+        lambda s: fetch_google_news(s, limit),
+        [s for s, _ in missing],
+        timeout=BATCH_DEADLINE,
+    )
+
+    news: Dict[str, Any] = {}
+    for s in uniq:
+        if (s, limit) in cached:
+            news[s] = list(cached[(s, limit)])
+        elif s in fetched:
+            news[s] = fetched[s]
+
+    return news, errors
+
+
+# async 版本的 single-flight：每个事件循环一份 (symbol, limit) -> 正在进行的 Task
+_async_inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, int], asyncio.Task]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+async def _load_async(symbol: str, limit: int) -> List[Dict[str, Any]]:
+    key = (symbol, limit)
+    prev = _validators.get(key)
+
+    async with get_async_client().stream(
+        "GET",
+        _news_url(symbol),
+        headers=_conditional_headers(prev),
+        timeout=FETCH_TIMEOUT,
+    ) as resp:
+        if resp.status_code == 304 and prev is not None:
+            # 内容没变：沿用上次的结果，并延长校验信息的保留时间
+            _validators.set(key, prev, ttl=VALIDATOR_TTL)
+            return prev["items"]
+        resp.raise_for_status()
+
+        parser = _ItemParser(limit)
+        async for chunk in resp.aiter_bytes(CHUNK_SIZE):
+            if parser.feed(chunk):
+                break
+        else:
+            parser.close()
+
+    _remember(key, resp.headers, parser.items)
+    return parser.items
+
+
+async def fetch_google_news_async(symbol: str, limit=DEFAULT_LIMIT):
+    """fetch_google_news 的 async 版本：共用同一个新闻缓存"""
+    if limit <= 0:
+        return []
+
+    key = (symbol, limit)
+    items = _news_cache.get(key)
+    if items is not None:
+        return list(items)
+
+    inflight = _async_inflight.setdefault(asyncio.get_running_loop(), {})
+    task = inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_load_async(symbol, limit))
+        inflight[key] = task
+        task.add_done_callback(lambda _t: inflight.pop(key, None))
+
+    items = await asyncio.shield(task)
+    _news_cache.set(key, items, ttl=NEWS_TTL)
+    return list(items)
+
+
+async def fetch_google_news_many_async(
+    symbols: Iterable[str],
+    limit=DEFAULT_LIMIT,
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """fetch_google_news_many 的 async 版本"""
+    uniq = list(dict.fromkeys(symbols))
+
+    async def one(s: str):
+        return await asyncio.wait_for(fetch_google_news_async(s, limit), BATCH_DEADLINE)
+
+    outcomes = await asyncio.gather(*(one(s) for s in uniq), return_exceptions=True)
 
-    results = []
-    for item in items[:limit]:
-        results.append({
-            "title": item.findtext("title"),
-            "link": item.findtext("link"),
-            "source": item.findtext("source"),
-            "published": item.findtext("pubDate"),
-        })
+    news: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    for s, outcome in zip(uniq, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            errors[s] = f"Timed out after {BATCH_DEADLINE}s"
+        elif isinstance(outcome, Exception):
+            errors[s] = str(outcome)
+        else:
+            news[s] = outcome
 
-    return results
+    return news, errors
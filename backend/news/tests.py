@@ -1,3 +1,167 @@
-from django.test import TestCase
+from unittest import mock
+from xml.etree.ElementTree import ParseError
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from . import services
+from .services import fetch_google_news, fetch_google_news_many
+
+
+def rss(n, prefix="News"):
+    items = "".join(
+        f"<item><title>{prefix} {i}</title><link>https://example.com/{i}</link>"
+        f"<source>Example</source><pubDate>Mon, 02 Mar 2026 1{i % 10}:00:00 GMT</pubDate></item>"
+        for i in range(n)
+    )
+    return f'<?xml version="1.0"?><rss><channel><title>feed</title>{items}</channel></rss>'.encode()
+
+
+class FakeResponse:
+    """requests.Response 的最小替身：按 64 字节分块返回 body，记录读了多少块"""
+
+    def __init__(self, status_code=200, body=b"", headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+        self.chunks_read = 0
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), 64):
+            self.chunks_read += 1
+            yield self.body[i:i + 64]
+
+    def close(self):
+        self.closed = True
+
+
+class GoogleNewsTests(SimpleTestCase):
+    def setUp(self):
+        services.get_news_cache().clear()
+        services._validators.clear()
+
+        patcher = mock.patch("news.services.get_client")
+        self.client_get = patcher.start().return_value.get
+        self.addCleanup(patcher.stop)
+
+    def _expire(self):
+        """NEWS_TTL 到期：只清掉新闻缓存，保留 ETag / Last-Modified"""
+        services.get_news_cache().clear()
+
+    def test_parses_only_limit_items(self):
+        resp = FakeResponse(body=rss(50))
+        self.client_get.return_value = resp
+
+        items = fetch_google_news("AAPL", 3)
+
+        self.assertEqual([i["title"] for i in items], ["News 0", "News 1", "News 2"])
+        self.assertEqual(items[0], {
+            "title": "News 0",
+            "link": "https://example.com/0",
+            "source": "Example",
+            "published": "Mon, 02 Mar 2026 10:00:00 GMT",
+        })
+        # 收满 limit 条就停止读取
+        self.assertLess(resp.chunks_read, len(resp.body) // 64 // 2)
+        self.assertTrue(resp.closed)
+
+    def test_fresh_cache_skips_upstream(self):
+        self.client_get.return_value = FakeResponse(body=rss(5))
+
+        first = fetch_google_news("AAPL", 3)
+        self.assertEqual(fetch_google_news("AAPL", 3), first)
+        self.assertEqual(self.client_get.call_count, 1)
+
+    def test_304_reuses_cached_items(self):
+        self.client_get.return_value = FakeResponse(
+            body=rss(5), headers={"ETag": '"v1"', "Last-Modified": "Mon, 02 Mar 2026 10:00:00 GMT"},
+        )
+        first = fetch_google_news("AAPL", 3)
+
+        self._expire()
+        self.client_get.return_value = FakeResponse(status_code=304)
+        second = fetch_google_news("AAPL", 3)
+
+        self.assertEqual(second, first)
+        headers = self.client_get.call_args.kwargs["headers"]
+        self.assertEqual(headers, {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 02 Mar 2026 10:00:00 GMT"})
+
+    def test_200_after_change_replaces_items(self):
+        self.client_get.return_value = FakeResponse(body=rss(5), headers={"ETag": '"v1"'})
+        fetch_google_news("AAPL", 3)
+
+        self._expire()
+        self.client_get.return_value = FakeResponse(body=rss(5, prefix="Update"), headers={"ETag": '"v2"'})
+        self.assertEqual(fetch_google_news("AAPL", 3)[0]["title"], "Update 0")
+
+        self._expire()
+        self.client_get.return_value = FakeResponse(status_code=304)
+        fetch_google_news("AAPL", 3)
+        self.assertEqual(self.client_get.call_args.kwargs["headers"], {"If-None-Match": '"v2"'})
+
+    def test_no_validators_means_unconditional_request(self):
+        self.client_get.return_value = FakeResponse(body=rss(5))
+        fetch_google_news("AAPL", 3)
+
+        self._expire()
+        fetch_google_news("AAPL", 3)
+        self.assertEqual(self.client_get.call_args.kwargs["headers"], {})
+
+    def test_malformed_xml(self):
+        self.client_get.return_value = FakeResponse(body=b"<rss><channel><item><title>x</item>", headers={"ETag": '"bad"'})
+
+        with self.assertRaises(ParseError):
+            fetch_google_news("AAPL", 3)
+
+        # 失败不缓存，也不保存校验信息
+        self.assertIsNone(services._validators.get(("AAPL", 3)))
+        self.client_get.return_value = FakeResponse(body=rss(5))
+        self.assertEqual(len(fetch_google_news("AAPL", 3)), 3)
+        self.assertEqual(self.client_get.call_args.kwargs["headers"], {})
+
+    def test_truncated_feed_is_an_error(self):
+        body = rss(2)
+        self.client_get.return_value = FakeResponse(body=body[:-30], headers={"ETag": '"cut"'})
+
+        with self.assertRaises(ParseError):
+            fetch_google_news("AAPL", 5)
+        self.assertIsNone(services._validators.get(("AAPL", 5)))
+
+    def test_short_complete_feed(self):
+        self.client_get.return_value = FakeResponse(body=rss(2))
+        self.assertEqual(len(fetch_google_news("AAPL", 5)), 2)
+
+    def test_malformed_xml_view_returns_error(self):
+        self.client_get.return_value = FakeResponse(body=b"not xml at all")
+
+        response = self.client.get("/api/news/google/", {"symbol": "aapl"})
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("error", response.json())
+
+    def test_many_fetches_only_missing_symbols(self):
+        self.client_get.return_value = FakeResponse(body=rss(5))
+        fetch_google_news("AAPL", 2)
+        self.client_get.reset_mock()
+
+        def respond(url, **kwargs):
+            if "BAD" in url:
+                return FakeResponse(body=b"<rss><oops")
+            return FakeResponse(body=rss(5, prefix=url.split("q=")[1].split(" ")[0]))
+
+        self.client_get.side_effect = respond
+        news, errors = fetch_google_news_many(["AAPL", "NVDA", "BAD", "NVDA"], 2)
+
+        self.assertEqual(sorted(news), ["AAPL", "NVDA"])
+        self.assertEqual(news["NVDA"][0]["title"], "NVDA 0")
+        self.assertEqual(list(errors), ["BAD"])
+        # AAPL 命中缓存
+        self.assertEqual(self.client_get.call_count, 2)
+
+    def test_many_view_validation(self):
+        self.assertEqual(self.client.get("/api/news/google/multi/").status_code, 400)
+        self.assertEqual(self.client.get("/api/news/google/multi/", {"symbols": "A", "limit": "99"}).status_code, 400)
+        self.client_get.assert_not_called()
@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import path
-from .views import google_news
+from .views import google_news, google_news_async, google_news_many, google_news_many_async
 
 urlpatterns = [
-    path("google/", google_news),
+    path("google/", google_news_async if settings.ASYNC_VIEWS else google_news),
+    path("google/multi/", google_news_many_async if settings.ASYNC_VIEWS else google_news_many),
 ]
@@ -1,10 +1,40 @@
 from django.http import JsonResponse
 from django.views.decorators.http import require_GET
-from .services import fetch_google_news
+from .services import (
+    DEFAULT_LIMIT,
+    MAX_LIMIT,
+    fetch_google_news,
+    fetch_google_news_async,
+    fetch_google_news_many,
+    fetch_google_news_many_async,
+)
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 import json
 
+# 多 symbol 接口一次最多查多少个
+MAX_NEWS_SYMBOLS = 20
+
+
+def _parse_limit(request):
+    """?limit=N（1..MAX_LIMIT），非法时抛 ValueError"""
+    raw = request.GET.get("limit")
+    if not raw:
+        return DEFAULT_LIMIT
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+    return limit
+
+
+def _parse_symbols(request):
+    symbols = [s.strip().upper() for s in request.GET.get("symbols", "").split(",")]
+    return list(dict.fromkeys(s for s in symbols if s))
+
+
 @require_GET
 def google_news(request):
     symbol = request.GET.get("symbol")
@@ -12,9 +42,73 @@ def google_news(request):
         return JsonResponse({"error": "symbol is required"}, status=400)
 
     try:
-        data = fetch_google_news(symbol.upper())
+        limit = _parse_limit(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        data = fetch_google_news(symbol.upper(), limit)
         return JsonResponse(data, safe=False)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
 
+@require_GET
+async def google_news_async(request):
+    """google_news 的 async 版本（ASGI 部署时使用）"""
+    symbol = request.GET.get("symbol")
+    if not symbol:
+        return JsonResponse({"error": "symbol is required"}, status=400)
+
+    try:
+        limit = _parse_limit(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        data = await fetch_google_news_async(symbol.upper(), limit)
+        return JsonResponse(data, safe=False)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+def _validate_many(request):
+    symbols = _parse_symbols(request)
+    if not symbols:
+        raise ValueError("symbols is required")
+    if len(symbols) > MAX_NEWS_SYMBOLS:
+        raise ValueError(f"At most {MAX_NEWS_SYMBOLS} symbols allowed")
+    return symbols, _parse_limit(request)
+
+
+@require_GET
+def google_news_many(request):
+    """
+    多个 symbol 的新闻（并发请求上游，已缓存的直接返回）
+    路由：GET /api/news/google/multi/?symbols=AAPL,NVDA[&limit=6]
+
+    返回：
+    {
+        "news": {"AAPL": [...], "NVDA": [...]},
+        "errors": {"XXXX": "..."}
+    }
+    """
+    try:
+        symbols, limit = _validate_many(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    news, errors = fetch_google_news_many(symbols, limit)
+    return JsonResponse({"news": news, "errors": errors})
+
+
+@require_GET
+async def google_news_many_async(request):
+    """google_news_many 的 async 版本（ASGI 部署时使用）"""
+    try:
+        symbols, limit = _validate_many(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    news, errors = await fetch_google_news_many_async(symbols, limit)
+    return JsonResponse({"news": news, "errors": errors})
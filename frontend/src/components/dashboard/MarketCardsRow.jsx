@@ -271,19 +271,8 @@ function MinuteChart({ data }) {
 /* =========================
    Market Card
    ========================= */
-function MarketCard({ symbol, name }) {
+function MarketCard({ symbol, name, data, loading }) {
     const navigate = useNavigate();
-    const [data, setData] = useState([]);
-    const [loading, setLoading] = useState(true);
-
-    useEffect(() => {
-        let cancelled = false;
-        fetch(`/api/stocks/${symbol.toLowerCase()}/`)
-            .then(r => r.json())
-            .then(j => !cancelled && setData(j.data || []))
-            .finally(() => !cancelled && setLoading(false));
-        return () => (cancelled = true);
-    }, [symbol]);
 
     const closes = normalizePrices(data.map(d => Number(d.close)));
     const first = closes[0];
@@ -315,15 +304,87 @@ function MarketCard({ symbol, name }) {
     );
 }
 
+/* =========================
+   SSE bars 增量合并
+   ========================= */
+function columnsToBars(columns) {
+    return columns.time.map((time, i) => ({
+        time,
+        open: columns.open[i],
+        high: columns.high[i],
+        low: columns.low[i],
+        close: columns.close[i],
+        volume: columns.volume[i],
+    }));
+}
+
+// 增量的第一根可能是本地最后一根（未走完的分钟）：从该时间起整体替换
+function mergeBars(bars, fresh) {
+    if (!fresh.length) return bars;
+    const start = fresh[0].time;
+    return [...bars.filter(b => b.time < start), ...fresh];
+}
+
 /* =========================
    Market Cards Row
    ========================= */
+const MARKET_CARDS = [
+    { symbol: "QQQ", name: "Invesco QQQ" },
+    { symbol: "SPY", name: "SPDR S&P 500" },
+];
+
 export default function MarketCardsRow() {
+    // 所有卡片一次请求：/api/stocks/batch/?symbols=QQQ,SPY
+    const [dataMap, setDataMap] = useState({});
+    const [loading, setLoading] = useState(true);
+
+    useEffect(() => {
+        let cancelled = false;
+        const symbols = MARKET_CARDS.map(c => c.symbol).join(",");
+        fetch(`/api/stocks/batch/?symbols=${symbols}`)
+            .then(r => r.json())
+            .then(j => {
+                if (cancelled) return;
+                const map = {};
+                for (const [sym, payload] of Object.entries(j.results || {})) {
+                    map[sym] = payload.data || [];
+                }
+                setDataMap(map);
+            })
+            .finally(() => !cancelled && setLoading(false));
+        return () => (cancelled = true);
+    }, []);
+
+    // 盘中增量：/api/stocks/stream/（SSE，只在 ASGI 部署时可用；
+    // 返回 501 等非 200 响应时 EventSource 直接关闭，卡片保持首次加载的数据）
+    useEffect(() => {
+        if (typeof EventSource === "undefined") return;
+
+        const symbols = MARKET_CARDS.map(c => c.symbol).join(",");
+        const es = new EventSource(`/api/stocks/stream/?symbols=${symbols}`);
+
+        es.addEventListener("bars", (e) => {
+            const { symbol, columns } = JSON.parse(e.data);
+            setDataMap(prev => ({
+                ...prev,
+                [symbol]: mergeBars(prev[symbol] || [], columnsToBars(columns)),
+            }));
+        });
+
+        return () => es.close();
+    }, []);
+
     return (
         <div className="market-row">
-
-            <MarketCard symbol="QQQ" name="Invesco QQQ" />
-            <MarketCard symbol="SPY" name="SPDR S&P 500" />
+            {MARKET_CARDS.map(c => (
+                <MarketCard
+                    key={c.symbol}
+                    symbol={c.symbol}
+                    name={c.name}
+                    data={dataMap[c.symbol] || []}
+                    loading={loading}
+                />
+            ))}
         </div>
     );
 }
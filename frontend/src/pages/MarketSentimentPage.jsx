@@ -60,9 +60,18 @@ async function fetchJSON(url) {
     return await res.json();
 }
 
+// 列式 {date: [], score: [], rating: []} -> [{date, score, rating}, ...]
+function columnsToPoints(cols) {
+    if (!cols || !Array.isArray(cols.date)) return [];
+    return cols.date.map((date, i) => ({
+        date,
+        score: cols.score[i],
+        rating: cols.rating[i],
+    }));
+}
+
 export default function MarketSentimentPage() {
     const [rangeDays, setRangeDays] = useState(365);
-    const [fgSeries, setFgSeries] = useState([]);
     const [seriesMap, setSeriesMap] = useState({});
     const [error, setError] = useState("");
 
@@ -79,55 +88,41 @@ export default function MarketSentimentPage() {
     console.log("subs from hook =", subs);
 
 
-    // Fetch F&G
+    // Fetch all 10 indices (1Y) in one request
     useEffect(() => {
         let cancelled = false;
         setError("");
 
-        fetchJSON(`${API_BASE}/api/sentiment/index/${CORE_INDEX}/history/?days=${rangeDays}`)
+        fetchJSON(`${API_BASE}/api/sentiment/history/?indexes=all&days=365`)
             .then((data) => {
-                if (!cancelled) setFgSeries(Array.isArray(data) ? data : []);
-            })
-            .catch((e) => {
-                if (!cancelled) setError(String(e.message || e));
-            });
-
-        return () => {
-            cancelled = true;
-        };
-    }, [rangeDays]);
-
-    // Fetch 9 sub-indices
-    useEffect(() => {
-        let cancelled = false;
-        setError("");
-
-        (async () => {
-            try {
-                const results = await Promise.all(
-                    OTHER_INDEXES.map((idx) =>
-                        fetchJSON(`${API_BASE}/api/sentiment/index/${idx}/history/?days=365`).then((data) => [
-                            idx,
-                            Array.isArray(data) ? data : [],
-                        ])
-                    )
-                );
-
                 if (cancelled) return;
 
                 const next = {};
-                for (const [idx, data] of results) next[idx] = data;
+                for (const [idx, cols] of Object.entries(data.indexes || {})) {
+                    next[idx] = columnsToPoints(cols);
+                }
                 setSeriesMap(next);
-            } catch (e) {
+            })
+            .catch((e) => {
                 if (!cancelled) setError(String(e.message || e));
-            }
-        })();
+            });
 
         return () => {
             cancelled = true;
         };
     }, []);
 
+    // F&G series for the selected range (sliced from the 1Y data)
+    const fgSeries = useMemo(() => {
+        const series = seriesMap[CORE_INDEX] || [];
+        if (rangeDays >= 365) return series;
+
+        const start = new Date();
+        start.setDate(start.getDate() - rangeDays);
+        const startStr = start.toISOString().slice(0, 10);
+        return series.filter((p) => p.date >= startStr);
+    }, [seriesMap, rangeDays]);
+
     // Latest F&G value
     const fgLatest = useMemo(() => {
         if (!fgSeries || fgSeries.length === 0) return null;
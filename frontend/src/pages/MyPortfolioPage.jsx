@@ -7,6 +7,7 @@ import { useParams, useNavigate } from "react-router-dom";
 import WatchlistCard from "../components/dashboard/WatchlistCard";
 import "../styles/myportfolio.css";
 import { useRef } from "react";
+import { getCSRFToken } from "../utils/csrf";
 
 import { PieChart, Pie, Cell, Tooltip } from "recharts";
 
@@ -94,7 +95,8 @@ export default function MyPortfolioPage() {
   const [portfolio1, setPortfolio1] = useState(null);
   const [portfolio2, setPortfolio2] = useState(null);
 
-  const [priceMap, setPriceMap] = useState({});
+  // 服务端估值：[portfolio1, portfolio2] 各一份（/api/core/portfolios/valuation/）
+  const [valuations, setValuations] = useState([null, null]);
   const [tvSymbol, setTvSymbol] = useState("AAPL");
 
   // portfolio 右侧第一大排输入框
@@ -188,34 +190,49 @@ export default function MyPortfolioPage() {
   }, [routeUsername, navigate]);
 
   /* ------------------------------
-     Fetch prices once on enter
-     API: /api/currentprice/<symbol>/
+     Server-side valuation (prices + value / P&L / weight in one request)
+     API: POST /api/core/portfolios/valuation/  {"portfolios": [p1, p2]}
+     估值用页面当前（可能尚未保存）的持仓
      ------------------------------ */
   useEffect(() => {
     if (!portfolio1 || !portfolio2) return;
 
-    const symbols = [
-      ...portfolio1.holdings.map((h) => normalizeSymbol(h.symbol)),
-      ...portfolio2.holdings.map((h) => normalizeSymbol(h.symbol)),
-    ];
-    const uniq = [...new Set(symbols)].filter(Boolean);
-
-    async function loadPrices() {
-      const map = {};
-      for (const sym of uniq) {
-        try {
-          const res = await fetch(`${API_BASE}/api/currentprice/${sym}/`, {
-            credentials: "include",
-          });
-          if (res.ok) map[sym] = await res.json();
-        } catch { }
-      }
-      setPriceMap(map);
+    let cancelled = false;
+
+    async function loadValuation() {
+      try {
+        const res = await fetch(`${API_BASE}/api/core/portfolios/valuation/`, {
+          method: "POST",
+          credentials: "include",
+          headers: {
+            "Content-Type": "application/json",
+            "X-CSRFToken": getCSRFToken() || "",
+          },
+          body: JSON.stringify({ portfolios: [portfolio1, portfolio2] }),
+        });
+        if (!res.ok || cancelled) return;
+        const data = await res.json();
+        if (!cancelled) setValuations(data.portfolios || [null, null]);
+      } catch { }
     }
 
-    loadPrices();
+    loadValuation();
+    return () => {
+      cancelled = true;
+    };
   }, [portfolio1, portfolio2]);
 
+  // 每个组合一份 symbol -> 服务端估值行（price / market_value / weight / P&L）
+  const valuedRows = useMemo(
+    () =>
+      valuations.map((v) => {
+        const map = {};
+        for (const row of v?.holdings || []) map[row.symbol] = row;
+        return map;
+      }),
+    [valuations]
+  );
+
   /* ------------------------------
      Fill missing buy_price using current price (once prices arrive)
      ------------------------------ */
@@ -226,7 +243,7 @@ export default function MyPortfolioPage() {
       let changed = false;
       const next = pf.holdings.map((h) => {
         const sym = normalizeSymbol(h.symbol);
-        const cur = priceMap[sym]?.price;
+        const cur = getCur(sym);
         if ((h.buy_price === null || h.buy_price === undefined) && typeof cur === "number") {
           changed = true;
           return { ...h, symbol: sym, buy_price: cur };
@@ -242,7 +259,7 @@ export default function MyPortfolioPage() {
     if (p1 !== portfolio1) setPortfolio1(p1);
     if (p2 !== portfolio2) setPortfolio2(p2);
     // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [priceMap]);
+  }, [valuedRows]);
 
 
   /* */
@@ -285,22 +302,24 @@ export default function MyPortfolioPage() {
      Helpers
      ------------------------------ */
   function getCur(sym) {
-    return priceMap[normalizeSymbol(sym)]?.price;
+    const s = normalizeSymbol(sym);
+    for (const rows of valuedRows) {
+      if (typeof rows[s]?.price === "number") return rows[s].price;
+    }
+    return undefined;
   }
 
-  function positionValue(h) {
-    const cur = getCur(h.symbol);
-    const shares = Number(h.shares) || 0;
-    return typeof cur === "number" ? cur * shares : 0;
+  function positionValue(h, rows) {
+    return rows[normalizeSymbol(h.symbol)]?.market_value ?? 0;
   }
 
-  function buildDonutData(pf) {
-    const total = pf.holdings.reduce((s, h) => s + positionValue(h), 0);
-    if (!total) return [];
-    return pf.holdings.map((h) => ({
+  // 权重由服务端按市值计算（%）
+  function buildDonutData(pf, rows) {
+    const data = pf.holdings.map((h) => ({
       name: normalizeSymbol(h.symbol),
-      value: (positionValue(h) / total) * 100,
+      value: rows[normalizeSymbol(h.symbol)]?.weight ?? 0,
     }));
+    return data.some((d) => d.value > 0) ? data : [];
   }
 
   // 第二大排：Add（按输入 sym/qty）
@@ -379,14 +398,14 @@ export default function MyPortfolioPage() {
     });
   }
 
-  const p1Donut = useMemo(() => (portfolio1 ? buildDonutData(portfolio1) : []), [
-    portfolio1,
-    priceMap,
-  ]);
-  const p2Donut = useMemo(() => (portfolio2 ? buildDonutData(portfolio2) : []), [
-    portfolio2,
-    priceMap,
-  ]);
+  const p1Donut = useMemo(
+    () => (portfolio1 ? buildDonutData(portfolio1, valuedRows[0]) : []),
+    [portfolio1, valuedRows]
+  );
+  const p2Donut = useMemo(
+    () => (portfolio2 ? buildDonutData(portfolio2, valuedRows[1]) : []),
+    [portfolio2, valuedRows]
+  );
 
   if (loading || !portfolio1 || !portfolio2) return null;
 
@@ -453,7 +472,7 @@ export default function MyPortfolioPage() {
                     const shares = Number(h.shares) || 0;
                     const buy = typeof h.buy_price === "number" ? h.buy_price : null;
                     const cur = getCur(sym);
-                    const val = positionValue(h);
+                    const val = positionValue(h, valuedRows[0]);
 
                     return (
                       <div className="pf-row" key={sym}>
@@ -555,7 +574,7 @@ export default function MyPortfolioPage() {
                     const shares = Number(h.shares) || 0;
                     const buy = typeof h.buy_price === "number" ? h.buy_price : null;
                     const cur = getCur(sym);
-                    const val = positionValue(h);
+                    const val = positionValue(h, valuedRows[1]);
 
                     return (
                       <div className="pf-row" key={sym}>
@@ -1,5 +1,5 @@
 import { useEffect, useState } from "react";
-import { fetchGoogleNews } from "../utils/news";
+import { fetchGoogleNewsMany } from "../utils/news";
 import "../styles/newspage.css";
 import { useWatchlist } from "../context/WatchlistContext";
 
@@ -12,9 +12,18 @@ export default function NewsPage() {
     const { watchlist, add, remove } = useWatchlist();
 
     useEffect(() => {
-        fetchGoogleNews("Federal Reserve Jerome Powell").then(setFedNews);
-        fetchGoogleNews("Nasdaq 100 OR Bitcoin BTC").then(setTrendingNews);
-        fetchGoogleNews("finance").then(setPicks);
+        const fedQuery = "Federal Reserve Jerome Powell";
+        const trendingQuery = "Nasdaq 100 OR Bitcoin BTC";
+        const picksQuery = "finance";
+
+        // 一次请求拿三组新闻
+        fetchGoogleNewsMany([fedQuery, trendingQuery, picksQuery])
+            .then((news) => {
+                setFedNews(news[fedQuery.toUpperCase()] || []);
+                setTrendingNews(news[trendingQuery.toUpperCase()] || []);
+                setPicks(news[picksQuery.toUpperCase()] || []);
+            })
+            .catch(() => {});
     }, []);
 
     function formatDate(dateStr) {
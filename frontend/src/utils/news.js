@@ -13,3 +13,19 @@ export async function fetchGoogleNews(symbol) {
   // ✅ 后端本来就返回数组
   return Array.isArray(data) ? data : [];
 }
+
+// 多个 query 一次请求（后端并发获取 + 缓存）
+// 返回 { [QUERY]: [...] }，key 为大写后的 query
+export async function fetchGoogleNewsMany(queries) {
+  const res = await fetch(
+    `/api/news/google/multi/?symbols=${encodeURIComponent(queries.join(","))}`,
+    { cache: "no-store" }
+  );
+
+  if (!res.ok) {
+    throw new Error("Failed to fetch news");
+  }
+
+  const data = await res.json();
+  return data.news || {};
+}